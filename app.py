@@ -1,5 +1,6 @@
 import streamlit as st
 from streamlit_option_menu import option_menu
+from utils import profiler
 
 # 設定頁面配置
 st.set_page_config(
@@ -9,10 +10,8 @@ st.set_page_config(
 )
 
 # 初始化session_state變數
-if 'df_reviews' not in st.session_state:
-    st.session_state.df_reviews = None
-if 'df' not in st.session_state:
-    st.session_state.df = None
+if 'dataset' not in st.session_state:
+    st.session_state.dataset = None
 if 'current_page' not in st.session_state:
     st.session_state.current_page = "首頁"
 
@@ -22,8 +21,8 @@ st.title("📈 Google Map 餐廳評論分析")
 # 使用選單進行頁面導航
 selected = option_menu(
     menu_title=None,
-    options=["首頁", "評論輸入", "評論摘要", "評分分析", "關鍵詞分析", "主題分析"],
-    icons=["house", "search", "clipboard-data", "star", "tags", "chat-square-text"],
+    options=["首頁", "評論輸入", "評論摘要", "評分分析", "關鍵詞分析", "主題分析", "全文搜尋", "跨店比較"],
+    icons=["house", "search", "clipboard-data", "star", "tags", "chat-square-text", "binoculars", "bar-chart"],
     menu_icon="cast",
     default_index=0,
     orientation="horizontal",
@@ -38,6 +37,9 @@ selected = option_menu(
 # 更新當前頁面到session_state
 st.session_state.current_page = selected
 
+# 開始記錄本次 rerun 的效能區段（設定 REVIEW_PROFILE 時才啟用）
+profiler.begin_run(selected)
+
 # 頁面導航
 if selected == "首頁":
     st.write("## 歡迎使用 Google Map 餐廳評論分析系統")
@@ -47,7 +49,9 @@ if selected == "首頁":
     - **評論摘要**：整體評分和近期評價趨勢
     - **評分分析**：評分分布和各星級評論
     - **關鍵詞分析**：熱門關鍵詞和相關評論
-    - **主題分析**：評論主題分布和討論內容
+    - **主題分析**：評論主題分布、各主題情感比例（含信賴區間）和討論內容
+    - **全文搜尋**：跨店家搜尋留言句子，找出最常提到某件事的店家
+    - **跨店比較**：依主題占比、星級或評分落差為所有店家排名，並排比較多家店
     
     請點擊上方的「評論輸入」開始分析！
     """)
@@ -77,9 +81,26 @@ elif selected == "主題分析":
     from page.topic_analysis import show_topic_analysis
     show_topic_analysis()
 
+elif selected == "全文搜尋":
+    # 導入全文搜尋頁面
+    from page.search_page import show_search_page
+    show_search_page()
+
+elif selected == "跨店比較":
+    # 導入跨店比較頁面
+    from page.comparison_page import show_comparison_page
+    show_comparison_page()
+
+run = profiler.end_run()
+
 # 頁腳
 st.markdown("---")
 st.markdown("#### 關於系統")
 st.markdown("**Google Map 餐廳評論分析**  by Jared Lin")
 url = "https://github.com/w81015"
-st.markdown("Github: [link](%s)" % url)
\ No newline at end of file
+st.markdown("Github: [link](%s)" % url)
+
+# 除錯用的效能紀錄面板
+if run is not None:
+    from page.debug_panel import show_debug_panel
+    show_debug_panel(run)
@@ -0,0 +1,154 @@
+"""
+評論收集器的本機測試伺服器：把資料夾中的 <店名>_reviews.csv 以分頁 HTML 提供給 utils.collector 的 FixtureSource。
+
+GET /place/<店名>?start=N 回傳第 N 則起的 page_size 則評論；可加入延遲與週期性的 503/429，
+用來驗證併發、速率限制、重試與中斷恢復。
+
+用法：
+    python -m benchmarks.fixture_site --folder data --port 8765 --latency-ms 50 --fail-every 7
+    python -m utils.collector 阜杭豆漿 --source fixture --base-url http://127.0.0.1:8765 --folder /tmp/collected
+"""
+import argparse
+import glob
+import html
+import itertools
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import pandas as pd
+
+
+class FixtureSite:
+    """
+    測試頁內容：依店名讀取評論 CSV（只讀一次），切出指定頁。
+    """
+
+    def __init__(self, folder="data", page_size=20, latency=0.0, fail_every=0):
+        self.folder = folder
+        self.page_size = page_size
+        self.latency = latency
+        self.fail_every = fail_every
+        self._stores = {}
+        self._lock = threading.Lock()
+        self._requests = itertools.count(1)
+
+    def stores(self):
+        return sorted(
+            os.path.basename(path)[: -len("_reviews.csv")]
+            for path in glob.glob(os.path.join(self.folder, "*_reviews.csv"))
+        )
+
+    def _reviews(self, store):
+        with self._lock:
+            if store not in self._stores:
+                path = os.path.join(self.folder, f"{store}_reviews.csv")
+                if os.path.basename(path) != f"{store}_reviews.csv" or not os.path.exists(path):
+                    return None
+                self._stores[store] = pd.read_csv(path, index_col=0)
+            return self._stores[store]
+
+    def render(self, store, start):
+        """
+        Returns:
+            (狀態碼, HTML 內容)
+        """
+        if self.latency:
+            time.sleep(self.latency)
+        request_id = next(self._requests)
+        if self.fail_every and request_id % self.fail_every == 0:
+            # 交替回應 503 與 429，模擬暫時性錯誤與限流
+            return (429 if request_id // self.fail_every % 2 else 503), ""
+
+        df_reviews = self._reviews(store)
+        if df_reviews is None:
+            return 404, ""
+        page = df_reviews.iloc[start:start + self.page_size]
+        first = df_reviews.iloc[0] if len(df_reviews) else None
+        parts = [
+            "<!DOCTYPE html><html><head><meta charset='utf-8'></head><body>",
+            "<div class='place' data-name='{}' data-rating='{}' data-review-count='{}'></div>".format(
+                html.escape(str(first["Restaurant Name"]) if first is not None else store),
+                first["Overall Rating"] if first is not None else 0,
+                int(first["Review Count"]) if first is not None else 0,
+            ),
+        ]
+        for text, rating in zip(page["Review"], page["Review Rating"]):
+            text = "" if pd.isna(text) else str(text)
+            parts.append(f"<div class='review' data-rating='{int(rating)}'>"
+                         f"<span class='text'>{html.escape(text)}</span></div>")
+        if start + self.page_size < len(df_reviews):
+            parts.append(f"<a class='next' data-start='{start + self.page_size}' "
+                         f"href='?start={start + self.page_size}'>更多評論</a>")
+        parts.append("</body></html>")
+        return 200, "".join(parts)
+
+
+class FixtureRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    quiet = False
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        parts = [unquote(part) for part in url.path.strip("/").split("/")]
+        query = parse_qs(url.query)
+        if len(parts) != 2 or parts[0] != "place":
+            status, body = 404, ""
+        else:
+            try:
+                start = max(0, int(query.get("start", ["0"])[-1]))
+            except ValueError:
+                start = 0
+            status, body = self.server.site.render(parts[1], start)
+
+        payload = body.encode("utf-8")
+        self.send_response(status)
+        if status == 429:
+            self.send_header("Retry-After", "0")
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        if not self.quiet:
+            super().log_message(format, *args)
+
+
+def make_server(host="127.0.0.1", port=8765, folder="data", page_size=20, latency=0.0, fail_every=0, quiet=False):
+    """
+    建立多執行緒測試伺服器；port 為 0 時自動選擇可用的連接埠（server.server_address[1]）。
+    """
+    handler = type("Handler", (FixtureRequestHandler,), {"quiet": quiet})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.site = FixtureSite(folder, page_size, latency, fail_every)
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="評論收集器的本機 HTML 測試伺服器")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--folder", default="data", help="提供 <店名>_reviews.csv 的資料夾")
+    parser.add_argument("--page-size", type=int, default=20, help="每頁評論數（模擬每次捲動載入的數量）")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="每個請求的延遲")
+    parser.add_argument("--fail-every", type=int, default=0, help="每 N 個請求回應一次 503/429")
+    parser.add_argument("--quiet", action="store_true", help="不輸出每個請求的紀錄")
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, args.folder, args.page_size, args.latency_ms / 1000,
+                         args.fail_every, args.quiet)
+    print(f"🧪 測試伺服器已啟動：http://{args.host}:{args.port}/place/<店名>（{len(server.site.stores())} 家店）")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
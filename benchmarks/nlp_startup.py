@@ -0,0 +1,146 @@
+"""
+斷詞工作程序的啟動時間基準測試。
+
+每個情境都在全新的 Python 程序中執行，測量從匯入 jieba 到完成第一次斷詞的時間：
+- process.jieba_build：沒有 jieba 自己的暫存檔，從 dict.txt 建立前綴字典後載入 userdict.txt
+- process.jieba_cached：使用 jieba 的暫存檔，再載入 userdict.txt（原本每個工作程序的做法）
+- process.runtime：以記憶體映射載入預先建立的執行環境檔（utils.nlp_runtime）
+- pool.*：建立 workers 個工作程序到全部完成第一次斷詞與 TextRank 的時間，
+  比較各自初始化、spawn 後載入執行環境檔，以及父程序預先載入後 fork 繼承
+
+使用方式：
+    python -m benchmarks.nlp_startup --repeat 5 --workers 4
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+SENTENCE = "老闆娘很親切，鬆餅外酥內軟，排隊半小時也值得"
+USERDICT = "userdict.txt"
+STOPWORDS = "stopwords.txt"
+
+
+def _load_plain():
+    import jieba
+
+    jieba.setLogLevel(60)
+    jieba.load_userdict(USERDICT)
+    with open(STOPWORDS, encoding="utf-8") as f:
+        return frozenset(line.strip() for line in f if line.strip())
+
+
+def _load_runtime():
+    from utils.nlp_runtime import load_runtime
+
+    return load_runtime(USERDICT, STOPWORDS).stopwords
+
+
+def _first_task(_):
+    import jieba
+    import jieba.analyse
+
+    jieba.lcut(SENTENCE)
+    jieba.analyse.textrank(SENTENCE, topK=5)
+    return os.getpid()
+
+
+def _run_pool(context, initializer, workers):
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(context),
+                             initializer=initializer) as executor:
+        # 每個工作程序各處理一個任務；任務本身很短，實際上即為各程序的初始化時間
+        list(executor.map(_first_task, range(workers)))
+
+
+def run_case(case, workers):
+    """
+    在目前程序執行單一情境，回傳耗時秒數（情境需要乾淨的程序，請透過 measure_case 呼叫）。
+    """
+    started = time.perf_counter()
+    if case == "process.jieba_build":
+        import jieba
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            jieba.dt.tmp_dir = tmp_dir
+            _load_plain()
+            jieba.lcut(SENTENCE)
+    elif case == "process.jieba_cached":
+        import jieba
+
+        _load_plain()
+        jieba.lcut(SENTENCE)
+    elif case == "process.runtime":
+        import jieba
+
+        _load_runtime()
+        jieba.lcut(SENTENCE)
+    elif case == "pool.jieba_cached":
+        _run_pool("spawn", _load_plain, workers)
+    elif case == "pool.runtime_spawn":
+        _run_pool("spawn", _load_runtime, workers)
+    elif case == "pool.runtime_fork":
+        from utils.nlp_runtime import load_runtime
+
+        load_runtime(USERDICT, STOPWORDS, preload_analyse=True)
+        _run_pool("fork", _load_runtime, workers)
+    else:
+        raise ValueError(f"未知的情境：{case}")
+    return time.perf_counter() - started
+
+
+CASES = [
+    "process.jieba_build",
+    "process.jieba_cached",
+    "process.runtime",
+    "pool.jieba_cached",
+    "pool.runtime_spawn",
+    "pool.runtime_fork",
+]
+
+
+def measure_case(case, workers, repeat):
+    timings = []
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, "-m", "benchmarks.nlp_startup", "--case", case, "--workers", str(workers)],
+            capture_output=True, text=True, check=True,
+        )
+        timings.append(json.loads(result.stdout.strip().splitlines()[-1])["seconds"])
+    return {"median_s": statistics.median(timings), "min_s": min(timings), "runs": repeat}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="測量斷詞工作程序的啟動時間")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=4, help="pool.* 情境的工作程序數")
+    parser.add_argument("--output", help="結果 JSON 路徑")
+    parser.add_argument("--case", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.case:
+        print(json.dumps({"seconds": run_case(args.case, args.workers)}))
+        return
+
+    # 先建立執行環境檔，各情境只測量載入
+    from utils.nlp_runtime import load_runtime
+
+    load_runtime(USERDICT, STOPWORDS)
+    results = {}
+    for case in CASES:
+        results[case] = measure_case(case, args.workers, args.repeat)
+        print(f"  {case:<22} 中位數 {results[case]['median_s']:.3f} 秒（最快 {results[case]['min_s']:.3f} 秒）")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"workers": args.workers, "results": results}, f, ensure_ascii=False, indent=2)
+        print(f"✅ 結果已儲存：{args.output}")
+
+
+if __name__ == "__main__":
+    main()
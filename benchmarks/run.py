@@ -0,0 +1,291 @@
+"""
+各頁面資料路徑的效能基準測試。
+
+以合成資料（1k / 100k / 10M 句）測量：
+- 匯入：CSV 轉欄式檔案、彙總統計
+- 載入：讀取欄式檔案、共用快取命中
+- 衍生資料：詞頻、關鍵詞索引、打卡偵測
+- 頁面：各 show_* 頁面與繪圖函式（Streamlit 以替身取代），分冷啟動（清空共用快取）與熱快取
+
+每項記錄執行時間與 tracemalloc 記憶體峰值（涵蓋 Python 與 NumPy 配置，不含 Arrow 的原生記憶體；
+整體用量另記錄程序的最大 RSS），結果存成 JSON，可用 --compare 與先前的結果比較。
+
+使用方式：
+    python -m benchmarks.run --sizes 1k,100k
+    python -m benchmarks.run --sizes 1k --compare benchmarks/results/baseline.json
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from benchmarks import streamlit_stub
+
+st = streamlit_stub.install()
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from benchmarks.synthetic import SIZES, generate_store, load_seed_profile  # noqa: E402
+from page.keyword_analysis import (  # noqa: E402
+    display_sentences_with_top_words,
+    plot_top_keywords,
+    show_keyword_analysis,
+)
+from page.rating_analysis import plot_rating_distribution, show_rating_analysis  # noqa: E402
+from page.summary_page import display_summary, show_summary_page  # noqa: E402
+from page.topic_analysis import (  # noqa: E402
+    display_sentiment_analysis,
+    display_sentiment_breakdown,
+    plot_review_topics,
+    show_topic_analysis,
+)
+from utils.aggregates import compute_aggregates, write_aggregates  # noqa: E402
+from utils.data_loader import open_store, read_store_data, resolve_store  # noqa: E402
+from utils.dataset_cache import registry  # noqa: E402
+from utils.figures import figure_cache, write_figures  # noqa: E402
+from utils.keyword_index import build_keyword_index  # noqa: E402
+from utils.near_duplicates import write_duplicates  # noqa: E402
+from utils.rule_engine import RuleEngine, load_rules  # noqa: E402
+from utils.sampling import build_sample_pools, get_sample_pools  # noqa: E402
+from utils.sentiment_stats import get_sentiment_breakdown, sentiment_breakdown  # noqa: E402
+from utils.store_format import ANALYSIS_SENTENCE_COLUMNS, convert_csv_store  # noqa: E402
+from utils.term_frequency import build_term_frequency  # noqa: E402
+
+DEFAULT_DATA_DIR = ".bench_data"
+DEFAULT_RESULTS_DIR = os.path.join("benchmarks", "results")
+DEFAULT_REPEATS = {"1k": 5, "100k": 3, "10m": 1}
+# 與基準相比變慢超過此比例視為退步
+DEFAULT_THRESHOLD = 0.2
+
+
+def measure(func, repeat=3, setup=None):
+    """
+    執行 func repeat 次記錄時間，再另外執行一次記錄 tracemalloc 記憶體峰值
+    （tracemalloc 會拖慢執行，因此不與計時混在一起）。
+    """
+    times = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+
+    if setup:
+        setup()
+    gc.collect()
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "repeat": repeat,
+        "min_s": min(times),
+        "median_s": statistics.median(times),
+        "mean_s": statistics.fmean(times),
+        "peak_mb": peak / 2**20,
+    }
+
+
+def _reset_session(handle):
+    st.session_state.clear()
+    st.session_state.dataset = handle
+
+
+def _cold(handle):
+    # 清空程序共用快取，模擬新程序第一次開啟頁面（磁碟上的欄式檔案與彙總檔保留）
+    def setup():
+        registry.clear()
+        figure_cache.clear()
+        _reset_session(handle)
+    return setup
+
+
+def _warm(handle, page):
+    def setup():
+        _reset_session(handle)
+        page()
+    return setup
+
+
+def bench_store(location, folder, repeat):
+    """
+    測量單一店家的所有資料路徑，回傳 {項目名稱: 統計}。
+    """
+    cases = {}
+
+    def run(name, func, setup=None):
+        print(f"  {name} ...", end="", flush=True)
+        cases[name] = measure(func, repeat, setup)
+        print(f" {cases[name]['median_s'] * 1000:.1f} ms, 峰值 {cases[name]['peak_mb']:.1f} MB")
+
+    # 匯入
+    run("ingest.convert_csv_store", lambda: convert_csv_store(location, folder))
+    run("ingest.write_aggregates", lambda: write_aggregates(location, folder))
+    run("ingest.write_figures", lambda: write_figures(location, folder))
+    run("ingest.write_duplicates", lambda: write_duplicates(location, folder))
+
+    # 載入
+    handle = open_store(location, folder, sentence_columns=ANALYSIS_SENTENCE_COLUMNS)
+    run("load.read_store_data", lambda: read_store_data(location, folder, sentence_columns=ANALYSIS_SENTENCE_COLUMNS))
+    run("load.resolve_store.cold", lambda: resolve_store(handle), registry.clear)
+    run("load.resolve_store.warm", lambda: resolve_store(handle))
+
+    # 衍生資料
+    df_reviews, df = resolve_store(handle)
+    promotions = load_rules()["promotions"]
+    run("derive.compute_aggregates", lambda: compute_aggregates(df_reviews, df))
+    run("derive.build_term_frequency", lambda: build_term_frequency(df))
+    run("derive.build_keyword_index", lambda: build_keyword_index(df))
+    run("derive.build_sample_pools", lambda: build_sample_pools(df_reviews, df))
+    run("derive.sentiment_breakdown", lambda: sentiment_breakdown(df))
+    run("derive.sentiment_breakdown.review", lambda: sentiment_breakdown(df, "review"))
+    run("derive.checkin_scan", lambda: RuleEngine(promotions).match(df_reviews["Review"]).any().sum())
+
+    # 繪圖與顯示函式（輸入已備妥，只測頁面本身的工作）
+    aggregates = compute_aggregates(df_reviews, df)
+    keyword_index = build_keyword_index(df)
+    df_top_words = plot_top_keywords(aggregates)
+    run("render.plot_top_keywords", lambda: plot_top_keywords(aggregates))
+    run("render.display_sentences_with_top_words",
+        lambda: display_sentences_with_top_words(df, df_top_words, keyword_index))
+    run("render.plot_rating_distribution", lambda: plot_rating_distribution(aggregates))
+    run("render.plot_review_topics", lambda: plot_review_topics(aggregates))
+    run("render.display_sentiment_analysis", lambda: display_sentiment_analysis(df, aggregates))
+    run("render.display_sentiment_breakdown", lambda: display_sentiment_breakdown(df))
+    run("render.display_summary", lambda: display_summary(aggregates))
+    # 經由共用圖表快取（熱快取）
+    run("render.plot_top_keywords.cached", lambda: plot_top_keywords(aggregates, handle))
+    run("render.plot_rating_distribution.cached", lambda: plot_rating_distribution(aggregates, handle))
+    run("render.plot_review_topics.cached", lambda: plot_review_topics(aggregates, handle))
+    pools = get_sample_pools(handle)
+    breakdown = get_sentiment_breakdown(handle)
+    run("render.display_sentiment_analysis.cached",
+        lambda: display_sentiment_analysis(df, aggregates, handle, pools, breakdown))
+    run("render.display_sentiment_breakdown.cached", lambda: display_sentiment_breakdown(df, handle))
+
+    # 完整頁面
+    pages = {
+        "summary": show_summary_page,
+        "rating": show_rating_analysis,
+        "keyword": show_keyword_analysis,
+        "topic": show_topic_analysis,
+    }
+    for name, page in pages.items():
+        run(f"page.{name}.cold", page, _cold(handle))
+        run(f"page.{name}.warm", page, _warm(handle, page))
+
+    registry.clear()
+    figure_cache.clear()
+    return cases
+
+
+def environment():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    import pyarrow
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "pyarrow": pyarrow.__version__,
+    }
+
+
+def compare_results(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """
+    比較兩次結果的中位數時間與記憶體峰值。
+
+    Returns:
+        退步項目列表：[(規模, 項目, 指標, 基準值, 目前值, 比例)]
+    """
+    regressions = []
+    for size, result in current["results"].items():
+        base_cases = baseline.get("results", {}).get(size, {}).get("cases", {})
+        for name, stats in result["cases"].items():
+            base = base_cases.get(name)
+            if base is None:
+                continue
+            for metric in ("median_s", "peak_mb"):
+                if base[metric] <= 0:
+                    continue
+                ratio = stats[metric] / base[metric]
+                print(f"{size:>5} {name:<45} {metric:<9} {base[metric]:>10.4f} → {stats[metric]:>10.4f} ({ratio:.2f}x)")
+                if ratio > 1 + threshold:
+                    regressions.append((size, name, metric, base[metric], stats[metric], ratio))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="以合成資料測量各頁面資料路徑的時間與記憶體")
+    parser.add_argument("--sizes", default="1k,100k", help=f"資料規模，逗號分隔（可用：{', '.join(SIZES)}）")
+    parser.add_argument("--repeat", type=int, help="每項重複次數（預設依規模而定）")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR, help="合成資料存放位置（重複執行時沿用）")
+    parser.add_argument("--output", help="結果 JSON 路徑（預設 benchmarks/results/<時間>.json）")
+    parser.add_argument("--compare", help="與先前的結果 JSON 比較")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="視為退步的變慢比例")
+    args = parser.parse_args()
+
+    sizes = [size.strip().lower() for size in args.sizes.split(",") if size.strip()]
+    unknown = [size for size in sizes if size not in SIZES]
+    if unknown:
+        parser.error(f"未知的資料規模：{', '.join(unknown)}")
+
+    profile = load_seed_profile()
+    results = {}
+    for size in sizes:
+        location = f"synthetic_{size}"
+        print(f"📦 產生 {location}（{SIZES[size]:,} 句）")
+        n_reviews, n_sentences = generate_store(args.data_dir, location, SIZES[size], profile, seed=args.seed)
+        print(f"⏱️ 測量 {location}：{n_reviews:,} 則評論")
+        results[size] = {
+            "reviews": n_reviews,
+            "sentences": n_sentences,
+            "cases": bench_store(location, args.data_dir, args.repeat or DEFAULT_REPEATS[size]),
+        }
+
+    output = {
+        "environment": environment(),
+        "seed": args.seed,
+        "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "results": results,
+    }
+    path = args.output or os.path.join(DEFAULT_RESULTS_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}.json")
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(output, f, ensure_ascii=False, indent=2)
+    print(f"✅ 結果已儲存：{path}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare_results(baseline, output, args.threshold)
+        if regressions:
+            print(f"❌ {len(regressions)} 項退步超過 {args.threshold:.0%}")
+            sys.exit(1)
+        print("✅ 沒有明顯退步")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+基準測試用的 Streamlit 替身：所有元件都不繪製任何東西，只保留頁面邏輯需要的回傳值。
+
+st.plotly_chart 仍會將圖表序列化成 JSON（與 Streamlit 傳送到瀏覽器前的工作相同），
+讓圖表建立與序列化的成本計入頁面的資料路徑。
+"""
+import sys
+import types
+
+
+class SessionState(dict):
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __setattr__(self, name, value):
+        self[name] = value
+
+
+class _Element:
+    """
+    st.container()/st.expander()/st.columns() 回傳的元件，可當作 context manager 使用。
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __getattr__(self, name):
+        return getattr(_module, name)
+
+
+def _element(*args, **kwargs):
+    return _Element()
+
+
+def _columns(spec, *args, **kwargs):
+    count = spec if isinstance(spec, int) else len(spec)
+    return [_Element() for _ in range(count)]
+
+
+def _first_option(label, options=(), *args, **kwargs):
+    options = list(options)
+    return options[kwargs.get("index", 0)] if options else None
+
+
+def _plotly_chart(fig, *args, **kwargs):
+    fig.to_json()
+    return _Element()
+
+
+def _stub_module():
+    module = types.ModuleType("streamlit")
+    module.session_state = SessionState()
+    module.columns = _columns
+    module.selectbox = _first_option
+    module.radio = _first_option
+    module.button = lambda *args, **kwargs: False
+    module.checkbox = lambda *args, **kwargs: kwargs.get("value", False)
+    module.text_input = lambda *args, **kwargs: kwargs.get("value", "")
+    module.multiselect = lambda *args, **kwargs: list(kwargs.get("default", []))
+    module.number_input = lambda *args, **kwargs: kwargs.get("value", kwargs.get("min_value", 0))
+    module.plotly_chart = _plotly_chart
+    module.__getattr__ = lambda name: _element
+    return module
+
+
+_module = _stub_module()
+
+
+def install():
+    """
+    以替身取代 sys.modules 中的 streamlit，需在匯入 page.* 之前呼叫。
+
+    Returns:
+        替身模組（可透過 session_state 設定目前的資料集）
+    """
+    sys.modules["streamlit"] = _module
+    return _module
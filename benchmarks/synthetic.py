@@ -0,0 +1,150 @@
+"""
+合成繁體中文評論資料產生器。
+
+以 data/ 中的真實店家資料與 userdict.txt 建立分布（詞頻、每句詞數、每則評論句數、
+評分、主題、情感分數），再依分布產生與真實資料相同欄位的 <店名>_reviews.csv 與 <店名>.csv。
+大型資料以固定大小的區塊寫出，產生 10M 句時不需一次放進記憶體。
+"""
+import glob
+import os
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+SIZES = {"1k": 1_000, "100k": 100_000, "10m": 10_000_000}
+_CHUNK_SENTENCES = 500_000
+
+
+@dataclass
+class SeedProfile:
+    vocabulary: np.ndarray
+    token_probs: np.ndarray
+    tokens_per_sentence: np.ndarray
+    sentences_per_review: np.ndarray
+    ratings: np.ndarray
+    rating_probs: np.ndarray
+    labels: np.ndarray
+    label_probs: np.ndarray
+    sentiment_scores: np.ndarray
+
+
+def _empirical(values):
+    counts = pd.Series(values).value_counts(sort=False)
+    return counts.index.to_numpy(), (counts / counts.sum()).to_numpy()
+
+
+def load_seed_profile(folder="data", userdict_path="userdict.txt"):
+    """
+    由內建店家資料與使用者字典建立產生器使用的分布。
+    """
+    sentence_tables = []
+    for reviews_path in sorted(glob.glob(os.path.join(folder, "*_reviews.csv"))):
+        sentences_path = reviews_path[: -len("_reviews.csv")] + ".csv"
+        if os.path.exists(sentences_path):
+            sentence_tables.append(pd.read_csv(sentences_path))
+    df = pd.concat(sentence_tables, ignore_index=True)
+
+    tokens = df["word"].fillna("").str.split()
+    token_counts = tokens.explode().dropna().value_counts()
+    # 使用者字典中的詞至少給予最低頻率，讓店家專有名詞也會出現
+    if os.path.exists(userdict_path):
+        with open(userdict_path, encoding="utf-8") as f:
+            user_words = [line.split()[0] for line in f if line.strip()]
+        missing = [w for w in user_words if w not in token_counts.index]
+        token_counts = pd.concat([token_counts, pd.Series(1, index=missing)])
+
+    reviews = df.drop_duplicates(["text", "index"])
+    ratings, rating_probs = _empirical(reviews["rating"])
+    labels, label_probs = _empirical(df["label"])
+    return SeedProfile(
+        vocabulary=token_counts.index.to_numpy(dtype=object),
+        token_probs=(token_counts / token_counts.sum()).to_numpy(),
+        tokens_per_sentence=np.maximum(tokens.str.len().to_numpy(), 1),
+        sentences_per_review=df.groupby(["text", "index"]).size().to_numpy(),
+        ratings=ratings,
+        rating_probs=rating_probs,
+        labels=labels,
+        label_probs=label_probs,
+        sentiment_scores=df["sentiment_score"].to_numpy(),
+    )
+
+
+def _generate_chunk(profile, rng, n_sentences, first_review, restaurant):
+    # 先決定評論數與每則評論的句數，再產生句子
+    per_review = rng.choice(profile.sentences_per_review, size=n_sentences)
+    per_review = per_review[np.cumsum(per_review) <= n_sentences]
+    remainder = n_sentences - per_review.sum()
+    if remainder:
+        per_review = np.append(per_review, remainder)
+    n_reviews = len(per_review)
+    review_of_sentence = np.repeat(np.arange(n_reviews), per_review)
+
+    lengths = rng.choice(profile.tokens_per_sentence, size=n_sentences)
+    token_ids = rng.choice(len(profile.vocabulary), size=int(lengths.sum()), p=profile.token_probs)
+    tokens = profile.vocabulary[token_ids]
+    bounds = np.concatenate([[0], np.cumsum(lengths)])
+    words = [" ".join(tokens[bounds[i]:bounds[i + 1]]) for i in range(n_sentences)]
+    sentences = [w.replace(" ", "") for w in words]
+
+    review_bounds = np.concatenate([[0], np.cumsum(per_review)])
+    texts = ["，".join(sentences[review_bounds[i]:review_bounds[i + 1]]) + "。" for i in range(n_reviews)]
+    ratings = rng.choice(profile.ratings, size=n_reviews, p=profile.rating_probs)
+    scores = rng.choice(profile.sentiment_scores, size=n_sentences)
+
+    df_reviews = pd.DataFrame({
+        "Restaurant Name": restaurant,
+        "Overall Rating": round(float(np.dot(profile.ratings, profile.rating_probs)), 1),
+        "Review Count": n_reviews * 10,
+        "Review": texts,
+        "Review Rating": ratings,
+    })
+    df = pd.DataFrame({
+        "text": np.asarray(texts, dtype=object)[review_of_sentence],
+        "rating": ratings[review_of_sentence],
+        "sentence": sentences,
+        "word": words,
+        "label": rng.choice(profile.labels, size=n_sentences, p=profile.label_probs),
+        "keyword": "",
+        "index": review_of_sentence + first_review,
+        "sentiment_score": scores,
+        "sentiment": np.where(scores > 0.5, "正面", "負面"),
+    })
+    return df_reviews, df
+
+
+def generate_store(folder, location, n_sentences, profile, seed=0):
+    """
+    產生 n_sentences 句的合成店家，寫出 data 格式的兩個 CSV。
+    已存在相同大小的檔案時直接沿用。
+
+    Returns:
+        (評論數, 句子數)
+    """
+    os.makedirs(folder, exist_ok=True)
+    reviews_path = os.path.join(folder, f"{location}_reviews.csv")
+    sentences_path = os.path.join(folder, f"{location}.csv")
+    marker = os.path.join(folder, f"{location}.generated")
+    if os.path.exists(marker):
+        with open(marker, encoding="utf-8") as f:
+            n_reviews, n_done = map(int, f.read().split())
+        if n_done == n_sentences:
+            return n_reviews, n_sentences
+
+    rng = np.random.default_rng(seed)
+    n_reviews = 0
+    written = 0
+    while written < n_sentences:
+        size = min(_CHUNK_SENTENCES, n_sentences - written)
+        df_reviews, df = _generate_chunk(profile, rng, size, n_reviews + 1, location)
+        df_reviews.index += n_reviews
+        df.index += written
+        mode, header = ("w", True) if written == 0 else ("a", False)
+        df_reviews.to_csv(reviews_path, mode=mode, header=header)
+        df.to_csv(sentences_path, mode=mode, header=header)
+        n_reviews += len(df_reviews)
+        written += size
+
+    with open(marker, "w", encoding="utf-8") as f:
+        f.write(f"{n_reviews} {n_sentences}")
+    return n_reviews, n_sentences
@@ -0,0 +1,312 @@
+import argparse
+import html
+import json
+import os
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from urllib.parse import quote
+
+import plotly.io as pio
+from plotly.offline import get_plotlyjs
+
+from utils.aggregates import aggregate_version, compute_aggregates, read_aggregates
+from utils.analytics import keyword_sentences, keyword_view, rating_view, summary_view, topic_view
+from utils.data_loader import read_store_data
+from utils.figures import build_figure, figure_specs
+from utils.keyword_index import build_keyword_index
+from utils.store_catalog import StoreCatalog, refresh_catalog
+from utils.store_format import ANALYSIS_SENTENCE_COLUMNS
+
+# 報表格式版本，版面或內容變更時遞增（所有店家會重新匯出）
+REPORT_VERSION = 1
+MANIFEST_FILENAME = "manifest.json"
+# 每完成幾家店寫回一次 manifest，中斷後重新執行只需補上最後未寫入的少數店家
+MANIFEST_FLUSH_EVERY = 10
+PLOTLY_JS_FILENAME = "plotly.min.js"
+SAMPLE_SENTENCES = 5
+
+_STYLE = """
+body { font-family: "Noto Sans TC", "PingFang TC", "Microsoft JhengHei", sans-serif; margin: 2em auto; max-width: 1100px; color: #222; }
+h1 { border-bottom: 3px solid #007BFF; padding-bottom: .3em; }
+table { border-collapse: collapse; width: 100%; }
+th, td { border-bottom: 1px solid #ddd; padding: .4em .6em; text-align: left; }
+.metrics { display: flex; gap: 2em; flex-wrap: wrap; }
+.metric { background: #fafafa; border-radius: 8px; padding: .8em 1.2em; }
+.metric b { display: block; font-size: 1.6em; }
+.warning { background: #fff3cd; padding: .6em 1em; border-radius: 6px; }
+.info { background: #e7f1ff; padding: .6em 1em; border-radius: 6px; }
+.topic { display: flex; gap: 2em; flex-wrap: wrap; }
+.topic > div { flex: 1 1 400px; }
+"""
+
+
+def _page(title, body):
+    return (
+        "<!DOCTYPE html>\n<html lang=\"zh-Hant\">\n<head>\n<meta charset=\"utf-8\">\n"
+        f"<title>{html.escape(title)}</title>\n<style>{_STYLE}</style>\n"
+        f"<script src=\"{PLOTLY_JS_FILENAME}\"></script>\n</head>\n<body>\n{body}\n</body>\n</html>\n"
+    )
+
+
+def _figure_html(fig):
+    return pio.to_html(fig, include_plotlyjs=False, full_html=False, config={"displayModeBar": False})
+
+
+def _sentence_list(sentences):
+    if not sentences:
+        return "<p>目前沒有符合的留言。</p>"
+    return "<ul>" + "".join(f"<li>{html.escape(s)}</li>" for s in sentences) + "</ul>"
+
+
+def build_report(location, folder="data"):
+    """
+    產生單一店家的報表內容。
+
+    Returns:
+        (報表資料 dict, HTML 字串)
+    """
+    df_reviews, df = read_store_data(location, folder, sentence_columns=ANALYSIS_SENTENCE_COLUMNS)
+    aggregates = read_aggregates(location, folder) or compute_aggregates(df_reviews, df)
+    keyword_index = build_keyword_index(df)
+
+    summary = summary_view(aggregates)
+    keywords = keyword_view(aggregates, keyword_index)
+    topics = topic_view(aggregates)
+    # 報表需可重現，因此取前幾句而非隨機抽樣
+    for term in keywords["discussed_terms"]:
+        term["examples"] = keyword_sentences(df, keyword_index, term["word"], SAMPLE_SENTENCES)["sentences"]
+    for topic in topics["topics"]:
+        sentences = df.loc[df["label"] == topic["topic"], "sentence"].drop_duplicates()
+        topic["examples"] = sentences.head(SAMPLE_SENTENCES).tolist()
+
+    data = {
+        "location": location,
+        "summary": summary,
+        "ratings": rating_view(aggregates),
+        "keywords": keywords,
+        "topics": topics,
+    }
+    figures = {(kind, params.get("topic")): build_figure(aggregates, kind, params) for kind, params in figure_specs(aggregates)}
+
+    checkin = (
+        "<p class=\"warning\">📌 留言中多次出現「打卡」或「送」等詞彙，店家可能提供優惠以提升評分。</p>"
+        if summary["checkin_suspected"] else "<p class=\"info\">📌 留言中「沒有」明顯的打卡活動。</p>"
+    )
+    metrics = "".join(
+        f"<div class=\"metric\">{label}<b>{value}</b></div>"
+        for label, value in [
+            ("Google Map 所有留言評分", summary["overall_rating"]),
+            ("抓取留言平均得分", summary["mean_rating"]),
+            ("Google Map 所有留言數", summary["review_count"]),
+            ("抓取留言數", summary["scraped_review_count"]),
+        ]
+    )
+    parts = [
+        "<p><a href=\"index.html\">← 所有店家</a></p>",
+        f"<h1>🍴 {html.escape(summary['restaurant_name'])}</h1>",
+        "<h2>📊 評論摘要</h2>",
+        f"<div class=\"metrics\">{metrics}</div>",
+        f"<p>在已抓取的 <b>{summary['scraped_review_count']}</b> 條留言中，平均得分為 <b>{summary['mean_rating']}</b>，"
+        f"和 Google Map 上的整體評分(<b>{summary['overall_rating']}</b>)相比{summary['comparison']}。"
+        f"{html.escape(summary['interpretation'])}</p>",
+        "<h3>🔍 打卡活動偵測</h3>",
+        checkin,
+        "<h2>⭐ 評分分析</h2>",
+        _figure_html(figures[("rating_distribution", None)]),
+        "<h2>🔥 關鍵詞分析</h2>",
+    ]
+    if ("top_keywords", None) in figures:
+        parts.append(_figure_html(figures[("top_keywords", None)]))
+    for term in keywords["discussed_terms"]:
+        parts.append(f"<h4>🔹 {html.escape(term['word'])}（{term['sentences']} 句）</h4>")
+        parts.append(_sentence_list(term["examples"]))
+    parts.append("<h2>📝 主題分析</h2>")
+    parts.append(_figure_html(figures[("review_topics", None)]))
+    for topic in topics["topics"]:
+        chart = figures.get(("topic_terms", topic["topic"]))
+        parts.append(f"<h3>📌 {html.escape(topic['topic'])} 的討論（{topic['sentences']} 句）</h3>")
+        parts.append(
+            "<div class=\"topic\"><div>" + _sentence_list(topic["examples"]) + "</div><div>"
+            + (_figure_html(chart) if chart is not None else "<p>目前沒有足夠的詞語來生成詞頻圖。</p>")
+            + "</div></div>"
+        )
+    return data, _page(f"{summary['restaurant_name']} 評論分析報表", "\n".join(parts))
+
+
+def report_filename(location):
+    return f"{location}.html"
+
+
+def export_store(location, folder, out_dir):
+    """
+    匯出單一店家的 HTML 與 JSON 報表（在工作程序中執行）。
+    """
+    started = time.perf_counter()
+    signature = aggregate_version(location, folder)
+    data, page = build_report(location, folder)
+
+    for filename, content in [
+        (report_filename(location), page),
+        (f"{location}.json", json.dumps(data, ensure_ascii=False, indent=1)),
+    ]:
+        path = os.path.join(out_dir, filename)
+        with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(f"{path}.tmp", path)
+
+    return {
+        "location": location,
+        "source_signature": signature,
+        "report_version": REPORT_VERSION,
+        "exported": time.time(),
+        "seconds": time.perf_counter() - started,
+        "summary": data["summary"],
+    }
+
+
+def read_manifest(out_dir):
+    try:
+        with open(os.path.join(out_dir, MANIFEST_FILENAME), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_manifest(out_dir, manifest):
+    path = os.path.join(out_dir, MANIFEST_FILENAME)
+    with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+    os.replace(f"{path}.tmp", path)
+
+
+def is_report_current(entry, location, folder, out_dir):
+    """
+    店家資料、規則設定檔與報表格式都未變動，且報表檔存在時，不需重新匯出。
+    """
+    return (
+        entry is not None
+        and entry.get("report_version") == REPORT_VERSION
+        and entry.get("source_signature") == aggregate_version(location, folder)
+        and os.path.exists(os.path.join(out_dir, report_filename(location)))
+    )
+
+
+def write_index(out_dir, manifest):
+    rows = []
+    for location, entry in sorted(manifest.items(), key=lambda item: -(item[1]["summary"]["review_count"] or 0)):
+        summary = entry["summary"]
+        rows.append(
+            "<tr>"
+            f"<td><a href=\"{quote(report_filename(location))}\">{html.escape(summary['restaurant_name'])}</a></td>"
+            f"<td>{summary['overall_rating']}</td><td>{summary['mean_rating']}</td>"
+            f"<td>{summary['review_count']}</td><td>{summary['scraped_review_count']}</td>"
+            f"<td>{'⚠️' if summary['checkin_suspected'] else ''}</td>"
+            f"<td>{time.strftime('%Y-%m-%d %H:%M', time.localtime(entry['exported']))}</td>"
+            "</tr>"
+        )
+    body = (
+        "<h1>📈 Google Map 餐廳評論分析報表</h1>"
+        f"<p>共 {len(manifest)} 家店</p>"
+        "<table><tr><th>店家</th><th>Google Map 評分</th><th>抓取平均</th><th>Google Map 留言數</th>"
+        "<th>抓取留言數</th><th>打卡活動</th><th>產生時間</th></tr>"
+        + "".join(rows) + "</table>"
+    )
+    with open(os.path.join(out_dir, "index.html"), "w", encoding="utf-8") as f:
+        f.write(_page("評論分析報表", body))
+
+
+def export_reports(stores, folder="data", out_dir="reports", workers=None, force=False):
+    """
+    以程序池匯出多家店的報表，略過資料未變動的店家，最後更新索引頁。
+
+    Returns:
+        統計資料（匯出、略過、失敗數與耗時）
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    js_path = os.path.join(out_dir, PLOTLY_JS_FILENAME)
+    if not os.path.exists(js_path):
+        # 所有報表共用同一份 plotly.js，離線即可開啟
+        with open(js_path, "w", encoding="utf-8") as f:
+            f.write(get_plotlyjs())
+
+    manifest = read_manifest(out_dir)
+    pending = [s for s in stores if force or not is_report_current(manifest.get(s), s, folder, out_dir)]
+    stats = {"stores": len(stores), "exported": 0, "skipped": len(stores) - len(pending),
+             "failed": {}, "store_seconds": 0.0}
+    started = time.perf_counter()
+
+    unsaved = 0
+    try:
+        if pending:
+            max_in_flight = (workers or os.cpu_count() or 1) * 2
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                queue = iter(pending)
+                in_flight = {}
+                while True:
+                    while len(in_flight) < max_in_flight:
+                        location = next(queue, None)
+                        if location is None:
+                            break
+                        in_flight[executor.submit(export_store, location, folder, out_dir)] = location
+                    if not in_flight:
+                        break
+
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        location = in_flight.pop(future)
+                        try:
+                            entry = future.result()
+                        except Exception as e:
+                            stats["failed"][location] = "".join(traceback.format_exception_only(type(e), e)).strip()
+                            print(f"❌ {location}: {stats['failed'][location]}")
+                            continue
+                        manifest[location] = entry
+                        stats["exported"] += 1
+                        stats["store_seconds"] += entry["seconds"]
+                        print(f"✅ {location}（{entry['seconds']:.1f} 秒）")
+                        unsaved += 1
+                        if unsaved >= MANIFEST_FLUSH_EVERY:
+                            write_manifest(out_dir, manifest)
+                            unsaved = 0
+    finally:
+        # 中斷（例如 Ctrl+C）時也保留已完成的店家
+        if unsaved:
+            write_manifest(out_dir, manifest)
+
+    write_index(out_dir, manifest)
+    stats["elapsed"] = time.perf_counter() - started
+    return stats
+
+
+def report(stats):
+    elapsed = max(stats["elapsed"], 1e-9)
+    print(f"📦 店家 {stats['stores']}：匯出 {stats['exported']}，略過 {stats['skipped']}（未變動），"
+          f"失敗 {len(stats['failed'])}")
+    print(f"⏱️ 總耗時 {stats['elapsed']:.1f} 秒（{stats['exported'] / elapsed:.2f} 家/秒，"
+          f"單店平均 {stats['store_seconds'] / max(stats['exported'], 1):.2f} 秒）")
+    for location, error in stats["failed"].items():
+        print(f"   - {location}: {error}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="批次匯出店家評論分析報表（HTML + JSON）")
+    parser.add_argument("stores", nargs="*", help="店名，未指定時匯出店家目錄中所有店家")
+    parser.add_argument("--folder", default="data")
+    parser.add_argument("--out", default="reports", help="報表輸出資料夾")
+    parser.add_argument("--limit", type=int, help="只匯出留言數最多的前 N 家店")
+    parser.add_argument("--workers", type=int, default=None, help="工作程序數，預設為 CPU 核心數")
+    parser.add_argument("--force", action="store_true", help="忽略既有報表全部重新匯出")
+    args = parser.parse_args()
+
+    stores = args.stores or [entry["location"] for entry in StoreCatalog(refresh_catalog(args.folder)).processed()]
+    if args.limit:
+        stores = stores[:args.limit]
+    stats = export_reports(stores, args.folder, args.out, args.workers, args.force)
+    report(stats)
+    if stats["failed"]:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+import streamlit as st
+from utils.comparison import STORE_METRICS, get_comparison_table
+from utils.figures import comparison_ranking_figure, comparison_topics_figure, figure_cache
+from utils.profiler import span, traced
+
+KIND_OPTIONS = {"主題占比": "label", "星級占比": "rating", "熱門詞": "term", "店家指標": "store"}
+_PERCENT_METRICS = {"checkin_share"}
+_CHART_CONFIG = {"scrollZoom": False, "displayModeBar": False, "doubleClick": False, "showTips": False}
+
+
+def metric_title(kind, key):
+    """
+    指標的顯示名稱。
+    """
+    if kind == "label":
+        return f"「{key}」句子占比"
+    if kind == "rating":
+        return f"{key} 星留言占比"
+    if kind == "term":
+        return f"「{key}」每百句出現次數"
+    return STORE_METRICS.get(key, key)
+
+
+def _display_values(kind, key, values):
+    # 占比以百分比顯示，熱門詞換算為每百句次數
+    if kind in ("label", "rating") or key in _PERCENT_METRICS:
+        return values.map(lambda value: f"{value:.1%}")
+    if kind == "term":
+        return (values * 100).round(1)
+    return values.round(2)
+
+
+def select_metric(comparison, prefix, default_kind="label", default_key="服務"):
+    """
+    指標選擇器（種類 + 項目），回傳 (kind, key)。
+    """
+    kinds = list(KIND_OPTIONS)
+    kind = KIND_OPTIONS[st.radio(
+        "指標種類", kinds, index=list(KIND_OPTIONS.values()).index(default_kind), horizontal=True, key=f"{prefix}_kind"
+    )]
+    keys = comparison.keys(kind)
+    if not keys:
+        return kind, None
+    index = keys.index(default_key) if default_key in keys else 0
+    labels = {key: metric_title(kind, key) if kind == "store" else key for key in keys}
+    key = st.selectbox("指標", keys, index=index, format_func=labels.get, key=f"{prefix}_key")
+    return kind, key
+
+
+@traced("display.comparison_ranking")
+def display_ranking(comparison, kind, key, ascending, limit, mask):
+    """
+    顯示跨店家排名表與橫條圖，回傳排名 DataFrame。
+    """
+    ranking = comparison.rank(kind, key, ascending=ascending, limit=limit, mask=mask)
+    title = metric_title(kind, key)
+    if ranking.empty:
+        st.info("📌 沒有符合條件的店家。")
+        return ranking
+
+    table = ranking.rename(columns={
+        "rank": "名次",
+        "value": title,
+        "count": "次數",
+        "scraped_review_count": "抓取留言數",
+        "mean_rating": "抓取平均",
+        "overall_rating": "Google 評分",
+    })
+    table[title] = _display_values(kind, key, ranking["value"])
+    table["抓取留言數"] = ranking["scraped_review_count"].astype(int)
+    table["抓取平均"] = ranking["mean_rating"].round(2)
+    st.dataframe(table, use_container_width=True)
+    if kind == "term":
+        st.caption("熱門詞只記錄各店前 10 名，未列入的店家不參與排名。")
+
+    top = ranking.head(20)
+    fig = figure_cache.cached(
+        ("comparison_ranking", title, tuple(top.index), tuple(top["value"].round(6))),
+        lambda: comparison_ranking_figure(top, title),
+    )
+    with span("st.plotly_chart"):
+        st.plotly_chart(fig, use_container_width=True, config=_CHART_CONFIG)
+    return ranking
+
+
+@traced("display.comparison_side_by_side")
+def display_side_by_side(comparison, locations):
+    """
+    並排比較多家店的店家指標、主題占比與星級占比。
+    """
+    summary = comparison.summary.loc[locations].T
+    summary.index = [STORE_METRICS[name] for name in summary.index]
+    st.markdown("###### 🏪 店家指標")
+    st.dataframe(summary.round(2), use_container_width=True)
+
+    topics = comparison.side_by_side(locations, "label")
+    st.markdown("###### 💬 主題占比")
+    st.dataframe(topics.rename_axis("評論主題").map(lambda value: f"{value:.1%}"), use_container_width=True)
+    fig = figure_cache.cached(
+        ("comparison_topics", tuple(topics.columns), tuple(topics.index), tuple(topics.to_numpy().round(6).ravel())),
+        lambda: comparison_topics_figure(topics),
+    )
+    with span("st.plotly_chart"):
+        st.plotly_chart(fig, use_container_width=True, config=_CHART_CONFIG)
+
+    ratings = comparison.side_by_side(locations, "rating")
+    st.markdown("###### ⭐ 星級占比")
+    st.dataframe(ratings.rename_axis("星級").map(lambda value: f"{value:.1%}"), use_container_width=True)
+
+
+@traced("page.comparison")
+def show_comparison_page():
+    """
+    顯示跨店家比較頁面（資料皆取自各店彙總檔整理成的比較表，不載入句子資料）
+    """
+    st.subheader("🏆 跨店家比較")
+    comparison = get_comparison_table()
+    if comparison.missing:
+        st.caption(f"⚠️ {len(comparison.missing)} 家店沒有有效的彙總檔，未列入比較（可執行 python -m utils.aggregates）。")
+    if len(comparison) == 0:
+        st.warning("⚠️ 沒有可比較的店家。")
+        return
+    st.write(f"共 **{len(comparison)}** 家店。選擇指標查看排名，或挑選店家並排比較。")
+
+    kind, key = select_metric(comparison, "rank")
+    if key is None:
+        st.info("📌 沒有此類指標的資料。")
+        return
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        order = st.radio("排序", ["由高到低", "由低到高"], horizontal=True)
+    with col2:
+        min_reviews = st.number_input("最少抓取留言數", min_value=0, value=0, step=10)
+    with col3:
+        limit = st.number_input("顯示店家數", min_value=5, max_value=500, value=20, step=5)
+    query = st.text_input("店名包含", value="", placeholder="例如：台大")
+
+    conditions = []
+    with st.expander("進階篩選"):
+        use_condition = st.checkbox("只列出符合條件的店家")
+        if use_condition:
+            filter_kind, filter_key = select_metric(comparison, "filter", "store", "rating_gap")
+            col1, col2 = st.columns(2)
+            with col1:
+                operator = st.selectbox("條件", [">=", "<=", ">", "<"])
+            with col2:
+                threshold = st.number_input("門檻（占比以小數表示，例如 0.2）", value=0.0, step=0.05)
+            if filter_key is not None:
+                conditions.append((filter_kind, filter_key, operator, threshold))
+
+    mask = comparison.mask(query=query.strip(), min_reviews=int(min_reviews), conditions=conditions)
+    ranking = display_ranking(comparison, kind, key, order == "由低到高", int(limit), mask)
+
+    st.markdown("---")
+    st.markdown("#### 🔀 並排比較")
+    locations = st.multiselect("選擇店家", comparison.locations, default=list(ranking.index[:3]))
+    if locations:
+        display_side_by_side(comparison, locations)
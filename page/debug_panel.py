@@ -0,0 +1,26 @@
+import streamlit as st
+import pandas as pd
+from utils import profiler
+
+def show_debug_panel(run):
+    """
+    顯示本次 rerun 各區段的耗時，以及全程序（所有 session）的 p50/p95 彙總。
+
+    只在設定環境變數 REVIEW_PROFILE 時顯示。
+    """
+    with st.expander("⏱️ 效能紀錄（除錯用）"):
+        st.markdown("###### 本次執行")
+        spans = pd.DataFrame([
+            {
+                "區段": "　" * s["depth"] + s["name"],
+                "耗時 (ms)": round(s["ms"], 1),
+                **({"配置 (KB)": round(s["alloc_kb"], 1)} if "alloc_kb" in s else {}),
+            }
+            for s in run.to_dict()["spans"]
+        ])
+        st.dataframe(spans, hide_index=True, use_container_width=True)
+
+        st.markdown("###### 全程序彙總")
+        summary = pd.DataFrame(profiler.stats.summary())
+        if not summary.empty:
+            st.dataframe(summary.round(1), hide_index=True, use_container_width=True)
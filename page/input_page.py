@@ -1,6 +1,14 @@
 import streamlit as st
-from utils.data_loader import load_store_data
+from utils.data_loader import open_store, resolve_store
+from utils.profiler import traced
+from utils.state_management import check_data_availability
+from utils.store_catalog import get_store_catalog
+from utils.store_format import ANALYSIS_SENTENCE_COLUMNS
 
+# 店家選單每頁顯示的店家數
+STORE_PAGE_SIZE = 20
+
+@traced("page.input")
 def show_input_page():
     """
     顯示標題、輸入欄位及分析按鈕，並在按下按鈕後進行評論抓取及分析。
@@ -14,13 +22,32 @@ def show_input_page():
         st.subheader("1️⃣ 請選擇店家🍽️")
         col1, col2 = st.columns([0.05, 0.95])
         with col2:
-            store_list = ["阜杭豆漿", "小木屋鬆餅(台大店)", "Juicy Bun Burger 就是棒 美式餐廳 政大店"]
-            location = st.radio(
-                "",
-                store_list,
-                index=0,
-                horizontal=True
-            )
+            # 店家清單來自目錄檔，選定店家前不會讀取或 stat 任何店家檔案；
+            # 處理流程與 collector 完成後會更新目錄，也可手動重新掃描資料夾
+            refresh = st.button("🔄 更新目錄", help="重新掃描資料夾，加入新增或變動的店家")
+            catalog = get_store_catalog(refresh=refresh)
+            query = st.text_input("🔍 搜尋店家", placeholder="輸入店名關鍵字")
+            _, total = catalog.search(query, page_size=0)
+            pages = max(1, -(-total // STORE_PAGE_SIZE))
+            page = 1
+            if pages > 1:
+                page = st.number_input(f"頁數（共 {pages} 頁、{total} 家店）", min_value=1, max_value=pages, value=1)
+            entries, _ = catalog.search(query, page - 1, STORE_PAGE_SIZE)
+
+            store_list = [entry["location"] for entry in entries]
+            # 只有評論表、尚未處理成句子表的店家仍列出，但加上標示
+            pending = {entry["location"] for entry in entries if not entry.get("processed", True)}
+            if store_list:
+                location = st.radio(
+                    "",
+                    store_list,
+                    index=0,
+                    format_func=lambda name: f"{name}（尚未處理）" if name in pending else name,
+                    horizontal=True
+                )
+            else:
+                st.info("找不到符合的店家。")
+                location = None
 
     st.markdown("---")
 
@@ -29,17 +56,22 @@ def show_input_page():
         if location:
             with st.spinner("⏳"):
                 # 根據使用者選擇讀取資料
-                df_reviews, df = load_store_data(location)
+                try:
+                    handle = open_store(location, sentence_columns=ANALYSIS_SENTENCE_COLUMNS)
+                    df_reviews, df = resolve_store(handle)
+                except FileNotFoundError:
+                    handle, df = None, None
 
                 # 結果處理
-                if df is None or df.empty:
+                if handle is None:
+                    st.error("❌ 這家店還沒有句子表，請先執行 python process_reviews.py 處理評論。")
+                elif df is None or df.empty:
                     st.error("❌ 無法獲取資料，請確認輸入店家名稱是否正確。")
                 else:
                     st.success("✅ 分析完成！")
 
-                    # 將抓取到的結果儲存到 session_state
-                    st.session_state.df_reviews = df_reviews
-                    st.session_state.df = df
+                    # 將資料代號儲存到 session_state（資料本身由程序共用快取保存）
+                    st.session_state.dataset = handle
                     
                     # 顯示導引
                     st.info("📊 請點擊上方選單查看不同分析結果：")
@@ -54,6 +86,6 @@ def show_input_page():
                 st.warning("⚠️ **請輸入店家名稱！**")
     
     # 如果已有資料，顯示提示
-    elif 'df_reviews' in st.session_state and st.session_state.df_reviews is not None:
-        st.success(f"✅ 已完成分析：{st.session_state.df_reviews.iloc[0]['Restaurant Name']}")
+    elif check_data_availability() is not None:
+        st.success(f"✅ 已完成分析：{check_data_availability().iloc[0]['Restaurant Name']}")
         st.info("📊 您可以點擊上方選單查看不同分析結果，或輸入新的店家名稱重新分析。")
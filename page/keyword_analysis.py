@@ -1,52 +1,37 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-import random
-from collections import Counter
-from utils.state_management import check_data_availability
+from utils.keyword_index import get_keyword_index
+from utils.aggregates import get_store_aggregates
+from utils.figures import get_figure, top_keywords
+from utils.profiler import span, traced
+from utils.state_management import check_data_availability, current_dataset, next_examples, session_examples
 
-def plot_top_keywords(df):
+@traced("plot.top_keywords")
+def plot_top_keywords(aggregates, handle=None):
     """
-    繪製熱門關鍵詞長條圖。
+    繪製熱門關鍵詞長條圖（圖表由程序共用快取提供）。
     """
     st.subheader("🔥 前 10 大熱門關鍵詞")
 
-    all_words = df["word"].dropna().str.split().explode()
-    filtered_words = [word for word in all_words if isinstance(word, str) and len(word) > 1]
-    word_counts = Counter(filtered_words)
-
-    top_words = word_counts.most_common(10)
-    if top_words:
-        df_top_words = pd.DataFrame(top_words, columns=["熱門關鍵詞", "討論聲量"])
-        fig = px.bar(
-            df_top_words,
-            x="熱門關鍵詞",
-            y="討論聲量",
-            text="討論聲量",
-            color="討論聲量",
-            color_continuous_scale="Blugrn"
-        )
-        fig.update_traces(textposition="outside")
-        fig.update_layout(
-            plot_bgcolor="white",
-            font=dict(size=14),
-            width=600,
-            height=450,
-            margin=dict(t=40, b=50, l=50, r=30),
-            showlegend=False,
-            dragmode=False
-        )
-        st.plotly_chart(fig, use_container_width=False, 
-                        config={"scrollZoom": False, "displayModeBar": False,
-                                "doubleClick": False, "showTips": False})
+    if aggregates["top_terms"]:
+        df_top_words = top_keywords(aggregates)
+        fig = get_figure(handle, aggregates, "top_keywords")
+        with span("st.plotly_chart"):
+            st.plotly_chart(fig, use_container_width=False, 
+                            config={"scrollZoom": False, "displayModeBar": False,
+                                    "doubleClick": False, "showTips": False})
+        if "approximate" in aggregates:
+            guarantee = aggregates["approximate"]["top_terms"]
+            st.caption(f"詞頻為近似值：實際次數最多比圖中多 {guarantee['max_error']:,} 次"
+                       f"（總詞數 {guarantee['total']:,}）")
         return df_top_words
 
     return None
 
 
-def display_sentences_with_top_words(df, df_top_words):
+@traced("display.sentences_with_top_words")
+def display_sentences_with_top_words(df, df_top_words, keyword_index):
     """
-    顯示包含前幾大熱門關鍵詞的句子。
+    顯示包含前幾大熱門關鍵詞的句子，並可選擇任一關鍵詞查看相關句子。
     """
     if df_top_words is None or df_top_words.empty:
         st.warning("沒有熱門關鍵詞可供篩選句子。")
@@ -56,12 +41,10 @@ def display_sentences_with_top_words(df, df_top_words):
     selected_sentences = {}
 
     for word in top_words:
-        matched_sentences = df[df["sentence"].str.contains(word, na=False, case=False)]["sentence"].unique()
-        if len(matched_sentences) > 4:
-            selected_sentences[word] = random.sample(
-                list(matched_sentences),
-                min(5, len(matched_sentences))
-            )
+        if keyword_index.document_frequency(word) > 4:
+            # 關鍵詞的倒排索引即為抽樣池（已去除重複句子）
+            sentence_ids = session_examples(keyword_index.sentence_ids(word), ("keyword", word), 5)
+            selected_sentences[word] = df["sentence"].iloc[sentence_ids].tolist()
 
     st.markdown("###### 熱門關鍵詞的討論內容：")
     st.write("(未顯示代表留言數太少無法分析)")
@@ -72,7 +55,22 @@ def display_sentences_with_top_words(df, df_top_words):
             for sentence in sentences:
                 st.markdown(f"  👉 {sentence}")
 
+    st.markdown("---")
+    st.markdown("###### 🔎 查看任一關鍵詞的討論內容：")
+    frequencies = keyword_index.document_frequencies()
+    frequencies = frequencies[frequencies.index.str.len() > 1]
+    word = st.selectbox(
+        "選擇關鍵詞",
+        frequencies.index.tolist(),
+        format_func=lambda w: f"{w}（{frequencies[w]} 句）",
+    )
+    if word:
+        for sentence in df["sentence"].iloc[session_examples(keyword_index.sentence_ids(word), ("keyword", word), 5)]:
+            st.markdown(f"  👉 {sentence}")
+        st.button("🔄 換一批", key="keyword_next", on_click=next_examples, args=(("keyword", word), 5))
+
 
+@traced("page.keyword_analysis")
 def show_keyword_analysis():
     """
     顯示關鍵詞分析頁面
@@ -85,9 +83,9 @@ def show_keyword_analysis():
 
     if df is not None:
         st.markdown(f"##### 🍴 {df_reviews.iloc[0]['Restaurant Name']} 🥂")
-        df_top_words = plot_top_keywords(df)
+        df_top_words = plot_top_keywords(get_store_aggregates(current_dataset()), current_dataset())
         st.markdown("---")
-        display_sentences_with_top_words(df, df_top_words)
+        display_sentences_with_top_words(df, df_top_words, get_keyword_index(current_dataset()))
     else:
         st.warning("⚠️ 尚未取得評論資料，請先前往「評論輸入」頁面進行分析。")
         
@@ -1,96 +1,61 @@
 import streamlit as st
-import plotly.express as px
-import pandas as pd
-from utils.state_management import check_data_availability
+from utils.aggregates import get_store_aggregates
+from utils.figures import get_figure, rating_counts
+from utils.profiler import span, traced
+from utils.sampling import get_sample_pools
+from utils.state_management import check_data_availability, current_dataset, next_examples, session_examples
 
-def plot_rating_distribution(df_reviews):
+@traced("plot.rating_distribution")
+def plot_rating_distribution(aggregates, handle=None):
     """
-    繪製留言評分分布圖。
+    繪製留言評分分布圖（圖表由程序共用快取提供）。
     """
     st.subheader("📊 留言評分分布")
-    st.write(f"（此為抓取的 {len(df_reviews)} 則留言評分，而非 Google Map 上所有留言評分）")
+    st.write(f"（此為抓取的 {aggregates['scraped_review_count']} 則留言評分，而非 Google Map 上所有留言評分）")
 
-    star_counts = df_reviews["Review Rating"].value_counts().sort_index()
+    fig = get_figure(handle, aggregates, "rating_distribution")
+    with span("st.plotly_chart"):
+        st.plotly_chart(fig, use_container_width=False, 
+                        config={"scrollZoom": False, "displayModeBar": False,
+                                "doubleClick": False, "showTips": False})
+    return rating_counts(aggregates)
 
-    # 轉換為 DataFrame，並設定欄位名稱
-    df_star_counts = pd.DataFrame({
-        "評分": star_counts.index, 
-        "留言數量": star_counts.values
-    })
 
-    fig = px.bar(
-        df_star_counts,
-        x="評分",
-        y="留言數量",
-        text="留言數量",
-        title="評分分佈",
-        color="留言數量",
-        color_continuous_scale="Burg"
-    )
-    fig.update_traces(textposition="outside")
-    fig.update_layout(
-        plot_bgcolor="white",
-        font=dict(size=14),
-        width=600,
-        height=450,
-        margin=dict(t=40, b=50, l=50, r=30),
-        showlegend=False,
-        dragmode=False
-    )
-    # 固定 x 軸的範圍為 1-5，並確保顯示整數刻度
-    fig.update_xaxes(
-        range=[0.5, 5.5],  # 範圍設為 0.5-5.5，這樣顯示區間就是從 1 到 5
-        tickmode='array',  # 使用陣列模式設定刻度
-        tickvals=[1, 2, 3, 4, 5],  # 刻度值
-        ticktext=['1', '2', '3', '4', '5']  # 刻度標籤
-    )
-    st.plotly_chart(fig, use_container_width=False, 
-                    config={"scrollZoom": False, "displayModeBar": False,
-                            "doubleClick": False, "showTips": False})
-    return star_counts
+def _expand_rating(rating):
+    st.session_state.expanded_rating = rating
+    next_examples(("rating", rating), 1)
 
 
-def manage_reviews(df_reviews, star_counts):
+@traced("display.manage_reviews")
+def manage_reviews(df_reviews, star_counts, pools):
     """
-    管理和顯示各星級評論
+    管理和顯示各星級評論（範例由抽樣池依本 session 的種子輪流取出，不重複）
     """
     st.subheader("⭐ 觀看各星評論")
-    
-    # 初始化 review_samples
-    if "review_samples" not in st.session_state:
-        st.session_state.review_samples = {}
-        for rating in range(5, 0, -1):
-            reviews = df_reviews[df_reviews["Review Rating"] == rating]["Review"]
-            st.session_state.review_samples[rating] = (
-                reviews.sample(n=1, replace=True).iloc[0] if not reviews.empty else "無評論"
-            )
-    
+
     # 初始化展開狀態
     if "expanded_rating" not in st.session_state:
         st.session_state.expanded_rating = None
-    
+
     for rating in range(5, 0, -1):
         stars = "⭐" * rating
         review_count = star_counts.get(rating, 0)
-        
+        rows = session_examples(pools.pool("rating", rating), ("rating", rating), 1)
+
         # 根據儲存的狀態決定是否預設展開
         with st.expander(f"{stars} ({rating} 星評論) - 共 {review_count} 則", expanded=st.session_state.expanded_rating == rating):
-            st.write(st.session_state.review_samples[rating])
-            
-            if st.button(
+            st.write(df_reviews["Review"].iloc[rows[0]] if len(rows) else "無評論")
+
+            # 按鈕的 callback 在下次 rerun 前執行，游標前進後即顯示下一則評論
+            st.button(
                 f"🔄 重新選取 1 則 {rating} 星評論",
-                key=f"btn_{rating}"
-            ):
-                reviews = df_reviews[df_reviews["Review Rating"] == rating]["Review"]
-                st.session_state.review_samples[rating] = (
-                    reviews.sample(n=1, replace=False).iloc[0] if not reviews.empty else "無評論"
-                )
-                
-                # 設定當前展開的 expander
-                st.session_state.expanded_rating = rating
-                st.rerun()
+                key=f"btn_{rating}",
+                on_click=_expand_rating,
+                args=(rating,),
+            )
 
 
+@traced("page.rating_analysis")
 def show_rating_analysis():
     """
     顯示評分分析頁面
@@ -103,9 +68,9 @@ def show_rating_analysis():
     
     if df_reviews is not None:
         st.markdown(f"##### 🍴 {df_reviews.iloc[0]['Restaurant Name']} 🥂")
-        star_counts = plot_rating_distribution(df_reviews)
+        star_counts = plot_rating_distribution(get_store_aggregates(current_dataset()), current_dataset())
         st.markdown("---")
-        manage_reviews(df_reviews, star_counts)
+        manage_reviews(df_reviews, star_counts, get_sample_pools(current_dataset()))
     else:
         st.warning("⚠️ 尚未取得評論資料，請先前往「評論輸入」頁面進行分析。")
         
@@ -0,0 +1,88 @@
+import pandas as pd
+import streamlit as st
+from utils.profiler import traced
+from utils.search_index import get_search_index, update_search_index
+
+PAGE_SIZE = 20
+
+
+@traced("display.search_stores")
+def display_store_matches(stores):
+    """
+    顯示各店家符合的句子數與占該店句子的比例（依句數遞減）。
+    """
+    st.markdown("###### 🏪 提到最多的店家：")
+    table = pd.DataFrame({
+        "店家": [store["location"] for store in stores],
+        "符合句數": [store["matches"] for store in stores],
+        "占該店句子比例": [f"{store['share']:.1%}" for store in stores],
+    })
+    st.dataframe(table.head(20), hide_index=True, use_container_width=True)
+
+
+@traced("display.search_results")
+def display_search_results(results):
+    """
+    顯示搜尋結果句子，含店家、星級、主題與情感。
+    """
+    for item in results:
+        with st.container():
+            st.markdown(
+                f"<h5 style='color:#007BFF;'>🔹 {item['location']}</h5>", unsafe_allow_html=True
+            )
+            st.markdown(f"  👉 {item['sentence']}")
+            st.caption(f"{'⭐' * item['rating']}｜{item['label']}｜{item['sentiment']}")
+
+
+@traced("page.search")
+def show_search_page():
+    """
+    顯示跨店家全文搜尋頁面
+    """
+    st.subheader("🔎 全文搜尋")
+    st.write("搜尋所有店家的留言句子，多個片語以空白分隔（例如：排隊 冷掉）。")
+
+    index = get_search_index()
+    if not index.segments:
+        st.warning("⚠️ 尚未建立全文索引，請按下方按鈕或執行 python -m utils.search_index。")
+    if st.button("🔄 更新索引"):
+        with st.spinner("更新全文索引中..."):
+            stats = update_search_index()
+        st.success(f"已重建 {stats['built']} 家店的索引（{stats['current']} 家已是最新）")
+        index = get_search_index()
+
+    query = st.text_input("搜尋片語", value="", placeholder="例如：排隊 冷掉")
+    mode = st.radio("符合條件", ["任一片語", "所有片語"], horizontal=True)
+
+    labels, sentiments = index.facets()
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        ratings = st.multiselect("星級", [5, 4, 3, 2, 1])
+    with col2:
+        selected_labels = st.multiselect("主題", labels)
+    with col3:
+        selected_sentiments = st.multiselect("情感", sentiments)
+
+    if not query.strip():
+        return
+
+    page = st.number_input("頁數", min_value=1, value=1, step=1)
+    result = index.search(
+        query,
+        mode="all" if mode == "所有片語" else "any",
+        ratings=ratings,
+        labels=selected_labels,
+        sentiments=selected_sentiments,
+        limit=PAGE_SIZE,
+        offset=(int(page) - 1) * PAGE_SIZE,
+    )
+
+    if result["total"] == 0:
+        st.info("📌 沒有符合的句子。")
+        return
+
+    pages = (result["total"] + PAGE_SIZE - 1) // PAGE_SIZE
+    st.markdown(f"#### 共 {result['total']} 句符合（{len(result['stores'])} 家店，第 {int(page)} / {pages} 頁）")
+    display_store_matches(result["stores"])
+    st.markdown("---")
+    display_search_results(result["results"])
@@ -1,9 +1,16 @@
 import streamlit as st
-from utils.state_management import check_data_availability
+from utils.aggregates import get_store_aggregates
+from utils.analytics import summary_view
+from utils.near_duplicates import CAMPAIGN_THRESHOLD, get_duplicates
+from utils.profiler import traced
+from utils.state_management import current_dataset
 
-def display_summary(df_reviews):
+@traced("display.summary")
+def display_summary(aggregates, duplicates=None):
     """
-    顯示評論摘要，含店家名稱、評分、留言數及打卡提示。
+    顯示評論摘要，含店家名稱、評分、留言數、打卡提示及罐頭留言偵測（duplicates 為 None 時略過）。
+
+    所有數值皆取自預先計算的彙總統計，不需掃描評論資料。
     """
 
     # Metrics Section
@@ -12,45 +19,65 @@ def display_summary(df_reviews):
 
     col1, col2 = st.columns(2)
     with col1:
-        st.metric("Google Map 所有留言評分", df_reviews.iloc[0]["Overall Rating"])
-        st.metric("抓取留言平均得分", round(df_reviews["Review Rating"].mean(), 1))
+        st.metric("Google Map 所有留言評分", aggregates["overall_rating"])
+        st.metric("抓取留言平均得分", round(aggregates["mean_rating"], 1))
 
     with col2:
-        st.metric("Google Map 所有留言數", df_reviews.iloc[0]["Review Count"])
-        st.metric("抓取留言數", len(df_reviews))
+        st.metric("Google Map 所有留言數", aggregates["review_count"])
+        st.metric("抓取留言數", aggregates["scraped_review_count"])
 
     # Review Analysis
-    avg_rating = round(df_reviews["Review Rating"].mean(), 1)
-    overall_rating = df_reviews.iloc[0]["Overall Rating"]
-    comparison = "較高" if avg_rating > overall_rating else "較低" if avg_rating < overall_rating else "相當"
-
-    interpretation = {
-        "較高": "代表近期評價趨向正面，店家服務或品質可能提升。",
-        "較低": "代表近期評價趨向負面，店家服務或品質可能下降。",
-        "相當": "代表近期評價與過去評價相當，店家評價穩定。"
-    }[comparison]
+    summary = summary_view(aggregates)
 
     st.markdown("#### 📊 留言分析")
     st.write(
-        f"在已抓取的 **{len(df_reviews)}** 條留言中，平均得分為 **{avg_rating}**，"
-        f"和 Google Map 上的整體評分(**{overall_rating}**)相比{comparison}。"
-    )
-    st.success(interpretation)
-
-    # Checking for promotional keywords
-    df_reviews['contains_checkwords'] = df_reviews['Review'].apply(
-        lambda review: any(kw in review for kw in ["打卡", "送"])
+        f"在已抓取的 **{summary['scraped_review_count']}** 條留言中，平均得分為 **{summary['mean_rating']}**，"
+        f"和 Google Map 上的整體評分(**{summary['overall_rating']}**)相比{summary['comparison']}。"
     )
-    checkwords_count = df_reviews['contains_checkwords'].sum()
+    st.success(summary["interpretation"])
 
     # Display promotional message if necessary
     st.markdown("### 🔍 打卡活動偵測")
-    if checkwords_count >= 3:
+    if summary["checkin_suspected"]:
         st.warning("📌 留言中多次出現「打卡」或「送」等詞彙，店家可能提供優惠以提升評分。")
     else:
         st.info("📌 留言中「沒有」明顯的打卡活動。")
 
+    if duplicates is not None:
+        display_duplicates(duplicates)
+
+
+@traced("display.duplicates")
+def display_duplicates(duplicates):
+    """
+    顯示近似重複（罐頭）留言群組與活動留言指數。
+    """
+    st.markdown("### 🧬 罐頭留言偵測")
+    col1, col2 = st.columns(2)
+    with col1:
+        st.metric("活動留言指數", f"{duplicates['campaign_score']:.0%}")
+    with col2:
+        st.metric("近似重複留言數", f"{duplicates['clustered_reviews']} / {duplicates['eligible_reviews']}")
+
+    if duplicates["campaign_score"] >= CAMPAIGN_THRESHOLD:
+        st.warning("📌 有多則內容幾乎相同的高分留言，可能是店家以優惠換取的制式評論。")
+    elif duplicates["clusters"]:
+        st.info("📌 有少量內容相近的留言，但不足以判定為評論活動。")
+    else:
+        st.info("📌 留言中「沒有」內容相近的重複留言。")
+
+    for cluster in duplicates["clusters"][:5]:
+        with st.expander(f"{cluster['size']} 則相近留言，平均 {cluster['mean_rating']} 星"
+                         f"（五星占 {cluster['five_star_share']:.0%}）"):
+            st.markdown(f"  👉 {cluster['example']}")
+
+    if duplicates.get("sentence_clusters"):
+        st.markdown("###### 在多則留言中重複出現的句子：")
+        for cluster in duplicates["sentence_clusters"][:5]:
+            st.markdown(f"  👉 {cluster['example']}（{cluster['reviews']} 則留言）")
+
 
+@traced("page.summary")
 def show_summary_page():
     """
     顯示評論摘要頁面
@@ -58,12 +85,21 @@ def show_summary_page():
 
     st.subheader("📊 評論摘要")
     
-    # 檢查是否有可用資料
-    df_reviews = check_data_availability()
+    # 檢查是否有可用資料（摘要只需要彙總統計，不必載入評論資料）
+    handle = current_dataset()
+    aggregates = None
+    if handle is not None:
+        try:
+            aggregates = get_store_aggregates(handle)
+            duplicates = get_duplicates(handle)
+        except FileNotFoundError:
+            # 資料檔已被移除
+            aggregates = None
+            st.session_state.dataset = None
 
-    if df_reviews is not None:
-        st.markdown(f"##### 🍴 {df_reviews.iloc[0]['Restaurant Name']} 🥂")
-        display_summary(df_reviews)
+    if aggregates is not None:
+        st.markdown(f"##### 🍴 {aggregates['restaurant_name']} 🥂")
+        display_summary(aggregates, duplicates)
     else:
         st.warning("⚠️ 尚未取得評論資料，請先前往「評論輸入」頁面進行分析。")
         
@@ -1,113 +1,147 @@
 import streamlit as st
-import plotly.express as px
-import pandas as pd
-from collections import Counter
-from utils.state_management import check_data_availability
+from utils.aggregates import get_store_aggregates
+from utils.data_loader import store_version
+from utils.figures import figure_cache, get_figure, sentiment_breakdown_figure
+from utils.profiler import span, traced
+from utils.sampling import build_sample_pools, get_sample_pools
+from utils.sentiment_stats import ALL_RATINGS, DEFAULT_CONFIDENCE, get_sentiment_breakdown, sentiment_breakdown
+from utils.state_management import check_data_availability, current_dataset, next_examples, session_examples
 
-def plot_review_topics(df):
+# 每個主題顯示的範例句數
+TOPIC_EXAMPLES = 6
+WEIGHTING_OPTIONS = {"每句相同權重": "sentence", "每則評論相同權重": "review"}
+
+
+def _percent_interval(row, column, low, high):
+    return f"{row[column]:.0%}（{row[low]:.0%}–{row[high]:.0%}）"
+
+
+def topic_sentiment_caption(breakdown, topic):
     """
-    繪製評論主題分布（排除 '其他' 類別）。
+    單一主題的情感摘要文字，沒有資料時回傳 None。
     """
-    label_counts = df["label"].value_counts().reset_index()
-    label_counts.columns = ["評論主題", "討論聲量"]
-
-    # 排除「其他」
-    label_counts = label_counts[label_counts["評論主題"] != "其他"]
-
-    # 按評論數升序排列
-    label_counts = label_counts.sort_values(by="討論聲量", ascending=True)
-
-    # 繪製圖表
-    fig = px.bar(
-        label_counts,
-        x="討論聲量",
-        y="評論主題",
-        orientation="h",
-        text="討論聲量",
-        color="討論聲量",
-        color_continuous_scale="Burg"
-    )
-    fig.update_traces(textposition="outside", cliponaxis=False) # 防止文字被軸線裁剪 cliponaxis=False 
-    fig.update_layout(
-        plot_bgcolor="white",
-        font=dict(size=14),
-        width=600,
-        height=400,
-        margin=dict(t=50, b=50, l=50, r=30),
-        showlegend=False,
-        dragmode=False
+    rows = breakdown[(breakdown["label"] == topic) & (breakdown["rating"] == ALL_RATINGS)]
+    if rows.empty:
+        return None
+    row = rows.iloc[0]
+    return (
+        f"😊 正面 {row['positive_share']:.0%}（{DEFAULT_CONFIDENCE:.0%} 信賴區間 "
+        f"{row['positive_low']:.0%}–{row['positive_high']:.0%}），"
+        f"平均情感分數 {row['mean_score']:.2f}（{row['score_low']:.2f}–{row['score_high']:.2f}），"
+        f"共 {int(row['sentences'])} 句"
     )
 
-    st.subheader("評論主題分布")
-    st.plotly_chart(fig, use_container_width=False, 
+
+@traced("display.sentiment_breakdown")
+def display_sentiment_breakdown(df, handle=None):
+    """
+    顯示各主題 × 星級的正面比例與 bootstrap 信賴區間，回傳 breakdown 供各主題摘要使用。
+    """
+    st.subheader("各主題情感分布")
+    weighting = WEIGHTING_OPTIONS[st.radio(
+        "加權方式", list(WEIGHTING_OPTIONS), horizontal=True, key="sentiment_weighting"
+    )]
+    if handle is None:
+        breakdown = sentiment_breakdown(df, weighting)
+    else:
+        breakdown = get_sentiment_breakdown(handle, weighting)
+    if breakdown.empty:
+        st.write("目前沒有情感分析結果。")
+        return breakdown
+
+    if handle is None:
+        fig = sentiment_breakdown_figure(breakdown)
+    else:
+        # 與 get_sentiment_breakdown 使用同一個資料版本，重新 ingest 後圖表與表格一起更新
+        fig = figure_cache.cached(
+            ("sentiment_breakdown", handle.key, weighting),
+            lambda: sentiment_breakdown_figure(breakdown),
+            store_version(handle.location, handle.folder),
+        )
+    with span("st.plotly_chart"):
+        st.plotly_chart(fig, use_container_width=True,
                         config={"scrollZoom": False, "displayModeBar": False,
                                 "doubleClick": False, "showTips": False})
 
+    # 主題 × 星級的正面比例（括號內為信賴區間）
+    table = breakdown.assign(
+        cell=breakdown.apply(_percent_interval, axis=1, args=("positive_share", "positive_low", "positive_high")),
+        column=breakdown["rating"].map(lambda rating: "全部" if rating == ALL_RATINGS else f"{rating} 星"),
+    ).pivot(index="label", columns="column", values="cell")
+    columns = ["全部"] + [f"{rating} 星" for rating in range(5, 0, -1)]
+    st.dataframe(table.reindex(columns=[c for c in columns if c in table.columns]).rename_axis("評論主題").fillna("—"),
+                 use_container_width=True)
+    st.caption(f"括號內為 {DEFAULT_CONFIDENCE:.0%} bootstrap 信賴區間；句子數少的格子區間較寬。")
+    return breakdown
 
-def display_sentiment_analysis(df):
+
+@traced("plot.review_topics")
+def plot_review_topics(aggregates, handle=None):
+    """
+    繪製評論主題分布（排除 '其他' 類別，圖表由程序共用快取提供）。
+    """
+    fig = get_figure(handle, aggregates, "review_topics")
+
+    st.subheader("評論主題分布")
+    with span("st.plotly_chart"):
+        st.plotly_chart(fig, use_container_width=False, 
+                            config={"scrollZoom": False, "displayModeBar": False,
+                                    "doubleClick": False, "showTips": False})
+
+
+@traced("display.sentiment_analysis")
+def display_sentiment_analysis(df, aggregates, handle=None, pools=None, breakdown=None):
     """
-    顯示各主題的評論（原為情感分析），並用互動詞頻圖取代文字雲。
+    顯示各主題的評論與情感摘要，並用互動詞頻圖取代文字雲。
+
+    pools 為 None 時（例如未經 session 的呼叫）直接由 df 建立抽樣池；breakdown 為 None 時不顯示情感摘要。
     """
-    label_counts = df["label"].value_counts()
-    for topic in label_counts.index:
+    if pools is None:
+        pools = build_sample_pools(None, df)
+    for topic in aggregates["label_counts"]:
         if topic == "其他":
             continue
         st.markdown(f"#### 📌 **{topic} 的討論**")
+        caption = topic_sentiment_caption(breakdown, topic) if breakdown is not None else None
+        if caption:
+            st.caption(caption)
         with st.expander(" ", expanded=True):
             col1, col2 = st.columns([1, 1.2])
             with col1:
                 # 不再區分正面負面，只根據標籤抽取評論
-                topic_reviews = df[df["label"] == topic]
-                
                 st.markdown(
                     "<span style='font-size: 18px; font-weight: bold;'>📝 評論摘要</span>",
                     unsafe_allow_html=True
                 )
-                
-                if not topic_reviews.empty:
-                    # 隨機抽取最多6則評論（原本是正面3則+負面3則）
-                    sample_size = min(6, len(topic_reviews))
-                    for s in topic_reviews["sentence"].drop_duplicates().sample(
-                        sample_size, replace=True
-                    ):
-                        st.write(f"- {s}")
+
+                # 從抽樣池取出最多6則不重複的句子（原本是正面3則+負面3則）
+                rows = session_examples(pools.pool("label", topic), ("label", topic), TOPIC_EXAMPLES)
+                if len(rows):
+                    for sentence in df["sentence"].iloc[rows]:
+                        st.write(f"- {sentence}")
+                    st.button("🔄 換一批", key=f"topic_{topic}",
+                              on_click=next_examples, args=(("label", topic), TOPIC_EXAMPLES))
                 else:
                     st.write("目前沒有符合的留言。")
 
             with col2:
-                words = " ".join(df[df["label"] == topic]["word"].dropna())
-
-                if words.strip():
-                    # 計算詞頻
-                    word_counts = Counter(words.split())
-                    common_words = word_counts.most_common(10)  # 取前 10 個詞
-
-                    # 轉換為 DataFrame
-                    word_df = pd.DataFrame(common_words, columns=["詞語", "次數"])
-
-                    # 用 Plotly 繪製互動式條狀圖
-                    fig = px.bar(
-                        word_df,
-                        x="次數",
-                        y="詞語",
-                        orientation="h",
-                        title=f"「{topic}」的關鍵詞頻率",
-                        text="次數",
-                        color="次數",
-                        color_continuous_scale="blues"
-                    )
-
-                    fig.update_traces(textposition="outside")
-                    fig.update_layout(yaxis=dict(categoryorder="total ascending"), dragmode=False)
-
-                    st.plotly_chart(fig, use_container_width=True, 
-                                        config={"scrollZoom": False, "displayModeBar": False,
-                                                "doubleClick": False, "showTips": False})
+                # 取前 10 個詞（詞頻於彙總檔中預先計算）
+                common_words = aggregates["top_terms_by_label"].get(topic, [])[:10]
+
+                if common_words:
+                    # 互動式條狀圖（依資料版本快取，抽樣按鈕觸發的 rerun 不會重新建立）
+                    fig = get_figure(handle, aggregates, "topic_terms", {"topic": topic})
+
+                    with span("st.plotly_chart"):
+                        st.plotly_chart(fig, use_container_width=True, 
+                                            config={"scrollZoom": False, "displayModeBar": False,
+                                                    "doubleClick": False, "showTips": False})
 
                 else:
                     st.write("目前沒有足夠的詞語來生成詞頻圖。")
 
 
+@traced("page.topic_analysis")
 def show_topic_analysis():
     """
     顯示主題分析頁面
@@ -119,9 +153,12 @@ def show_topic_analysis():
     
     if df is not None:
         st.markdown(f"##### 🍴 {df_reviews.iloc[0]['Restaurant Name']} 🥂")
-        plot_review_topics(df)
+        aggregates = get_store_aggregates(current_dataset())
+        plot_review_topics(aggregates, current_dataset())
+        st.markdown("---")
+        breakdown = display_sentiment_breakdown(df, current_dataset())
         st.markdown("---")
-        display_sentiment_analysis(df)
+        display_sentiment_analysis(df, aggregates, current_dataset(), get_sample_pools(current_dataset()), breakdown)
     else:
         st.warning("⚠️ 尚未取得評論資料，請先前往「評論輸入」頁面進行分析。")
         
@@ -0,0 +1,498 @@
+"""
+離線評論處理流程：將 data/<店名>_reviews.csv 處理成 data/<店名>.csv 句子表。
+
+流程：拆句 → jieba 斷詞 / TextRank 關鍵詞 / 關鍵詞分類 → SnowNLP 情感分數
+斷詞與情感分析以多程序分塊（chunk）平行處理，每個 chunk 完成後寫入檢查點，
+中斷後重新執行會從尚未完成的 chunk 繼續。
+加上 --incremental 時只處理新增或變更的評論，其餘句子沿用既有的 data/<店名>.csv。
+既有的 data/<店名>.csv 若沒有對應的檢查點（不是由此流程產生，例如隨專案附帶的資料），
+預設不會覆寫；需要重新產生時請加上 --force。
+
+用法：
+    python process_reviews.py                       # 處理 data/ 中所有店家
+    python process_reviews.py 阜杭豆漿 --workers 8   # 只處理指定店家
+    python process_reviews.py --incremental         # 重新爬取後只處理差異
+"""
+import argparse
+import glob
+import hashlib
+import importlib.metadata
+import json
+import multiprocessing
+import os
+import re
+import shutil
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import pandas as pd
+
+from utils.nlp_cache import DEFAULT_CACHE_PATH, NLPCache, content_version
+from utils.nlp_runtime import load_runtime
+from utils.rule_engine import DEFAULT_RULES_PATH, RuleEngine
+
+# 主題分類規則定義於 rules.json 的 categories 區段，依序比對，皆不符合則為「其他」
+DEFAULT_LABEL = "其他"
+OUTPUT_COLUMNS = ["text", "rating", "sentence", "word", "label", "keyword", "index", "sentiment_score", "sentiment"]
+
+# 拆句：全形/半形標點與空白、換行皆視為句子邊界（頓號不拆）
+SENTENCE_DELIMITERS = re.compile(r"[，,。！!？?；;：\s]+")
+
+# 以下為各工作程序中的全域資源，由 _init_worker 載入一次
+_stopwords = frozenset()
+_cache = None
+_category_engine = None
+_segment_version = ""
+_sentiment_version = ""
+
+
+def split_sentences(text):
+    """
+    將評論拆成句子，去除空白與空句。
+    """
+    if not isinstance(text, str):
+        return []
+    return [s.strip() for s in SENTENCE_DELIMITERS.split(text) if s.strip()]
+
+
+def review_hash(text, rating):
+    """
+    評論內容雜湊（評論文字 + 評分），用於增量處理時比對同一店家的評論。
+    """
+    content = "\x1f".join([str(text), str(int(rating))])
+    return hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+
+def diff_reviews(df_reviews, df_existing):
+    """
+    比對新爬取的評論與既有句子表，找出新增、刪除、變更與未變動的評論。
+
+    變更指評論文字相同但評分不同，沿用既有斷詞與情感結果，只更新評分。
+
+    Returns:
+        dict：added / removed / changed / unchanged，
+        added 為新評論序號，removed 為舊序號，changed / unchanged 為 (舊序號, 新序號)
+    """
+    old = df_existing.groupby("index", sort=True)[["text", "rating"]].first()
+    old_by_hash = {}
+    old_by_text = {}
+    for index, text, rating in zip(old.index, old["text"], old["rating"]):
+        old_by_hash.setdefault(review_hash(text, rating), []).append(index)
+        old_by_text.setdefault(text, []).append(index)
+
+    used = set()
+    added, changed, unchanged = [], [], []
+    new_reviews = list(enumerate(zip(df_reviews["Review"], df_reviews["Review Rating"]), start=1))
+    pending = []
+    for position, (text, rating) in new_reviews:
+        candidates = [i for i in old_by_hash.get(review_hash(text, rating), []) if i not in used]
+        if candidates:
+            used.add(candidates[0])
+            unchanged.append((candidates[0], position))
+        else:
+            pending.append((position, text))
+    for position, text in pending:
+        candidates = [i for i in old_by_text.get(text, []) if i not in used]
+        if candidates:
+            used.add(candidates[0])
+            changed.append((candidates[0], position))
+        else:
+            added.append(position)
+    removed = [index for index in old.index if index not in used]
+    return {"added": added, "removed": removed, "changed": changed, "unchanged": unchanged}
+
+
+def _init_worker(userdict_path, stopwords_path, cache_path=None, rules_path=DEFAULT_RULES_PATH):
+    global _stopwords, _cache, _segment_version, _sentiment_version, _category_engine
+    import jieba
+
+    # 由父程序 fork 出來時已載入，否則以記憶體映射讀取預先建立的執行環境檔
+    _stopwords = load_runtime(userdict_path, stopwords_path).stopwords
+    _category_engine = RuleEngine.from_config("categories", rules_path)
+
+    if cache_path:
+        _cache = NLPCache(cache_path)
+        # 字典、停用詞或模型版本變動時，快取鍵隨之改變
+        _segment_version = content_version("jieba", jieba.__version__, paths=(userdict_path, stopwords_path))
+        _sentiment_version = content_version("snownlp", importlib.metadata.version("snownlp"))
+
+
+def segment(sentence):
+    import jieba
+
+    return " ".join(w for w in jieba.lcut(sentence) if w.strip() and w not in _stopwords)
+
+
+def extract_keywords(text, top_k=5):
+    import jieba.analyse
+
+    return ", ".join(jieba.analyse.textrank(text, topK=top_k))
+
+
+def sentiment_score(sentence):
+    from snownlp import SnowNLP
+
+    return SnowNLP(sentence).sentiments
+
+
+def process_chunk(records):
+    """
+    處理一個 chunk 的評論（於工作程序中執行）。
+
+    斷詞、TextRank 關鍵詞與情感分數會先以整個 chunk 批次查詢 NLP 快取，只對未命中的項目呼叫模型。
+
+    Args:
+        records (list): [(index, text, rating), ...]，index 為評論序號（從 1 起算）
+
+    Returns:
+        (rows, timings, cache_stats)：句子表列資料、各階段耗時秒數，以及快取命中/未命中次數
+    """
+    timings = {"split": 0.0, "segment": 0.0, "sentiment": 0.0}
+    hits_before = dict(_cache.hits) if _cache else {}
+    misses_before = dict(_cache.misses) if _cache else {}
+
+    start = time.perf_counter()
+    reviews = [(index, text, rating, split_sentences(text)) for index, text, rating in records]
+    sentences = [sentence for *_, review_sentences in reviews for sentence in review_sentences]
+    timings["split"] += time.perf_counter() - start
+
+    start = time.perf_counter()
+    texts = [text for _, text, _, review_sentences in reviews if review_sentences]
+    if _cache:
+        extracted = dict(zip(texts, _cache.cached("keyword", _segment_version, texts, extract_keywords)))
+        words = _cache.cached("segment", _segment_version, sentences, segment)
+    else:
+        extracted = {text: extract_keywords(text) for text in texts}
+        words = [segment(sentence) for sentence in sentences]
+    keywords = [extracted.get(text, "") for _, text, _, _ in reviews]
+    labels = _category_engine.label(sentences, DEFAULT_LABEL).tolist()
+    timings["segment"] += time.perf_counter() - start
+
+    start = time.perf_counter()
+    if _cache:
+        scores = [float(v) for v in _cache.cached(
+            "sentiment", _sentiment_version, sentences, lambda s: repr(sentiment_score(s))
+        )]
+    else:
+        scores = [sentiment_score(sentence) for sentence in sentences]
+    timings["sentiment"] += time.perf_counter() - start
+
+    rows = []
+    position = 0
+    for (index, text, rating, review_sentences), keyword in zip(reviews, keywords):
+        for sentence in review_sentences:
+            score = scores[position]
+            rows.append({
+                "text": text,
+                "rating": rating,
+                "sentence": sentence,
+                "word": words[position],
+                "label": labels[position],
+                "keyword": keyword,
+                "index": index,
+                "sentiment_score": score,
+                "sentiment": "正面" if score > 0.5 else "負面",
+            })
+            position += 1
+
+    cache_stats = {}
+    if _cache:
+        for kind in set(_cache.hits) | set(_cache.misses):
+            cache_stats[kind] = (
+                _cache.hits.get(kind, 0) - hits_before.get(kind, 0),
+                _cache.misses.get(kind, 0) - misses_before.get(kind, 0),
+            )
+    return rows, timings, cache_stats
+
+
+class StoreJob:
+    """
+    單一店家的處理進度與檢查點。
+
+    檢查點目錄：<checkpoint_dir>/<店名>/，內含 progress.json 與各 chunk 的結果檔。
+    """
+
+    def __init__(self, location, folder, checkpoint_dir, chunk_size, incremental=False):
+        self.location = location
+        self.folder = folder
+        self.chunk_size = chunk_size
+        self.input_path = os.path.join(folder, f"{location}_reviews.csv")
+        self.output_path = os.path.join(folder, f"{location}.csv")
+        self.checkpoint_path = os.path.join(checkpoint_dir, location)
+        self.progress_path = os.path.join(self.checkpoint_path, "progress.json")
+
+        stat = os.stat(self.input_path)
+        self.source = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "chunk_size": chunk_size,
+                       "incremental": incremental}
+        self.incremental = incremental
+        self.chunks = []
+        self.pending = set()
+        self.reused = None
+        self.changes = None
+
+    def is_done(self):
+        """
+        輸出檔已存在且由目前的輸入檔產生時回傳 True。
+        """
+        if not os.path.exists(self.output_path) or not os.path.exists(self.progress_path):
+            return False
+        with open(self.progress_path, encoding="utf-8") as f:
+            progress = json.load(f)
+        source = dict(progress.get("source", {}), incremental=self.incremental)
+        return source == self.source and progress.get("done", False)
+
+    def is_unmanaged(self):
+        """
+        輸出檔已存在但沒有檢查點（不是由此流程產生）時回傳 True，預設不覆寫這類檔案。
+        """
+        return os.path.exists(self.output_path) and not os.path.exists(self.progress_path)
+
+    def prepare(self):
+        """
+        讀取輸入檔並切成 chunk；輸入檔變動時清除舊檢查點。
+        """
+        progress = {}
+        if os.path.exists(self.progress_path):
+            with open(self.progress_path, encoding="utf-8") as f:
+                progress = json.load(f)
+        if progress.get("source") != self.source:
+            shutil.rmtree(self.checkpoint_path, ignore_errors=True)
+        os.makedirs(self.checkpoint_path, exist_ok=True)
+        self._write_progress(done=False)
+
+        df_reviews = pd.read_csv(self.input_path)
+        records = list(zip(
+            range(1, len(df_reviews) + 1),
+            df_reviews["Review"].tolist(),
+            df_reviews["Review Rating"].astype(int).tolist(),
+        ))
+        if self.incremental and os.path.exists(self.output_path):
+            records = self._prepare_delta(df_reviews, records)
+        self.chunks = [records[i:i + self.chunk_size] for i in range(0, len(records), self.chunk_size)]
+        self.pending = {i for i in range(len(self.chunks)) if not os.path.exists(self.chunk_path(i))}
+        return self.pending
+
+    def _prepare_delta(self, df_reviews, records):
+        # 只保留需要重新處理的評論，其餘句子由既有輸出檔沿用
+        existing = pd.read_csv(self.output_path, index_col=0)
+        self.changes = diff_reviews(df_reviews, existing)
+        # 舊序號 → 新序號，一次篩選沿用的句子並以向量化方式改寫序號、評論文字與評分
+        pairs = self.changes["unchanged"] + self.changes["changed"]
+        new_index = pd.Series([position for _, position in pairs], index=[old for old, _ in pairs], dtype="int64")
+        rows = existing[existing["index"].isin(new_index.index)].copy()
+        positions = rows["index"].map(new_index).to_numpy()
+        rows["index"] = positions
+        rows["text"] = df_reviews["Review"].to_numpy()[positions - 1]
+        rows["rating"] = df_reviews["Review Rating"].astype(int).to_numpy()[positions - 1]
+        self.reused = [rows]
+        added = set(self.changes["added"])
+        return [record for record in records if record[0] in added]
+
+    def chunk_path(self, chunk_id):
+        return os.path.join(self.checkpoint_path, f"chunk_{chunk_id:05d}.pkl")
+
+    def save_chunk(self, chunk_id, rows):
+        tmp_path = f"{self.chunk_path(chunk_id)}.tmp"
+        pd.DataFrame(rows, columns=OUTPUT_COLUMNS).to_pickle(tmp_path)
+        os.replace(tmp_path, self.chunk_path(chunk_id))
+        self.pending.discard(chunk_id)
+
+    def finalize(self):
+        """
+        合併所有 chunk 並寫出句子表，格式與既有 data/<店名>.csv 相同。
+        """
+        parts = [pd.read_pickle(self.chunk_path(i)) for i in range(len(self.chunks))]
+        if self.reused:
+            parts.extend(self.reused)
+        df = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=OUTPUT_COLUMNS)
+        # 依評論序號排序（同一則評論內維持原句子順序）
+        df = df.sort_values("index", kind="stable").reset_index(drop=True)[OUTPUT_COLUMNS]
+        tmp_path = f"{self.output_path}.tmp"
+        df.to_csv(tmp_path)
+        os.replace(tmp_path, self.output_path)
+        for i in range(len(self.chunks)):
+            os.remove(self.chunk_path(i))
+        self._write_progress(done=True)
+        return df
+
+    def _write_progress(self, done):
+        progress = {"source": self.source, "done": done}
+        if self.changes is not None:
+            progress["changes"] = {key: len(value) for key, value in self.changes.items()}
+        with open(self.progress_path, "w", encoding="utf-8") as f:
+            json.dump(progress, f)
+
+
+def _ingest(location, folder):
+    # 產生欄式檔案、店家目錄、彙總檔、圖表、重複留言偵測結果、全文索引分段與比較表，讓 app 直接使用最新結果
+    from utils.aggregates import write_aggregates
+    from utils.comparison import update_comparison_table
+    from utils.figures import write_figures
+    from utils.near_duplicates import write_duplicates
+    from utils.search_index import build_segment
+    from utils.store_catalog import refresh_catalog
+    from utils.store_format import convert_csv_store
+
+    convert_csv_store(location, folder)
+    refresh_catalog(folder)
+    write_figures(location, folder, write_aggregates(location, folder))
+    write_duplicates(location, folder)
+    build_segment(location, folder)
+    update_comparison_table(folder, stores=[location])
+
+
+def run_pipeline(stores, folder="data", workers=None, chunk_size=50, checkpoint_dir=".checkpoints",
+                 userdict_path="userdict.txt", stopwords_path="stopwords.txt", force=False, ingest=True,
+                 incremental=False, cache_path=DEFAULT_CACHE_PATH, rules_path=DEFAULT_RULES_PATH):
+    """
+    以程序池處理多個店家，回傳統計資料（評論數、句子數、各階段吞吐量）。
+
+    incremental 為 True 時只處理新增的評論，並回報各店家新增、刪除、變更的評論數。
+    既有句子表沒有檢查點時，除非 force 或 incremental 為 True，否則略過該店家。
+    cache_path 為斷詞/情感分數快取的路徑，None 代表不使用快取。
+    """
+    stats = {"stores": 0, "reviews": 0, "sentences": 0,
+             "stage_seconds": {"split": 0.0, "segment": 0.0, "sentiment": 0.0},
+             "changes": {"added": 0, "removed": 0, "changed": 0, "unchanged": 0},
+             "cache": {}}
+    started = time.perf_counter()
+
+    jobs = {}
+    for location in stores:
+        job = StoreJob(location, folder, checkpoint_dir, chunk_size, incremental)
+        if not force and job.is_done():
+            print(f"⏭️  {location}: 已是最新，略過")
+            continue
+        if not force and not incremental and job.is_unmanaged():
+            print(f"⏭️  {location}: 既有句子表沒有對應的檢查點，不覆寫（加上 --force 重新處理）")
+            continue
+        if force:
+            shutil.rmtree(job.checkpoint_path, ignore_errors=True)
+        job.prepare()
+        jobs[location] = job
+        if job.changes is not None:
+            changes = {key: len(value) for key, value in job.changes.items()}
+            print(f"🔍 {location}: 新增 {changes['added']}，刪除 {changes['removed']}，"
+                  f"變更 {changes['changed']}，未變動 {changes['unchanged']}")
+            for key, count in changes.items():
+                stats["changes"][key] += count
+
+    tasks = [(job, chunk_id) for job in jobs.values() for chunk_id in sorted(job.pending)]
+    resumed = sum(len(job.chunks) - len(job.pending) for job in jobs.values())
+    if resumed:
+        print(f"🔁 從檢查點恢復 {resumed} 個已完成的 chunk")
+
+    def finish(job):
+        df = job.finalize()
+        if ingest:
+            _ingest(job.location, job.folder)
+        stats["stores"] += 1
+        print(f"✅ {job.location}: {len(df)} 句")
+
+    # 已全部由檢查點完成的店家直接合併
+    for job in jobs.values():
+        if not job.pending:
+            finish(job)
+
+    # 以 fork 建立工作程序時先在父程序載入 jieba，所有工作程序直接繼承，不必各自初始化
+    if tasks and multiprocessing.get_start_method() == "fork":
+        load_runtime(userdict_path, stopwords_path, preload_analyse=True)
+
+    max_in_flight = (workers or os.cpu_count() or 1) * 2
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(userdict_path, stopwords_path, cache_path, rules_path)
+    ) as executor:
+        queue = iter(tasks)
+        in_flight = {}
+        while True:
+            while len(in_flight) < max_in_flight:
+                task = next(queue, None)
+                if task is None:
+                    break
+                job, chunk_id = task
+                in_flight[executor.submit(process_chunk, job.chunks[chunk_id])] = task
+            if not in_flight:
+                break
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                job, chunk_id = in_flight.pop(future)
+                rows, timings, cache_stats = future.result()
+                job.save_chunk(chunk_id, rows)
+                stats["reviews"] += len(job.chunks[chunk_id])
+                stats["sentences"] += len(rows)
+                for stage, seconds in timings.items():
+                    stats["stage_seconds"][stage] += seconds
+                for kind, (hits, misses) in cache_stats.items():
+                    total = stats["cache"].setdefault(kind, [0, 0])
+                    total[0] += hits
+                    total[1] += misses
+                if not job.pending:
+                    finish(job)
+
+    if cache_path and tasks:
+        NLPCache(cache_path).evict()
+
+    stats["elapsed"] = time.perf_counter() - started
+    return stats
+
+
+def report(stats):
+    """
+    輸出各階段吞吐量（句/秒）；階段耗時為所有工作程序的累計時間。
+    """
+    sentences = stats["sentences"]
+    print(f"📦 店家 {stats['stores']}，評論 {stats['reviews']}，句子 {sentences}，"
+          f"總耗時 {stats['elapsed']:.1f} 秒（{sentences / max(stats['elapsed'], 1e-9):.1f} 句/秒）")
+    for stage, seconds in stats["stage_seconds"].items():
+        rate = sentences / seconds if seconds else float("inf")
+        print(f"   - {stage:<10} {seconds:8.2f} 秒（單程序 {rate:.1f} 句/秒）")
+    for kind, (hits, misses) in stats["cache"].items():
+        lookups = hits + misses
+        print(f"   - 快取 {kind:<9} 命中 {hits}/{lookups}（{hits / lookups if lookups else 0:.1%}）")
+    changes = stats["changes"]
+    if any(changes.values()):
+        print(f"🔍 增量處理：新增 {changes['added']}，刪除 {changes['removed']}，"
+              f"變更 {changes['changed']}，未變動 {changes['unchanged']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="離線處理店家評論：拆句、斷詞、分類與情感分析")
+    parser.add_argument("stores", nargs="*", help="店名，未指定時處理資料夾中所有店家")
+    parser.add_argument("--folder", default="data")
+    parser.add_argument("--workers", type=int, default=None, help="工作程序數，預設為 CPU 核心數")
+    parser.add_argument("--chunk-size", type=int, default=50, help="每個 chunk 的評論數")
+    parser.add_argument("--checkpoint-dir", default=".checkpoints")
+    parser.add_argument("--userdict", default="userdict.txt")
+    parser.add_argument("--stopwords", default="stopwords.txt")
+    parser.add_argument("--rules", default=DEFAULT_RULES_PATH, help="主題分類規則設定檔")
+    parser.add_argument("--force", action="store_true", help="忽略既有結果重新處理（包含沒有檢查點的既有句子表）")
+    parser.add_argument("--no-ingest", action="store_true", help="不產生欄式檔案與彙總檔")
+    parser.add_argument("--incremental", action="store_true", help="只處理新增或變更的評論")
+    parser.add_argument("--nlp-cache", default=DEFAULT_CACHE_PATH, help="斷詞、關鍵詞與情感分數快取檔路徑")
+    parser.add_argument("--no-nlp-cache", action="store_true", help="不使用斷詞、關鍵詞與情感分數快取")
+    args = parser.parse_args()
+
+    stores = args.stores or sorted(
+        os.path.basename(path)[: -len("_reviews.csv")]
+        for path in glob.glob(os.path.join(args.folder, "*_reviews.csv"))
+    )
+    stats = run_pipeline(
+        stores,
+        folder=args.folder,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        checkpoint_dir=args.checkpoint_dir,
+        userdict_path=args.userdict,
+        stopwords_path=args.stopwords,
+        force=args.force,
+        ingest=not args.no_ingest,
+        incremental=args.incremental,
+        cache_path=None if args.no_nlp_cache else args.nlp_cache,
+        rules_path=args.rules,
+    )
+    report(stats)
+
+
+if __name__ == "__main__":
+    main()
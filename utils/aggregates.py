@@ -0,0 +1,191 @@
+import argparse
+import glob
+import hashlib
+import json
+import os
+
+from utils.data_loader import read_store_data, resolve_store, store_version
+from utils.dataset_cache import registry
+from utils.profiler import span, traced
+from utils.rule_engine import DEFAULT_RULES_PATH, RuleEngine, load_rules, rules_version
+from utils.store_format import csv_paths, store_paths
+from utils.term_frequency import build_term_frequency
+
+# 彙總檔結構版本，欄位變更時遞增
+AGGREGATE_SCHEMA_VERSION = 2
+TOP_K = 10
+
+
+def aggregate_path(location: str, folder: str = "data"):
+    """
+    回傳店家彙總檔路徑：data/<店名>_aggregates.json
+    """
+    return os.path.join(folder, f"{location}_aggregates.json")
+
+
+def aggregate_version(location: str, folder: str = "data", rules_path=DEFAULT_RULES_PATH, rules=None):
+    """
+    彙總檔的版本：店家資料版本加上規則設定檔的雜湊（打卡統計由 rules.json 的規則計算）。
+
+    API ETag、比較表與報表等由彙總檔衍生的資料也以此判斷是否過期；
+    一次處理多家店時可先以 rules_version() 取得 rules 傳入，規則檔只需檢查一次。
+    """
+    return f"{store_version(location, folder)}:{rules if rules is not None else rules_version(rules_path)}"
+
+
+def source_hash(location: str, folder: str = "data", rules_path=DEFAULT_RULES_PATH):
+    """
+    以來源檔案與規則設定檔的內容計算 SHA-256，用來判斷彙總檔是否過期。
+    """
+    sources = [path for path in csv_paths(location, folder) if os.path.exists(path)]
+    digest = hashlib.sha256()
+    digest.update(rules_version(rules_path).encode("utf-8"))
+    for path in sources or store_paths(location, folder):
+        digest.update(os.path.basename(path).encode("utf-8"))
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def compute_aggregates(df_reviews, df, rules_path=DEFAULT_RULES_PATH):
+    """
+    由評論表與句子表計算各頁面使用的靜態統計。
+
+    打卡活動偵測使用 rules.json 的 promotions 規則。
+    """
+    first = df_reviews.iloc[0]
+    ratings = df_reviews["Review Rating"].value_counts()
+    term_frequency = build_term_frequency(df)
+    label_counts = df["label"].value_counts()
+    promotions = load_rules(rules_path)["promotions"]
+    promotion_matches = RuleEngine(promotions).match(df_reviews["Review"])
+
+    def top_terms(frame):
+        return [[word, int(count)] for word, count in zip(frame["word"], frame["count"])]
+
+    return {
+        "schema_version": AGGREGATE_SCHEMA_VERSION,
+        "restaurant_name": str(first["Restaurant Name"]),
+        "overall_rating": float(first["Overall Rating"]),
+        "review_count": int(first["Review Count"]),
+        "scraped_review_count": int(len(df_reviews)),
+        "sentence_count": int(len(df)),
+        "rating_histogram": {str(r): int(ratings.get(r, 0)) for r in range(1, 6)},
+        "mean_rating": float(df_reviews["Review Rating"].mean()),
+        "label_counts": {str(label): int(count) for label, count in label_counts.items() if count > 0},
+        "top_terms": top_terms(term_frequency.top_k(TOP_K)),
+        "top_terms_by_label": {
+            str(label): top_terms(term_frequency.top_k_by("label", label, TOP_K))
+            for label, count in label_counts.items() if count > 0
+        },
+        "checkin_keywords": [kw for keywords in promotions.values() for kw in keywords],
+        "checkin_review_count": int(promotion_matches.any().sum()),
+        "promotion_hits": {name: int(count) for name, count in promotion_matches.hit_counts().items()},
+    }
+
+
+def write_aggregates(location: str, folder: str = "data", df_reviews=None, df=None):
+    """
+    計算並寫出店家彙總檔（ingest 步驟）。未提供資料時會從磁碟讀取。
+    """
+    if df_reviews is None or df is None:
+        df_reviews, df = read_store_data(location, folder)
+    return save_aggregates(location, folder, compute_aggregates(df_reviews, df))
+
+
+def save_aggregates(location: str, folder: str, aggregates):
+    """
+    標記來源版本後寫出彙總檔（先寫暫存檔再取代，讀取端不會看到寫到一半的檔案）。
+    """
+    aggregates["source_signature"] = aggregate_version(location, folder)
+    aggregates["source_hash"] = source_hash(location, folder)
+
+    _write_json(aggregate_path(location, folder), aggregates)
+    return aggregates
+
+
+def _write_json(path, aggregates):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(aggregates, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_path, path)
+
+
+def read_aggregates(location: str, folder: str = "data"):
+    """
+    讀取彙總檔；不存在、結構版本不符或來源已變動時回傳 None。
+
+    先比對檔案 mtime/大小與規則雜湊，不符時再比對內容雜湊（例如資料複製到其他機器後 mtime 改變）。
+    """
+    path = aggregate_path(location, folder)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, encoding="utf-8") as f:
+            aggregates = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if aggregates.get("schema_version") != AGGREGATE_SCHEMA_VERSION:
+        return None
+    if aggregates.get("source_signature") == aggregate_version(location, folder):
+        return aggregates
+    if aggregates.get("source_hash") == source_hash(location, folder):
+        # 內容未變只是 mtime 改變：更新簽章，之後的程序不必再計算雜湊
+        aggregates["source_signature"] = aggregate_version(location, folder)
+        try:
+            _write_json(path, aggregates)
+        except OSError:
+            pass
+        return aggregates
+    return None
+
+
+@traced("load.aggregates")
+def get_store_aggregates(handle):
+    """
+    取得目前資料集的彙總統計：優先讀取彙總檔，過期時才以共用資料即時計算並嘗試更新彙總檔。
+    """
+    def load():
+        aggregates = read_aggregates(handle.location, handle.folder)
+        if aggregates is not None:
+            return aggregates
+        df_reviews, df = resolve_store(handle)
+        with span("derive.aggregates"):
+            try:
+                return write_aggregates(handle.location, handle.folder, df_reviews, df)
+            except OSError:
+                # 資料夾唯讀時只在記憶體中保留即時計算結果
+                return compute_aggregates(df_reviews, df)
+
+    return registry.get(
+        (handle.folder, handle.location, "aggregates"),
+        aggregate_version(handle.location, handle.folder),
+        load,
+        lambda aggregates: len(json.dumps(aggregates, ensure_ascii=False).encode("utf-8")),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="產生店家彙總檔")
+    parser.add_argument("stores", nargs="*", help="店名，未指定時處理資料夾中所有店家")
+    parser.add_argument("--folder", default="data")
+    parser.add_argument("--force", action="store_true", help="即使彙總檔仍有效也重新產生")
+    args = parser.parse_args()
+
+    stores = args.stores or sorted(
+        os.path.basename(path)[: -len("_reviews.csv")]
+        for path in glob.glob(os.path.join(args.folder, "*_reviews.csv"))
+    )
+    for location in stores:
+        if not args.force and read_aggregates(location, args.folder) is not None:
+            print(f"{location}: 已是最新")
+            continue
+        write_aggregates(location, args.folder)
+        size = os.path.getsize(aggregate_path(location, args.folder))
+        print(f"{location}: {size / 1024:.1f} KB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# 打卡相關留言達此數量時提示店家可能有打卡活動
+CHECKIN_THRESHOLD = 3
+# 關鍵詞頁面只列出出現在超過此數量句子中的熱門詞
+MIN_KEYWORD_SENTENCES = 5
+
+_INTERPRETATIONS = {
+    "較高": "代表近期評價趨向正面，店家服務或品質可能提升。",
+    "較低": "代表近期評價趨向負面，店家服務或品質可能下降。",
+    "相當": "代表近期評價與過去評價相當，店家評價穩定。"
+}
+
+
+def summary_view(aggregates):
+    """
+    評論摘要：評分總覽、近期評價趨勢與打卡活動偵測。
+    """
+    avg_rating = round(aggregates["mean_rating"], 1)
+    overall_rating = aggregates["overall_rating"]
+    comparison = "較高" if avg_rating > overall_rating else "較低" if avg_rating < overall_rating else "相當"
+    return {
+        "restaurant_name": aggregates["restaurant_name"],
+        "overall_rating": overall_rating,
+        "mean_rating": avg_rating,
+        "review_count": aggregates["review_count"],
+        "scraped_review_count": aggregates["scraped_review_count"],
+        "comparison": comparison,
+        "interpretation": _INTERPRETATIONS[comparison],
+        "checkin_review_count": aggregates["checkin_review_count"],
+        "checkin_suspected": aggregates["checkin_review_count"] >= CHECKIN_THRESHOLD,
+    }
+
+
+def rating_view(aggregates):
+    """
+    評分分布：各星級留言數與平均分數。
+    """
+    return {
+        "scraped_review_count": aggregates["scraped_review_count"],
+        "mean_rating": aggregates["mean_rating"],
+        "rating_histogram": {int(rating): count for rating, count in aggregates["rating_histogram"].items()},
+    }
+
+
+def keyword_view(aggregates, keyword_index=None, top_n=5):
+    """
+    熱門關鍵詞（前 10 名詞頻），並附上前 top_n 名中出現在足夠多句子的詞與其句子數。
+    """
+    result = {"top_terms": [{"word": word, "count": count} for word, count in aggregates["top_terms"]]}
+    if "approximate" in aggregates:
+        # 近似詞頻：count 為下界，實際次數不超過 count + max_error
+        result["approximate"] = aggregates["approximate"]["top_terms"]
+    if keyword_index is not None:
+        result["discussed_terms"] = [
+            {"word": word, "sentences": keyword_index.document_frequency(word)}
+            for word, _ in aggregates["top_terms"][:top_n]
+            if keyword_index.document_frequency(word) >= MIN_KEYWORD_SENTENCES
+        ]
+    return result
+
+
+def keyword_sentences(df, keyword_index, word, limit=20, offset=0):
+    """
+    列出包含 word 的句子（依原始順序分頁，結果固定，方便快取）。
+    """
+    ids = keyword_index.sentence_ids(word)
+    return {
+        "word": word,
+        "total": int(len(ids)),
+        "sentences": df["sentence"].iloc[ids[offset:offset + limit]].tolist(),
+    }
+
+
+def topic_view(aggregates):
+    """
+    主題分布（排除「其他」，依聲量遞減）與各主題的前 10 個關鍵詞。
+    """
+    topics = sorted(
+        ((label, count) for label, count in aggregates["label_counts"].items() if label != "其他"),
+        key=lambda item: -item[1],
+    )
+    return {
+        "topics": [
+            {
+                "topic": label,
+                "sentences": count,
+                "top_terms": [
+                    {"word": word, "count": c} for word, c in aggregates["top_terms_by_label"].get(label, [])[:10]
+                ],
+            }
+            for label, count in topics
+        ],
+    }
+
+
+def review_list(df_reviews, rating=None, limit=20, offset=0):
+    """
+    依星級列出留言（依原始順序分頁）。
+    """
+    reviews = df_reviews if rating is None else df_reviews[df_reviews["Review Rating"] == rating]
+    page = reviews.iloc[offset:offset + limit]
+    return {
+        "rating": rating,
+        "total": int(len(reviews)),
+        "reviews": [
+            {"rating": int(r), "review": text}
+            for r, text in zip(page["Review Rating"], page["Review"])
+        ],
+    }
@@ -0,0 +1,268 @@
+import argparse
+import hashlib
+import json
+import os
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from utils.aggregates import aggregate_version, get_store_aggregates
+from utils.analytics import keyword_sentences, keyword_view, rating_view, review_list, summary_view, topic_view
+from utils.data_loader import resolve_store, store_handle
+from utils.dataset_cache import DatasetRegistry
+from utils.keyword_index import get_keyword_index
+from utils.rule_engine import rules_version
+from utils.store_catalog import catalog_version, get_store_catalog
+from utils.store_format import ANALYSIS_SENTENCE_COLUMNS
+
+# 回應格式版本，欄位變更時遞增（會一併讓所有 ETag 失效）
+API_VERSION = 1
+# 回應快取上限（MB）
+DEFAULT_MAX_MB = int(os.environ.get("REVIEW_API_CACHE_MB", "64"))
+MAX_PAGE_SIZE = 500
+
+
+class APIError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _int_param(query, name, default, minimum=0, maximum=None):
+    value = query.get(name)
+    if value is None or value == "":
+        return default
+    try:
+        value = int(value)
+    except ValueError:
+        raise APIError(400, f"{name} 必須是整數") from None
+    if value < minimum or (maximum is not None and value > maximum):
+        raise APIError(400, f"{name} 超出範圍")
+    return value
+
+
+def _etag(*parts):
+    digest = hashlib.sha1("\x1f".join(str(part) for part in (API_VERSION,) + parts).encode("utf-8"))
+    return f'"{digest.hexdigest()[:20]}"'
+
+
+def _matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
+class AnalyticsAPI:
+    """
+    與 HTTP 無關的分析 API：解析路徑、計算 ETag、以資料版本快取回應內容。
+
+    ETag 只由資料版本（檔案 mtime/大小與規則設定檔雜湊）與請求參數決定，
+    客戶端帶 If-None-Match 輪詢時不需要載入或計算任何資料即可回應 304。
+    """
+
+    def __init__(self, folder="data", max_bytes=DEFAULT_MAX_MB * 1024 * 1024):
+        self.folder = folder
+        self._cache = DatasetRegistry(max_bytes=max_bytes)
+
+    def handle(self, path, query=None, if_none_match=None):
+        """
+        Args:
+            path (str): 請求路徑，例如 /stores/阜杭豆漿/summary
+            query (dict): 查詢參數 {名稱: 值}
+            if_none_match (str): If-None-Match 標頭
+
+        Returns:
+            (狀態碼, ETag 或 None, 回應內容 bytes)
+        """
+        try:
+            parts = [unquote(part) for part in path.strip("/").split("/") if part]
+            key, version, compute = self._route(parts, query or {})
+        except APIError as e:
+            return e.status, None, self._encode({"error": str(e)})
+
+        etag = _etag(version, *key)
+        if _matches(if_none_match, etag):
+            return 304, etag, b""
+        try:
+            body = self._cache.get(key, version, lambda: self._encode(compute()), len)
+        except APIError as e:
+            return e.status, None, self._encode({"error": str(e)})
+        except FileNotFoundError:
+            return 404, None, self._encode({"error": "找不到店家資料"})
+        return 200, etag, body
+
+    @staticmethod
+    def _encode(payload):
+        return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    def _catalog_version(self):
+        return catalog_version(self.folder)
+
+    def _handle(self, location):
+        # 只建立代號，摘要等只需彙總檔的回應不會載入評論資料
+        if get_store_catalog(self.folder).get(location) is None:
+            raise APIError(404, f"找不到店家：{location}")
+        return store_handle(location, self.folder, sentence_columns=ANALYSIS_SENTENCE_COLUMNS)
+
+    def _route(self, parts, query):
+        """
+        回傳 (快取鍵, 資料版本, 計算函式)；快取鍵只包含正規化後的參數。
+        """
+        if not parts or parts == ["health"]:
+            return ("health",), API_VERSION, lambda: {"status": "ok", "api_version": API_VERSION}
+
+        if parts == ["stores"]:
+            q = query.get("q", "")
+            page = _int_param(query, "page", 0)
+            page_size = _int_param(query, "page_size", 50, 1, MAX_PAGE_SIZE)
+            return ("stores", q, page, page_size), self._catalog_version(), lambda: self._stores(q, page, page_size)
+
+        if parts == ["summaries"]:
+            # 批次取得多家店的摘要；版本由該頁所有店家的資料版本組成
+            q = query.get("q", "")
+            page = _int_param(query, "page", 0)
+            page_size = _int_param(query, "page_size", 100, 1, MAX_PAGE_SIZE)
+            entries, total = get_store_catalog(self.folder).search(q, page, page_size)
+            locations = [entry["location"] for entry in entries]
+            # 規則檔整個請求只檢查一次；各店家只 stat 來源檔
+            rules = rules_version()
+            version = hashlib.sha1("|".join(
+                [self._catalog_version()]
+                + [f"{location}:{aggregate_version(location, self.folder, rules=rules)}" for location in locations]
+            ).encode("utf-8")).hexdigest()
+            return ("summaries", q, page, page_size), version, lambda: self._summaries(locations, total, page)
+
+        if len(parts) >= 2 and parts[0] == "stores":
+            location = parts[1]
+            if (not location or location.startswith(".") or os.sep in location
+                    or get_store_catalog(self.folder).get(location) is None):
+                raise APIError(404, f"找不到店家：{location}")
+            view = parts[2] if len(parts) > 2 else "summary"
+            # 摘要含打卡統計，版本一併納入規則設定檔
+            version = aggregate_version(location, self.folder)
+
+            if len(parts) <= 3 and view in ("summary", "ratings", "topics", "keywords"):
+                return ("store", location, view), version, lambda: self._store_view(location, view)
+
+            if len(parts) == 4 and view == "keywords":
+                word = parts[3]
+                limit = _int_param(query, "limit", 20, 1, MAX_PAGE_SIZE)
+                offset = _int_param(query, "offset", 0)
+                return (("keyword", location, word, limit, offset), version,
+                        lambda: self._keyword_sentences(location, word, limit, offset))
+
+            if len(parts) == 3 and view == "reviews":
+                rating = _int_param(query, "rating", None, 1, 5)
+                limit = _int_param(query, "limit", 20, 1, MAX_PAGE_SIZE)
+                offset = _int_param(query, "offset", 0)
+                return (("reviews", location, rating, limit, offset), version,
+                        lambda: self._reviews(location, rating, limit, offset))
+
+        raise APIError(404, "找不到路徑")
+
+    def _stores(self, q, page, page_size):
+        entries, total = get_store_catalog(self.folder).search(q, page, page_size)
+        fields = ("location", "restaurant_name", "overall_rating", "review_count", "review_rows", "sentence_rows")
+        return {
+            "total": total,
+            "page": page,
+            "stores": [{field: entry.get(field) for field in fields} for entry in entries],
+        }
+
+    def _summaries(self, locations, total, page):
+        summaries = []
+        for location in locations:
+            try:
+                summaries.append({"location": location, **summary_view(get_store_aggregates(self._handle(location)))})
+            except FileNotFoundError:
+                continue
+        return {"total": total, "page": page, "summaries": summaries}
+
+    def _store_view(self, location, view):
+        handle = self._handle(location)
+        aggregates = get_store_aggregates(handle)
+        if view == "summary":
+            return summary_view(aggregates)
+        if view == "ratings":
+            return rating_view(aggregates)
+        if view == "topics":
+            return topic_view(aggregates)
+        return keyword_view(aggregates, get_keyword_index(handle))
+
+    def _keyword_sentences(self, location, word, limit, offset):
+        handle = self._handle(location)
+        df_reviews, df = resolve_store(handle)
+        return keyword_sentences(df, get_keyword_index(handle), word, limit, offset)
+
+    def _reviews(self, location, rating, limit, offset):
+        df_reviews, df = resolve_store(self._handle(location))
+        return review_list(df_reviews, rating, limit, offset)
+
+    def stats(self):
+        return self._cache.stats()
+
+
+class APIRequestHandler(BaseHTTPRequestHandler):
+    server_version = f"ReviewAnalyticsAPI/{API_VERSION}"
+    protocol_version = "HTTP/1.1"
+    quiet = False
+
+    def _respond(self, send_body):
+        url = urlsplit(self.path)
+        query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        status, etag, body = self.server.api.handle(url.path, query, self.headers.get("If-None-Match"))
+
+        self.send_response(status)
+        if etag:
+            self.send_header("ETag", etag)
+            # 客戶端每次都需以 If-None-Match 重新驗證
+            self.send_header("Cache-Control", "no-cache")
+        if status != 304:
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if send_body and body:
+            self.wfile.write(body)
+
+    def do_GET(self):
+        self._respond(send_body=True)
+
+    def do_HEAD(self):
+        self._respond(send_body=False)
+
+    def log_message(self, format, *args):
+        if not self.quiet:
+            super().log_message(format, *args)
+
+
+def make_server(host="127.0.0.1", port=8000, folder="data", quiet=False):
+    """
+    建立多執行緒 HTTP 伺服器（只用標準函式庫）。
+    """
+    handler = type("Handler", (APIRequestHandler,), {"quiet": quiet})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.api = AnalyticsAPI(folder)
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="評論分析 HTTP/JSON API（不需 Streamlit）")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--folder", default="data")
+    parser.add_argument("--quiet", action="store_true", help="不輸出每個請求的紀錄")
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, args.folder, args.quiet)
+    print(f"🚀 API 已啟動：http://{args.host}:{args.port}/stores")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,531 @@
+"""
+多店家評論收集器：以有限數量的工作執行緒同時收集多家店的評論，寫出 data/<店名>_reviews.csv。
+
+- 頁面來源可替換：SeleniumSource 操作瀏覽器捲動 Google Maps 評論，
+  FixtureSource 讀取本機 HTML 測試頁（benchmarks/fixture_site.py 提供的測試伺服器）。
+- 同一主機的請求共用速率限制；逾時、429 與 5xx 以指數退避重試。
+- 每收集 batch_size 則評論就附加寫入檢查點目錄中的暫存 CSV 並記錄游標，
+  中斷後重新執行會從上次的位置繼續捲動，評論不會整批留在記憶體中。
+
+用法：
+    python -m utils.collector 阜杭豆漿 小木屋鬆餅(台大店) --workers 4
+    python -m utils.collector --stores-file stores.txt --source fixture --base-url http://127.0.0.1:8765
+    python -m utils.collector --stores-file stores.txt --max-age-hours 24 --process   # 重新收集並增量處理
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from html.parser import HTMLParser
+from urllib.error import HTTPError, URLError
+from urllib.parse import quote, urlsplit
+from urllib.request import Request, urlopen
+
+import pandas as pd
+
+from utils.store_catalog import refresh_catalog
+
+REVIEW_COLUMNS = ["Restaurant Name", "Overall Rating", "Review Count", "Review", "Review Rating"]
+DEFAULT_CHECKPOINT_DIR = os.path.join(".checkpoints", "collect")
+# 同一主機每秒最多的請求數
+DEFAULT_RATE = 2.0
+DEFAULT_BATCH_SIZE = 200
+
+
+class TransientError(Exception):
+    """
+    可重試的錯誤（逾時、連線中斷、429、5xx）；retry_after 為伺服器要求的等待秒數。
+    """
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class StoreNotFound(Exception):
+    pass
+
+
+class RateLimiter:
+    """
+    依主機分配請求時段：同一主機相鄰兩次請求至少間隔 1 / rate 秒，不同主機互不影響。
+    """
+
+    def __init__(self, rate=DEFAULT_RATE):
+        self.interval = 1 / rate if rate else 0.0
+        self._next = {}
+        self._lock = threading.Lock()
+
+    def wait(self, host):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next.get(host, now))
+            self._next[host] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def with_retries(call, attempts=5, base_delay=0.5, max_delay=30.0, on_retry=None):
+    """
+    呼叫 call()，遇到 TransientError 時以指數退避（加上隨機抖動）重試，最多 attempts 次。
+    """
+    for attempt in range(attempts):
+        try:
+            return call()
+        except TransientError as e:
+            if attempt == attempts - 1:
+                raise
+            delay = min(max_delay, base_delay * 2 ** attempt) * (0.5 + random.random() / 2)
+            if e.retry_after:
+                delay = max(delay, e.retry_after)
+            if on_retry:
+                on_retry(e)
+            time.sleep(delay)
+
+
+class _PlaceParser(HTMLParser):
+    """
+    解析測試頁：.place 帶店家資訊，每個 .review 帶評分與評論文字，a.next 為下一頁。
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.meta = None
+        self.reviews = []
+        self.next_cursor = None
+        self._rating = None
+        self._text = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        classes = (attrs.get("class") or "").split()
+        if "place" in classes:
+            self.meta = {
+                "restaurant_name": attrs.get("data-name", ""),
+                "overall_rating": float(attrs.get("data-rating") or 0),
+                "review_count": int(attrs.get("data-review-count") or 0),
+            }
+        elif "review" in classes:
+            self._rating = int(attrs.get("data-rating") or 0)
+        elif "text" in classes and self._rating is not None:
+            self._text = []
+        elif "next" in classes:
+            self.next_cursor = int(attrs["data-start"])
+
+    def handle_data(self, data):
+        if self._text is not None:
+            self._text.append(data)
+
+    def handle_endtag(self, tag):
+        if tag == "span" and self._text is not None:
+            self.reviews.append(("".join(self._text), self._rating))
+            self._text = None
+            self._rating = None
+
+
+class FixtureSource:
+    """
+    從 HTTP 測試伺服器讀取店家頁面：GET <base_url>/place/<店名>?start=<游標>。
+    """
+
+    def __init__(self, base_url, timeout=10):
+        self.base_url = base_url.rstrip("/")
+        self.host = urlsplit(self.base_url).netloc
+        self.timeout = timeout
+
+    def fetch(self, store, cursor):
+        """
+        Returns:
+            dict：restaurant_name / overall_rating / review_count、
+            reviews（[(評論文字, 評分), ...]）與 next（下一頁游標，沒有下一頁時為 None）
+        """
+        url = f"{self.base_url}/place/{quote(store, safe='')}?start={int(cursor)}"
+        try:
+            with urlopen(Request(url, headers={"Accept": "text/html"}), timeout=self.timeout) as response:
+                body = response.read().decode("utf-8")
+        except HTTPError as e:
+            if e.code == 404:
+                raise StoreNotFound(store) from None
+            if e.code == 429 or e.code >= 500:
+                retry_after = e.headers.get("Retry-After")
+                raise TransientError(f"HTTP {e.code}", float(retry_after) if retry_after else None) from None
+            raise
+        except (URLError, socket.timeout, ConnectionError) as e:
+            raise TransientError(str(e)) from None
+
+        parser = _PlaceParser()
+        parser.feed(body)
+        parser.close()
+        if parser.meta is None:
+            raise TransientError("頁面不完整")
+        return dict(parser.meta, reviews=parser.reviews, next=parser.next_cursor)
+
+    def close(self):
+        pass
+
+
+class SeleniumSource:
+    """
+    以 Selenium 操作 Chrome：搜尋店家、開啟評論分頁並捲動載入評論。
+
+    每個工作執行緒使用自己的瀏覽器；游標為已收集的評論數，
+    恢復時會捲動到超過游標為止，只回傳尚未收集的評論。
+    Google Maps 的頁面結構常變動，選擇器集中在下方常數。
+    """
+
+    SEARCH_URL = "https://www.google.com/maps/search/{query}?hl=zh-TW"
+    TITLE = "h1.DUwDvf"
+    OVERALL_RATING = "div.F7nice span[aria-hidden='true']"
+    REVIEW_COUNT = "div.F7nice span[aria-label]"
+    REVIEWS_TAB = "button[role='tab'][aria-label*='評論']"
+    SCROLL_PANE = "div.m6QErb.DxyBCb"
+    REVIEW = "div.jftiEf"
+    REVIEW_TEXT = "span.wiI7pd"
+    REVIEW_STARS = "span.kvMYJc"
+    MORE_BUTTON = "button.w8nwRe"
+
+    def __init__(self, headless=True, scroll_pause=1.5, timeout=15):
+        self.host = "www.google.com"
+        self.headless = headless
+        self.scroll_pause = scroll_pause
+        self.timeout = timeout
+        self._local = threading.local()
+        self._drivers = []
+        self._lock = threading.Lock()
+
+    def _driver(self):
+        driver = getattr(self._local, "driver", None)
+        if driver is None:
+            from selenium import webdriver
+
+            options = webdriver.ChromeOptions()
+            if self.headless:
+                options.add_argument("--headless=new")
+            options.add_argument("--lang=zh-TW")
+            driver = webdriver.Chrome(options=options)
+            driver.set_page_load_timeout(self.timeout)
+            self._local.driver = driver
+            self._local.store = None
+            with self._lock:
+                self._drivers.append(driver)
+        return driver
+
+    def _open(self, driver, store):
+        from selenium.common.exceptions import TimeoutException
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.webdriver.support.ui import WebDriverWait
+
+        driver.get(self.SEARCH_URL.format(query=quote(store)))
+        wait = WebDriverWait(driver, self.timeout)
+        try:
+            title = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, self.TITLE))).text
+            rating = driver.find_element(By.CSS_SELECTOR, self.OVERALL_RATING).text
+            count = driver.find_element(By.CSS_SELECTOR, self.REVIEW_COUNT).get_attribute("aria-label")
+            wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, self.REVIEWS_TAB))).click()
+            wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, self.SCROLL_PANE)))
+        except TimeoutException:
+            raise TransientError(f"{store}: 頁面載入逾時") from None
+        self._local.store = store
+        self._local.meta = {
+            "restaurant_name": title,
+            "overall_rating": float(rating or 0),
+            "review_count": int("".join(ch for ch in count or "" if ch.isdigit()) or 0),
+        }
+
+    def fetch(self, store, cursor):
+        from selenium.common.exceptions import WebDriverException
+        from selenium.webdriver.common.by import By
+
+        driver = self._driver()
+        try:
+            if self._local.store != store:
+                self._open(driver, store)
+            pane = driver.find_element(By.CSS_SELECTOR, self.SCROLL_PANE)
+            loaded = driver.find_elements(By.CSS_SELECTOR, self.REVIEW)
+            stalled = 0
+            # 捲動直到載入超過游標的評論；連續三次沒有新評論視為已到底
+            while len(loaded) <= cursor and stalled < 3:
+                driver.execute_script("arguments[0].scrollTop = arguments[0].scrollHeight", pane)
+                time.sleep(self.scroll_pause)
+                more = driver.find_elements(By.CSS_SELECTOR, self.REVIEW)
+                stalled = stalled + 1 if len(more) == len(loaded) else 0
+                loaded = more
+
+            reviews = []
+            for element in loaded[cursor:]:
+                for button in element.find_elements(By.CSS_SELECTOR, self.MORE_BUTTON):
+                    driver.execute_script("arguments[0].click()", button)
+                texts = element.find_elements(By.CSS_SELECTOR, self.REVIEW_TEXT)
+                stars = element.find_element(By.CSS_SELECTOR, self.REVIEW_STARS).get_attribute("aria-label")
+                rating = int(next((ch for ch in stars if ch.isdigit()), "0"))
+                reviews.append((texts[0].text if texts else "", rating))
+        except WebDriverException as e:
+            # 瀏覽器狀態不明，下次重新開啟頁面
+            self._local.store = None
+            raise TransientError(f"{store}: {e.msg}") from None
+        return dict(self._local.meta, reviews=reviews, next=cursor + len(reviews) if reviews else None)
+
+    def close(self):
+        with self._lock:
+            for driver in self._drivers:
+                driver.quit()
+            self._drivers = []
+
+
+class CollectJob:
+    """
+    單一店家的收集進度與檢查點。
+
+    檢查點目錄：<checkpoint_dir>/<店名>/，內含 progress.json（游標、已寫入列數與位元組數）
+    與逐批附加的 reviews.csv。恢復時先把暫存 CSV 截到最後一次記錄的長度，
+    丟棄寫到一半的批次，再從記錄的游標繼續。
+    """
+
+    def __init__(self, store, folder, checkpoint_dir):
+        self.store = store
+        self.folder = folder
+        self.output_path = os.path.join(folder, f"{store}_reviews.csv")
+        self.checkpoint_path = os.path.join(checkpoint_dir, store)
+        self.progress_path = os.path.join(self.checkpoint_path, "progress.json")
+        self.partial_path = os.path.join(self.checkpoint_path, "reviews.csv")
+        self.progress = {"cursor": 0, "rows": 0, "bytes": 0, "meta": None, "done": False}
+
+    def load(self):
+        if os.path.exists(self.progress_path):
+            with open(self.progress_path, encoding="utf-8") as f:
+                self.progress = json.load(f)
+        return self.progress
+
+    def is_fresh(self, max_age):
+        """
+        上次收集已完成、輸出檔存在，且（指定 max_age 秒時）完成時間在 max_age 秒內。
+        """
+        progress = self.load()
+        if not progress.get("done") or not os.path.exists(self.output_path):
+            return False
+        return max_age is None or time.time() - progress.get("finished_at", 0) < max_age
+
+    def start(self, force=False):
+        """
+        準備收集：已完成或 force 時從頭開始，否則從檢查點恢復。回傳起始游標。
+        """
+        progress = self.load()
+        if force or progress.get("done"):
+            shutil.rmtree(self.checkpoint_path, ignore_errors=True)
+            self.progress = {"cursor": 0, "rows": 0, "bytes": 0, "meta": None, "done": False}
+        os.makedirs(self.checkpoint_path, exist_ok=True)
+        with open(self.partial_path, "ab") as f:
+            f.truncate(self.progress["bytes"])
+        return self.progress["cursor"]
+
+    def append(self, reviews, meta, cursor):
+        """
+        附加一批評論並記錄游標；先寫資料再寫進度，中斷時最多重抓一批。
+        """
+        rows = self.progress["rows"]
+        batch = pd.DataFrame(
+            [(meta["restaurant_name"], meta["overall_rating"], meta["review_count"], text, rating)
+             for text, rating in reviews],
+            columns=REVIEW_COLUMNS,
+            index=pd.RangeIndex(rows, rows + len(reviews)),
+        )
+        with open(self.partial_path, "a", encoding="utf-8", newline="") as f:
+            batch.to_csv(f, header=rows == 0)
+            f.flush()
+            os.fsync(f.fileno())
+        size = os.path.getsize(self.partial_path)
+        self.progress.update(cursor=cursor, rows=rows + len(reviews), bytes=size, meta=meta)
+        self._write_progress()
+
+    def finish(self):
+        """
+        將暫存 CSV 移到 data/<店名>_reviews.csv（沒有任何評論時只寫出標頭）。
+        """
+        if self.progress["rows"] == 0:
+            with open(self.partial_path, "w", encoding="utf-8", newline="") as f:
+                pd.DataFrame(columns=REVIEW_COLUMNS).to_csv(f)
+        os.makedirs(self.folder, exist_ok=True)
+        tmp_path = f"{self.output_path}.tmp"
+        shutil.copyfile(self.partial_path, tmp_path)
+        os.replace(tmp_path, self.output_path)
+        os.remove(self.partial_path)
+        self.progress.update(done=True, bytes=0, finished_at=time.time())
+        self._write_progress()
+
+    def _write_progress(self):
+        tmp_path = f"{self.progress_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.progress, f, ensure_ascii=False)
+        os.replace(tmp_path, self.progress_path)
+
+
+def collect_store(job, source, limiter, batch_size=DEFAULT_BATCH_SIZE, max_reviews=None, force=False,
+                  attempts=5, base_delay=0.5, stats=None):
+    """
+    收集單一店家：逐頁抓取，每滿 batch_size 則寫入檢查點，最後寫出評論 CSV。回傳評論數。
+    """
+    stats = stats if stats is not None else {}
+    lock = stats.setdefault("_lock", threading.Lock())
+
+    def count(key, amount=1):
+        with lock:
+            stats[key] = stats.get(key, 0) + amount
+
+    def fetch(cursor):
+        limiter.wait(source.host)
+        count("pages")
+        return source.fetch(job.store, cursor)
+
+    cursor = job.start(force)
+    collected = job.progress["rows"]
+    meta = job.progress["meta"]
+    pending = []
+    while cursor is not None and (max_reviews is None or collected + len(pending) < max_reviews):
+        page = with_retries(lambda: fetch(cursor), attempts, base_delay, on_retry=lambda e: count("retries"))
+        meta = {key: page[key] for key in ("restaurant_name", "overall_rating", "review_count")}
+        reviews = page["reviews"]
+        if max_reviews is not None:
+            reviews = reviews[: max_reviews - collected - len(pending)]
+        pending.extend(reviews)
+        cursor = page["next"]
+        if len(pending) >= batch_size:
+            job.append(pending, meta, cursor)
+            collected += len(pending)
+            pending = []
+    if pending:
+        job.append(pending, meta, cursor)
+        collected += len(pending)
+    job.finish()
+    count("reviews", collected)
+    return collected
+
+
+def collect_stores(stores, source, folder="data", workers=4, checkpoint_dir=DEFAULT_CHECKPOINT_DIR,
+                   batch_size=DEFAULT_BATCH_SIZE, rate=DEFAULT_RATE, max_reviews=None, force=False,
+                   max_age=None, attempts=5, base_delay=0.5):
+    """
+    以 workers 個執行緒同時收集多家店；單一店家失敗不影響其他店家，檢查點保留到下次執行。
+
+    max_age（秒）指定時，完成時間在 max_age 內的店家略過；未指定時略過所有已完成的店家。
+    force 為 True 時全部重新收集。
+
+    Returns:
+        dict：stores（完成店家）、skipped、failed（{店名: 錯誤訊息}）、reviews、pages、retries、elapsed
+    """
+    started = time.perf_counter()
+    limiter = RateLimiter(rate)
+    stats = {"stores": [], "skipped": [], "failed": {}, "reviews": 0, "pages": 0, "retries": 0}
+
+    jobs = []
+    for store in stores:
+        job = CollectJob(store, folder, checkpoint_dir)
+        if not force and job.is_fresh(max_age):
+            stats["skipped"].append(store)
+            continue
+        if job.progress.get("rows") and not job.progress.get("done"):
+            print(f"🔁 {store}: 從第 {job.progress['rows']} 則評論繼續")
+        jobs.append(job)
+
+    refresh = force or max_age is not None
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(collect_store, job, source, limiter, batch_size, max_reviews, force,
+                            attempts, base_delay, stats): job
+            for job in jobs
+        }
+        for future in as_completed(futures):
+            job = futures[future]
+            try:
+                collected = future.result()
+            except (TransientError, StoreNotFound, OSError, ValueError) as e:
+                stats["failed"][job.store] = f"{type(e).__name__}: {e}"
+                print(f"❌ {job.store}: {stats['failed'][job.store]}")
+                continue
+            stats["stores"].append(job.store)
+            print(f"✅ {job.store}: {collected} 則評論{'（重新收集）' if refresh else ''}")
+
+    if stats["stores"]:
+        # 新收集的店家（尚未處理）出現在店家目錄中
+        refresh_catalog(folder)
+    stats.pop("_lock", None)
+    stats["elapsed"] = time.perf_counter() - started
+    return stats
+
+
+def make_source(name, base_url=None, headless=True):
+    if name == "fixture":
+        if not base_url:
+            raise ValueError("fixture 來源需要 --base-url")
+        return FixtureSource(base_url)
+    if name == "selenium":
+        return SeleniumSource(headless=headless)
+    raise ValueError(f"未知的來源：{name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="同時收集多家店的評論（可中斷恢復）")
+    parser.add_argument("stores", nargs="*", help="店名（搜尋關鍵字）")
+    parser.add_argument("--stores-file", help="店名清單檔，每行一家")
+    parser.add_argument("--folder", default="data")
+    parser.add_argument("--source", choices=["selenium", "fixture"], default="selenium")
+    parser.add_argument("--base-url", help="fixture 來源的測試伺服器網址")
+    parser.add_argument("--show-browser", action="store_true", help="顯示瀏覽器視窗（selenium）")
+    parser.add_argument("--workers", type=int, default=4, help="同時收集的店家數")
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE, help="同一主機每秒最多請求數")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="每批寫入檢查點的評論數")
+    parser.add_argument("--max-reviews", type=int, help="每家店最多收集的評論數")
+    parser.add_argument("--retries", type=int, default=5, help="每頁最多嘗試次數")
+    parser.add_argument("--checkpoint-dir", default=DEFAULT_CHECKPOINT_DIR)
+    parser.add_argument("--max-age-hours", type=float, help="重新收集超過此時數的店家（預設略過所有已完成店家）")
+    parser.add_argument("--force", action="store_true", help="忽略檢查點全部重新收集")
+    parser.add_argument("--process", action="store_true", help="收集完成後執行增量處理流程")
+    parser.add_argument("--process-workers", type=int, help="處理流程的工作程序數")
+    args = parser.parse_args()
+
+    stores = list(args.stores)
+    if args.stores_file:
+        with open(args.stores_file, encoding="utf-8") as f:
+            stores += [line.strip() for line in f if line.strip()]
+    stores = list(dict.fromkeys(stores))
+    if not stores:
+        parser.error("請指定店名或 --stores-file")
+    for store in stores:
+        if os.sep in store or (os.altsep and os.altsep in store):
+            parser.error(f"店名不可包含路徑分隔字元：{store}")
+
+    source = make_source(args.source, args.base_url, headless=not args.show_browser)
+    try:
+        stats = collect_stores(
+            stores,
+            source,
+            folder=args.folder,
+            workers=args.workers,
+            checkpoint_dir=args.checkpoint_dir,
+            batch_size=args.batch_size,
+            rate=args.rate,
+            max_reviews=args.max_reviews,
+            force=args.force,
+            max_age=args.max_age_hours * 3600 if args.max_age_hours is not None else None,
+            attempts=args.retries,
+        )
+    finally:
+        source.close()
+
+    print(f"📦 完成 {len(stats['stores'])} 家、略過 {len(stats['skipped'])} 家、失敗 {len(stats['failed'])} 家；"
+          f"評論 {stats['reviews']} 則，{stats['pages']} 次請求（重試 {stats['retries']} 次），"
+          f"耗時 {stats['elapsed']:.1f} 秒")
+
+    if args.process and stats["stores"]:
+        from process_reviews import report, run_pipeline
+
+        report(run_pipeline(stats["stores"], folder=args.folder, workers=args.process_workers, incremental=True))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,314 @@
+"""
+跨店家比較：把所有店家的彙總檔整理成一張欄式長表 data/comparison.feather，
+每列為「店家 × 指標」（主題占比、星級占比、熱門詞、店家層級指標），
+排名、篩選與並排比較都以向量運算完成，不讀取任何店家的句子資料。
+
+表格以各店彙總檔的 mtime/大小與資料版本做增量更新，只重新讀取變動的店家。
+
+用法：
+    python -m utils.comparison                            # 更新比較表
+    python -m utils.comparison --rank label 服務 --ascending
+    python -m utils.comparison --rank store rating_gap --min-reviews 50
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from utils.aggregates import aggregate_path, aggregate_version, read_aggregates
+from utils.dataset_cache import registry
+from utils.store_catalog import get_store_catalog
+
+COMPARISON_SCHEMA_VERSION = 1
+COMPARISON_FILENAME = "comparison.feather"
+_METADATA_KEY = b"comparison"
+
+# 指標種類：label 主題占比（占句子數）、rating 星級占比（占抓取留言數）、
+# term 熱門詞（每句出現次數，只含各店前 10 名）、store 店家層級指標
+KINDS = ("label", "rating", "term", "store")
+STORE_METRICS = {
+    "rating_gap": "抓取平均 − Google 評分",
+    "mean_rating": "抓取留言平均得分",
+    "overall_rating": "Google Map 評分",
+    "scraped_review_count": "抓取留言數",
+    "review_count": "Google Map 留言數",
+    "sentence_count": "句子數",
+    "checkin_review_count": "打卡相關留言數",
+    "checkin_share": "打卡相關留言占比",
+}
+COLUMNS = ["store", "kind", "key", "count", "value"]
+
+
+def comparison_path(folder: str = "data"):
+    """
+    回傳比較表路徑：data/comparison.feather
+    """
+    return os.path.join(folder, COMPARISON_FILENAME)
+
+
+def aggregate_rows(location, aggregates):
+    """
+    將單一店家的彙總統計展開成比較表的列：[(store, kind, key, count, value), ...]
+    """
+    scraped = aggregates["scraped_review_count"]
+    sentences = aggregates["sentence_count"]
+    metrics = {
+        "rating_gap": aggregates["mean_rating"] - aggregates["overall_rating"],
+        "mean_rating": aggregates["mean_rating"],
+        "overall_rating": aggregates["overall_rating"],
+        "scraped_review_count": scraped,
+        "review_count": aggregates["review_count"],
+        "sentence_count": sentences,
+        "checkin_review_count": aggregates["checkin_review_count"],
+        "checkin_share": aggregates["checkin_review_count"] / scraped if scraped else 0.0,
+    }
+    rows = [(location, "store", name, 0, float(value)) for name, value in metrics.items()]
+    rows += [(location, "label", label, count, count / sentences if sentences else 0.0)
+             for label, count in aggregates["label_counts"].items()]
+    rows += [(location, "rating", rating, count, count / scraped if scraped else 0.0)
+             for rating, count in aggregates["rating_histogram"].items()]
+    rows += [(location, "term", word, count, count / sentences if sentences else 0.0)
+             for word, count in aggregates["top_terms"]]
+    return rows
+
+
+def _to_table(frame, sources):
+    table = pa.table({
+        "store": pa.array(frame["store"].astype(str).tolist()).dictionary_encode(),
+        "kind": pa.array(frame["kind"].astype(str).tolist()).dictionary_encode(),
+        "key": pa.array(frame["key"].astype(str).tolist()).dictionary_encode(),
+        "count": pa.array(frame["count"].to_numpy(dtype=np.int64)),
+        "value": pa.array(frame["value"].to_numpy(dtype=np.float64)),
+    })
+    metadata = {"schema_version": COMPARISON_SCHEMA_VERSION, "sources": sources}
+    return table.replace_schema_metadata({_METADATA_KEY: json.dumps(metadata, ensure_ascii=False).encode("utf-8")})
+
+
+def read_comparison_table(folder: str = "data"):
+    """
+    讀取比較表，回傳 (pyarrow.Table, 各店來源資訊)；不存在或結構版本不符時回傳 (None, {})。
+    """
+    try:
+        table = feather.read_table(comparison_path(folder), memory_map=True)
+        metadata = json.loads(table.schema.metadata[_METADATA_KEY])
+    except (OSError, KeyError, TypeError, ValueError, pa.ArrowInvalid):
+        return None, {}
+    if metadata.get("schema_version") != COMPARISON_SCHEMA_VERSION:
+        return None, {}
+    return table, metadata["sources"]
+
+
+def _source_key(location, folder):
+    try:
+        stat = os.stat(aggregate_path(location, folder))
+    except OSError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size, aggregate_version(location, folder)]
+
+
+def update_comparison_table(folder: str = "data", stores=None, force=False):
+    """
+    增量更新比較表：彙總檔與資料版本都未變動的店家沿用既有的列，其餘重新讀取彙總檔。
+
+    Args:
+        stores (list): 只更新指定店家；None 代表店家目錄中的所有店家（並移除已不存在的店家）
+
+    Returns:
+        {"updated", "current", "removed", "missing"}：missing 為沒有有效彙總檔的店家
+        （可執行 python -m utils.aggregates 產生）
+    """
+    table, sources = (None, {}) if force else read_comparison_table(folder)
+    old = table.to_pandas() if table is not None else pd.DataFrame(columns=COLUMNS)
+    stats = {"updated": [], "current": [], "removed": [], "missing": []}
+
+    locations = stores if stores is not None else [entry["location"] for entry in get_store_catalog(folder).entries]
+    keep = set(sources) - set(locations) if stores is not None else set()
+    new_sources = {location: sources[location] for location in keep}
+    rows = []
+    for location in locations:
+        key = _source_key(location, folder)
+        if key is not None and sources.get(location) == key:
+            keep.add(location)
+            new_sources[location] = key
+            stats["current"].append(location)
+            continue
+        aggregates = read_aggregates(location, folder) if key is not None else None
+        if aggregates is None:
+            stats["missing"].append(location)
+            continue
+        rows += aggregate_rows(location, aggregates)
+        new_sources[location] = key
+        stats["updated"].append(location)
+    stats["removed"] = sorted(set(sources) - set(new_sources))
+
+    if not stats["updated"] and not stats["removed"] and table is not None:
+        return stats
+    frame = pd.concat(
+        [old[old["store"].isin(keep)], pd.DataFrame(rows, columns=COLUMNS)], ignore_index=True
+    ) if rows else old[old["store"].isin(keep)]
+
+    path = comparison_path(folder)
+    tmp_path = f"{path}.tmp"
+    try:
+        feather.write_feather(_to_table(frame, new_sources), tmp_path)
+        os.replace(tmp_path, path)
+    except OSError:
+        # 資料夾唯讀時略過寫入，get_comparison_table 會改用記憶體中的結果
+        stats["table"] = _to_table(frame, new_sources)
+    return stats
+
+
+class ComparisonTable:
+    """
+    記憶體中的比較表：依 (kind, key, 店家) 排序後以 CSR 形式存放，
+    取得任一指標在所有店家的數值只需一次切片與 scatter。
+    """
+
+    def __init__(self, table, missing=()):
+        self.missing = list(missing)
+        frame = table.to_pandas()
+        self.locations = sorted(frame["store"].astype(str).unique())
+        store_codes = pd.Categorical(frame["store"].astype(str), categories=self.locations).codes
+        kinds = frame["kind"].astype(str).to_numpy()
+        keys = frame["key"].astype(str).to_numpy()
+        order = np.lexsort((store_codes, keys, kinds))
+
+        self.store_codes = store_codes[order].astype(np.int32)
+        self.counts = frame["count"].to_numpy(dtype=np.int64)[order]
+        self.values = frame["value"].to_numpy(dtype=np.float64)[order]
+        kinds, keys = kinds[order], keys[order]
+        starts = np.flatnonzero(np.concatenate(([True], (kinds[1:] != kinds[:-1]) | (keys[1:] != keys[:-1]))))
+        starts = starts[starts < len(order)]
+        ends = np.append(starts[1:], len(order))
+        self._lookup = {(kinds[s], keys[s]): (s, e) for s, e in zip(starts, ends)}
+        self._keys = {}
+        for (kind, key), (start, end) in self._lookup.items():
+            self._keys.setdefault(kind, []).append((key, end - start))
+        self.summary = pd.DataFrame(
+            {name: self.vector("store", name) for name in STORE_METRICS}, index=pd.Index(self.locations, name="店家")
+        )
+
+    @property
+    def nbytes(self):
+        return int(self.store_codes.nbytes + self.counts.nbytes + self.values.nbytes
+                   + self.summary.memory_usage(deep=True).sum() + len(self._lookup) * 150)
+
+    def __len__(self):
+        return len(self.locations)
+
+    def keys(self, kind):
+        """
+        指標的可選項目：依涵蓋的店家數遞減（星級依 5 → 1）。
+        """
+        items = self._keys.get(kind, [])
+        if kind == "rating":
+            return sorted((key for key, _ in items), reverse=True)
+        if kind == "store":
+            return [name for name in STORE_METRICS if (kind, name) in self._lookup]
+        return [key for key, _ in sorted(items, key=lambda item: (-item[1], item[0]))]
+
+    def vector(self, kind, key, column="value"):
+        """
+        回傳指標在所有店家的數值（依 self.locations 順序）。
+
+        主題與星級沒有資料代表 0；熱門詞只記錄各店前 10 名，沒有資料為 NaN。
+        """
+        fill = 0.0 if kind in ("label", "rating") else np.nan
+        result = np.full(len(self.locations), fill)
+        start, end = self._lookup.get((kind, key), (0, 0))
+        source = self.values if column == "value" else self.counts
+        result[self.store_codes[start:end]] = source[start:end]
+        return result
+
+    def mask(self, query="", min_reviews=0, conditions=()):
+        """
+        篩選店家：店名包含 query、抓取留言數至少 min_reviews，且符合所有 (kind, key, 運算子, 門檻) 條件。
+        """
+        keep = self.summary["scraped_review_count"].to_numpy() >= min_reviews
+        if query:
+            keep &= pd.Index(self.locations).str.contains(query, case=False, regex=False)
+        operators = {">=": np.greater_equal, "<=": np.less_equal, ">": np.greater, "<": np.less}
+        for kind, key, operator, threshold in conditions:
+            keep &= operators[operator](self.vector(kind, key), threshold)
+        return keep
+
+    def rank(self, kind, key, ascending=False, limit=20, mask=None):
+        """
+        依指標排名（沒有數值的店家排除），回傳含店家層級指標的 DataFrame。
+        """
+        values = self.vector(kind, key)
+        counts = self.vector(kind, key, column="count")
+        keep = ~np.isnan(values)
+        if mask is not None:
+            keep &= mask
+        rows = np.flatnonzero(keep)
+        # 數值相同時依店名排序，結果固定
+        order = np.lexsort((rows, values[rows] if ascending else -values[rows]))[:limit]
+        picked = rows[order]
+        ranking = self.summary.iloc[picked][["scraped_review_count", "mean_rating", "overall_rating"]].copy()
+        ranking.insert(0, "value", values[picked])
+        if kind != "store":
+            ranking.insert(1, "count", counts[picked].astype(np.int64))
+        ranking.insert(0, "rank", np.arange(1, len(picked) + 1))
+        return ranking
+
+    def side_by_side(self, locations, kind):
+        """
+        並排比較：列為指標項目、欄為店家。
+        """
+        columns = [self.locations.index(location) for location in locations if location in self.locations]
+        keys = self.keys(kind)
+        values = np.array([self.vector(kind, key)[columns] for key in keys]).reshape(len(keys), len(columns))
+        return pd.DataFrame(values, index=pd.Index(keys, name=kind), columns=[self.locations[i] for i in columns])
+
+
+def get_comparison_table(folder: str = "data"):
+    """
+    取得程序共用的 ComparisonTable；資料夾內容變動時先增量更新比較表。
+    """
+    def load():
+        stats = update_comparison_table(folder)
+        table = stats.get("table")
+        if table is None:
+            table, _ = read_comparison_table(folder)
+        if table is None:
+            table = _to_table(pd.DataFrame(columns=COLUMNS), {})
+        return ComparisonTable(table, stats["missing"])
+
+    return registry.get(
+        ("comparison", os.path.abspath(folder)),
+        str(os.stat(folder).st_mtime_ns),
+        load,
+        lambda comparison: comparison.nbytes,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="更新跨店家比較表並查詢排名")
+    parser.add_argument("--folder", default="data")
+    parser.add_argument("--force", action="store_true", help="重新讀取所有店家的彙總檔")
+    parser.add_argument("--rank", nargs=2, metavar=("KIND", "KEY"), help=f"依指標排名，KIND 為 {'/'.join(KINDS)}")
+    parser.add_argument("--ascending", action="store_true", help="由低到高排名")
+    parser.add_argument("--min-reviews", type=int, default=0, help="只列出抓取留言數至少此數量的店家")
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    stats = update_comparison_table(args.folder, force=args.force)
+    print(f"📊 更新 {len(stats['updated'])} 家、沿用 {len(stats['current'])} 家、移除 {len(stats['removed'])} 家："
+          f"{comparison_path(args.folder)}")
+    if stats["missing"]:
+        print(f"⚠️ {len(stats['missing'])} 家店沒有有效的彙總檔，請先執行 python -m utils.aggregates")
+
+    if args.rank:
+        kind, key = args.rank
+        comparison = get_comparison_table(args.folder)
+        ranking = comparison.rank(kind, key, args.ascending, args.limit, comparison.mask(min_reviews=args.min_reviews))
+        print(ranking.to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,135 @@
 import pandas as pd
 import os
+from utils.dataset_cache import DatasetHandle, file_signature, registry
+from utils.profiler import span, traced
+from utils.store_format import (
+    REVIEW_COLUMNS,
+    SENTENCE_COLUMNS,
+    convert_csv_store,
+    csv_paths,
+    is_store_current,
+    read_store,
+    store_paths,
+)
 
-def load_store_data(location: str, folder: str = "data"):
+@traced("load.read_store_data")
+def read_store_data(location: str, folder: str = "data", review_columns=None, sentence_columns=None):
     """
-    根據中文店名 location 直接讀取 data 資料夾中的 df_reviews 和 df 檔案
+    從磁碟讀取店家資料（不經快取）。
 
-    例如 location = "麥當勞"
-    對應讀取：data/麥當勞.csv 和 data/麥當勞_reviews.csv
+    優先讀取欄式檔案：data/<店名>_reviews.feather 和 data/<店名>_sentences.feather
+    若欄式檔案不存在或比 CSV 舊，會先由 data/<店名>.csv 和 data/<店名>_reviews.csv 轉換
     """
     df_path = os.path.join(folder, f"{location}.csv")
     df_reviews_path = os.path.join(folder, f"{location}_reviews.csv")
 
-    # 檢查檔案是否存在
-    if not os.path.exists(df_path):
-        raise FileNotFoundError(f"找不到檔案：{df_path}")
-    if not os.path.exists(df_reviews_path):
-        raise FileNotFoundError(f"找不到檔案：{df_reviews_path}")
+    if not is_store_current(location, folder):
+        # 檢查檔案是否存在
+        if not os.path.exists(df_path):
+            raise FileNotFoundError(f"找不到檔案：{df_path}")
+        if not os.path.exists(df_reviews_path):
+            raise FileNotFoundError(f"找不到檔案：{df_reviews_path}")
+
+        try:
+            with span("load.convert_csv_store"):
+                convert_csv_store(location, folder)
+        except OSError:
+            # 資料夾唯讀時退回直接讀取 CSV
+            df = pd.read_csv(df_path, usecols=sentence_columns or SENTENCE_COLUMNS)
+            df_reviews = pd.read_csv(df_reviews_path, usecols=review_columns or REVIEW_COLUMNS)
+            return df_reviews, df
+
+    return read_store(location, folder, review_columns, sentence_columns)
+
+
+def store_version(location: str, folder: str = "data"):
+    """
+    依來源檔案的 mtime 與大小計算店家資料版本。
+    """
+    sources = [path for path in csv_paths(location, folder) if os.path.exists(path)]
+    return file_signature(sources or store_paths(location, folder))
+
+
+def _make_handle(location, folder, review_columns, sentence_columns):
+    return DatasetHandle(
+        location=location,
+        folder=os.path.abspath(folder),
+        review_columns=tuple(review_columns or REVIEW_COLUMNS),
+        sentence_columns=tuple(sentence_columns or SENTENCE_COLUMNS),
+        version=store_version(location, folder),
+    )
+
+
+def store_handle(location: str, folder: str = "data", review_columns=None, sentence_columns=None):
+    """
+    建立 DatasetHandle 但不載入資料（只需要彙總檔等衍生資料時使用）。
+    """
+    return _make_handle(location, folder, review_columns, sentence_columns)
+
+
+def open_store(location: str, folder: str = "data", review_columns=None, sentence_columns=None):
+    """
+    透過程序共用快取載入店家資料，回傳給 session 保存的 DatasetHandle。
+    """
+    handle = _make_handle(location, folder, review_columns, sentence_columns)
+    resolve_store(handle)
+    return handle
+
+
+@traced("load.resolve_store")
+def resolve_store(handle: DatasetHandle):
+    """
+    由 DatasetHandle 取得共用的 (df_reviews, df)；資料檔變動或已被淘汰時會重新載入。
+
+    回傳的 DataFrame 由所有 session 共用，請勿直接修改。
+    """
+    version = store_version(handle.location, handle.folder)
+    return registry.get(
+        handle.key,
+        version,
+        lambda: read_store_data(
+            handle.location, handle.folder,
+            list(handle.review_columns), list(handle.sentence_columns),
+        ),
+    )
+
+
+def resolve_derived(handle: DatasetHandle, name: str, builder, sizeof=None):
+    """
+    取得由店家資料衍生的共用物件（索引、統計等），每個資料版本只建立一次。
+
+    builder(df_reviews, df) 負責建立物件；sizeof(obj) 估計大小以納入快取記憶體上限
+    """
+    version = store_version(handle.location, handle.folder)
+
+    def build():
+        df_reviews, df = resolve_store(handle)
+        with span(f"derive.{name}"):
+            return builder(df_reviews, df)
+
+    return registry.get(handle.key + (name,), version, build, sizeof or _object_nbytes)
+
+
+def _object_nbytes(obj):
+    nbytes = getattr(obj, "nbytes", None)
+    return int(nbytes) if nbytes is not None else 0
 
-    df = pd.read_csv(df_path)
-    df_reviews = pd.read_csv(df_reviews_path)
 
-    return df_reviews, df
+def load_store_data(location: str, folder: str = "data", review_columns=None, sentence_columns=None):
+    """
+    根據中文店名 location 直接讀取 data 資料夾中的 df_reviews 和 df 檔案
+
+    例如 location = "麥當勞"
+    對應讀取：data/麥當勞.csv 和 data/麥當勞_reviews.csv（首次載入時轉為欄式格式）
+
+    review_columns / sentence_columns 可指定只讀取頁面需要的欄位，None 代表全部
+    資料經由程序共用快取取得，同一版本的檔案在程序中只解析一次
+    """
+    return resolve_store(_make_handle(location, folder, review_columns, sentence_columns))
+
+
+def dataset_cache_stats():
+    """
+    回傳共用資料快取的命中/未命中/淘汰統計。
+    """
+    return registry.stats()
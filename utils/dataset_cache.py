@@ -0,0 +1,130 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+# 全程序共用的資料快取上限（MB），可用環境變數調整
+DEFAULT_MAX_MB = int(os.environ.get("REVIEW_DATASET_CACHE_MB", "512"))
+
+
+@dataclass(frozen=True)
+class DatasetHandle:
+    """
+    Session 中保存的資料集代號，實際資料由 DatasetRegistry 共用。
+    """
+    location: str
+    folder: str
+    review_columns: tuple
+    sentence_columns: tuple
+    version: str
+
+    @property
+    def key(self):
+        return (self.folder, self.location, self.review_columns, self.sentence_columns)
+
+
+def file_signature(paths):
+    """
+    依檔案 mtime 與大小產生版本字串，檔案變動時版本也會改變。
+    """
+    parts = []
+    for path in paths:
+        if os.path.exists(path):
+            stat = os.stat(path)
+            parts.append(f"{os.path.basename(path)}:{stat.st_mtime_ns}:{stat.st_size}")
+    return hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+def frame_nbytes(frames):
+    """
+    估計 DataFrame 佔用的記憶體大小（bytes）。
+    """
+    return int(sum(frame.memory_usage(deep=True).sum() for frame in frames if frame is not None))
+
+
+class DatasetRegistry:
+    """
+    全程序共用、唯讀的店家資料快取。
+
+    以 (資料夾, 店名, 欄位) 為鍵、檔案 mtime/大小為版本，
+    超過記憶體上限時依 LRU 淘汰；同一份資料在程序中只解析一次。
+    取得的 DataFrame 由所有 session 共用，呼叫端不可修改。
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_MB * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (version, frames, nbytes)
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def _key_lock(self, key):
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def get(self, key, version, loader, sizeof=frame_nbytes):
+        """
+        取得 key 在指定版本的資料；快取未命中或版本不符時呼叫 loader() 解析。
+
+        sizeof 用來估計 loader 回傳物件的大小，預設為 DataFrame tuple 的計算方式
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return entry[1]
+
+        # 同一個 key 同時只讓一個 session 解析，其餘等待後直接命中
+        with self._key_lock(key):
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] == version:
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return entry[1]
+                self._misses += 1
+
+            frames = loader()
+            nbytes = sizeof(frames)
+
+            with self._lock:
+                self._entries[key] = (version, frames, nbytes)
+                self._entries.move_to_end(key)
+                self._evict()
+            return frames
+
+    def _evict(self):
+        # 至少保留最新放入的一筆，避免單一大型店家超過上限時無法使用
+        total = sum(entry[2] for entry in self._entries.values())
+        while total > self.max_bytes and len(self._entries) > 1:
+            _, (_, _, nbytes) = self._entries.popitem(last=False)
+            total -= nbytes
+            self._evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """
+        回傳命中、未命中、淘汰次數與目前佔用大小。
+        """
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": sum(entry[2] for entry in self._entries.values()),
+                "max_bytes": self.max_bytes,
+            }
+
+
+# 程序層級的共用快取，Streamlit 各 session 皆在同一程序中執行
+registry = DatasetRegistry()
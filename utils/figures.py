@@ -0,0 +1,413 @@
+import argparse
+import glob
+import json
+import os
+
+import pandas as pd
+import plotly.express as px
+import plotly.io as pio
+
+from utils.aggregates import read_aggregates, write_aggregates
+from utils.data_loader import store_version
+from utils.dataset_cache import DatasetRegistry
+from utils.profiler import span
+
+# 圖表快取上限（MB），與資料快取分開計算，避免圖表擠掉店家資料
+DEFAULT_MAX_MB = int(os.environ.get("REVIEW_FIGURE_CACHE_MB", "64"))
+FIGURE_SCHEMA_VERSION = 1
+
+
+def rating_distribution_figure(aggregates):
+    """
+    留言評分分布長條圖。
+    """
+    star_counts = rating_counts(aggregates)
+
+    # 轉換為 DataFrame，並設定欄位名稱
+    df_star_counts = pd.DataFrame({
+        "評分": star_counts.index,
+        "留言數量": star_counts.values
+    })
+
+    fig = px.bar(
+        df_star_counts,
+        x="評分",
+        y="留言數量",
+        text="留言數量",
+        title="評分分佈",
+        color="留言數量",
+        color_continuous_scale="Burg"
+    )
+    fig.update_traces(textposition="outside")
+    fig.update_layout(
+        plot_bgcolor="white",
+        font=dict(size=14),
+        width=600,
+        height=450,
+        margin=dict(t=40, b=50, l=50, r=30),
+        showlegend=False,
+        dragmode=False
+    )
+    # 固定 x 軸的範圍為 1-5，並確保顯示整數刻度
+    fig.update_xaxes(
+        range=[0.5, 5.5],  # 範圍設為 0.5-5.5，這樣顯示區間就是從 1 到 5
+        tickmode='array',  # 使用陣列模式設定刻度
+        tickvals=[1, 2, 3, 4, 5],  # 刻度值
+        ticktext=['1', '2', '3', '4', '5']  # 刻度標籤
+    )
+    return fig
+
+
+def top_keywords_figure(aggregates):
+    """
+    前 10 大熱門關鍵詞長條圖。
+    """
+    df_top_words = top_keywords(aggregates)
+    fig = px.bar(
+        df_top_words,
+        x="熱門關鍵詞",
+        y="討論聲量",
+        text="討論聲量",
+        color="討論聲量",
+        color_continuous_scale="Blugrn"
+    )
+    fig.update_traces(textposition="outside")
+    fig.update_layout(
+        plot_bgcolor="white",
+        font=dict(size=14),
+        width=600,
+        height=450,
+        margin=dict(t=40, b=50, l=50, r=30),
+        showlegend=False,
+        dragmode=False
+    )
+    return fig
+
+
+def review_topics_figure(aggregates):
+    """
+    評論主題分布橫條圖（排除 '其他' 類別）。
+    """
+    label_counts = pd.DataFrame(list(aggregates["label_counts"].items()), columns=["評論主題", "討論聲量"])
+
+    # 排除「其他」
+    label_counts = label_counts[label_counts["評論主題"] != "其他"]
+
+    # 按評論數升序排列
+    label_counts = label_counts.sort_values(by="討論聲量", ascending=True)
+
+    fig = px.bar(
+        label_counts,
+        x="討論聲量",
+        y="評論主題",
+        orientation="h",
+        text="討論聲量",
+        color="討論聲量",
+        color_continuous_scale="Burg"
+    )
+    fig.update_traces(textposition="outside", cliponaxis=False) # 防止文字被軸線裁剪 cliponaxis=False
+    fig.update_layout(
+        plot_bgcolor="white",
+        font=dict(size=14),
+        width=600,
+        height=400,
+        margin=dict(t=50, b=50, l=50, r=30),
+        showlegend=False,
+        dragmode=False
+    )
+    return fig
+
+
+def topic_terms_figure(aggregates, topic):
+    """
+    單一主題的前 10 個關鍵詞頻率圖。
+    """
+    # 詞頻於彙總檔中預先計算
+    word_df = pd.DataFrame(aggregates["top_terms_by_label"].get(topic, [])[:10], columns=["詞語", "次數"])
+
+    fig = px.bar(
+        word_df,
+        x="次數",
+        y="詞語",
+        orientation="h",
+        title=f"「{topic}」的關鍵詞頻率",
+        text="次數",
+        color="次數",
+        color_continuous_scale="blues"
+    )
+    fig.update_traces(textposition="outside")
+    fig.update_layout(yaxis=dict(categoryorder="total ascending"), dragmode=False)
+    return fig
+
+
+def comparison_ranking_figure(ranking, title):
+    """
+    跨店家排名橫條圖（ranking 為 ComparisonTable.rank 的結果，依名次由上而下）。
+    """
+    df_ranking = pd.DataFrame({"店家": ranking.index, title: ranking["value"].round(3)})
+    fig = px.bar(
+        df_ranking.iloc[::-1],
+        x=title,
+        y="店家",
+        orientation="h",
+        text=title,
+        color=title,
+        color_continuous_scale="Burg"
+    )
+    fig.update_traces(textposition="outside", cliponaxis=False)
+    fig.update_layout(
+        plot_bgcolor="white",
+        font=dict(size=14),
+        height=max(300, 28 * len(df_ranking) + 100),
+        margin=dict(t=40, b=50, l=50, r=30),
+        showlegend=False,
+        coloraxis_showscale=False,
+        dragmode=False
+    )
+    return fig
+
+
+def comparison_topics_figure(side_by_side):
+    """
+    多家店的主題占比分組長條圖（side_by_side 列為主題、欄為店家）。
+    """
+    df_topics = side_by_side.drop(index="其他", errors="ignore").reset_index(names="評論主題").melt(
+        id_vars="評論主題", var_name="店家", value_name="占比"
+    )
+    fig = px.bar(df_topics, x="評論主題", y="占比", color="店家", barmode="group")
+    fig.update_layout(
+        plot_bgcolor="white",
+        font=dict(size=14),
+        height=450,
+        margin=dict(t=40, b=50, l=50, r=30),
+        yaxis_tickformat=".0%",
+        dragmode=False
+    )
+    return fig
+
+
+def sentiment_breakdown_figure(breakdown):
+    """
+    各主題正面句比例與信賴區間（breakdown 為 sentiment_breakdown 的結果，只取所有星級的列）。
+    """
+    overall = breakdown[(breakdown["rating"] == 0) & (breakdown["label"] != "其他")]
+    df_topics = pd.DataFrame({
+        "評論主題": overall["label"],
+        "正面比例": overall["positive_share"].round(3),
+        "上界": (overall["positive_high"] - overall["positive_share"]).round(4),
+        "下界": (overall["positive_share"] - overall["positive_low"]).round(4),
+    }).sort_values("正面比例")
+    fig = px.bar(
+        df_topics,
+        x="正面比例",
+        y="評論主題",
+        orientation="h",
+        error_x="上界",
+        error_x_minus="下界",
+        color="正面比例",
+        color_continuous_scale="RdYlGn",
+        range_color=(0, 1)
+    )
+    fig.update_layout(
+        plot_bgcolor="white",
+        font=dict(size=14),
+        height=max(300, 40 * len(df_topics) + 100),
+        margin=dict(t=40, b=50, l=50, r=30),
+        xaxis=dict(tickformat=".0%", range=[0, 1]),
+        coloraxis_showscale=False,
+        dragmode=False
+    )
+    return fig
+
+
+def rating_counts(aggregates):
+    """
+    各星級留言數（只含有留言的星級）。
+    """
+    return pd.Series(
+        {int(rating): count for rating, count in aggregates["rating_histogram"].items() if count > 0},
+        name="count",
+    ).sort_index()
+
+
+def top_keywords(aggregates, k=10):
+    return pd.DataFrame(aggregates["top_terms"][:k], columns=["熱門關鍵詞", "討論聲量"])
+
+
+FIGURE_BUILDERS = {
+    "rating_distribution": rating_distribution_figure,
+    "top_keywords": top_keywords_figure,
+    "review_topics": review_topics_figure,
+    "topic_terms": topic_terms_figure,
+}
+
+
+def figure_specs(aggregates):
+    """
+    列出店家所有圖表的 (種類, 參數)，供預先產生使用。
+    """
+    specs = [("rating_distribution", {}), ("review_topics", {})]
+    if aggregates["top_terms"]:
+        specs.append(("top_keywords", {}))
+    for topic in aggregates["label_counts"]:
+        if topic != "其他" and aggregates["top_terms_by_label"].get(topic):
+            specs.append(("topic_terms", {"topic": topic}))
+    return specs
+
+
+def _params_key(kind, params):
+    return f"{kind}:{json.dumps(params, ensure_ascii=False, sort_keys=True)}"
+
+
+def figure_path(location: str, folder: str = "data"):
+    """
+    回傳預先產生的圖表檔路徑：data/<店名>_figures.json
+    """
+    return os.path.join(folder, f"{location}_figures.json")
+
+
+def build_figure(aggregates, kind, params=None):
+    return FIGURE_BUILDERS[kind](aggregates, **(params or {}))
+
+
+def write_figures(location: str, folder: str = "data", aggregates=None):
+    """
+    預先產生店家所有圖表並寫出序列化的圖表規格（ingest 步驟）。
+    """
+    if aggregates is None:
+        aggregates = read_aggregates(location, folder) or write_aggregates(location, folder)
+    figures = {
+        _params_key(kind, params): build_figure(aggregates, kind, params).to_json()
+        for kind, params in figure_specs(aggregates)
+    }
+    payload = {
+        "schema_version": FIGURE_SCHEMA_VERSION,
+        "source_signature": store_version(location, folder),
+        "figures": figures,
+    }
+    path = figure_path(location, folder)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_path, path)
+    return len(figures)
+
+
+def _read_prewarmed(location, folder, version):
+    """
+    讀取預先產生的圖表檔，回傳 {圖表鍵: 規格}；不存在或版本不符時回傳空 dict。
+    """
+    path = figure_path(location, folder)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, encoding="utf-8") as f:
+            payload = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if payload.get("schema_version") != FIGURE_SCHEMA_VERSION or payload.get("source_signature") != version:
+        return {}
+    return payload["figures"]
+
+
+class FigureCache:
+    """
+    程序共用的圖表快取。
+
+    以 (資料夾, 店名, 圖表種類, 參數) 為鍵、店家資料版本為版本，保存序列化的圖表規格與由規格建立的 Figure；
+    所有 session 共用同一份，rerun 時不必重新執行 px.bar。大小以序列化規格的位元組數計算。
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_MB * 1024 * 1024):
+        self._registry = DatasetRegistry(max_bytes=max_bytes)
+
+    def _entry(self, handle, aggregates, kind, params):
+        params = params or {}
+        key = _params_key(kind, params)
+        version = store_version(handle.location, handle.folder)
+
+        def load():
+            spec = self._prewarmed(handle, version).get(key)
+            if spec is not None:
+                with span("figure.load_prewarmed"):
+                    return spec, pio.from_json(spec)
+            with span(f"figure.build.{kind}"):
+                fig = build_figure(aggregates, kind, params)
+                return fig.to_json(), fig
+
+        return self._registry.get(
+            (handle.folder, handle.location, key), version, load, lambda entry: len(entry[0])
+        )
+
+    def _prewarmed(self, handle, version):
+        # 圖表檔每個資料版本只解析一次，各圖表未命中時直接在記憶體中查找
+        return self._registry.get(
+            (handle.folder, handle.location, "prewarmed"),
+            version,
+            lambda: _read_prewarmed(handle.location, handle.folder, version),
+            lambda figures: sum(len(spec) for spec in figures.values()),
+        )
+
+    def get(self, handle, aggregates, kind, params=None):
+        """
+        取得圖表（plotly Figure）。回傳的物件由所有 session 共用，請勿修改。
+        """
+        return self._entry(handle, aggregates, kind, params)[1]
+
+    def spec(self, handle, aggregates, kind, params=None):
+        """
+        取得序列化的圖表規格（JSON 字串）。
+        """
+        return self._entry(handle, aggregates, kind, params)[0]
+
+    def cached(self, key, build, version=None):
+        """
+        快取由其他衍生資料建立的圖表（例如跨店家比較）；build() 回傳 Figure。
+
+        version 為 None 時 key 需完整描述圖表內容；指定 version（例如店家資料版本）時，
+        同一個 key 在版本改變後會重新建立並取代舊圖表。
+        """
+        def load():
+            fig = build()
+            return fig.to_json(), fig
+
+        return self._registry.get(
+            key, (FIGURE_SCHEMA_VERSION, version), load, lambda entry: len(entry[0])
+        )[1]
+
+    def clear(self):
+        self._registry.clear()
+
+    def stats(self):
+        return self._registry.stats()
+
+
+figure_cache = FigureCache()
+
+
+def get_figure(handle, aggregates, kind, params=None):
+    """
+    取得目前資料集的圖表；handle 為 None 時（例如未經 session 的呼叫）直接建立不快取。
+    """
+    if handle is None:
+        return build_figure(aggregates, kind, params)
+    return figure_cache.get(handle, aggregates, kind, params)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="預先產生店家圖表（data/<店名>_figures.json）")
+    parser.add_argument("stores", nargs="*", help="店名，未指定時處理資料夾中所有店家")
+    parser.add_argument("--folder", default="data")
+    args = parser.parse_args()
+
+    stores = args.stores or sorted(
+        os.path.basename(path)[: -len("_reviews.csv")]
+        for path in glob.glob(os.path.join(args.folder, "*_reviews.csv"))
+    )
+    for location in stores:
+        count = write_figures(location, args.folder)
+        print(f"✅ {location}: {count} 張圖表")
+
+
+if __name__ == "__main__":
+    main()
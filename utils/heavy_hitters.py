@@ -0,0 +1,91 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_EPSILON = 1e-4
+
+
+class HeavyHitters:
+    """
+    固定記憶體的近似詞頻（Misra-Gries / Space-Saving 摘要），可跨資料塊、程序與店家合併。
+
+    最多保留 capacity = ceil(1 / epsilon) 個詞；計數超出容量時，所有詞同減第 capacity+1 大的計數，
+    並將減去的量累加為誤差。因此對任何詞：
+        估計值 ≤ 實際次數 ≤ 估計值 + error ≤ 估計值 + epsilon × total
+    實際次數超過 epsilon × total 的詞一定會保留在摘要中。
+
+    介面與 utils.streaming.ExactCounter 相同（update / merge / most_common / nbytes）。
+    """
+
+    def __init__(self, epsilon=DEFAULT_EPSILON, capacity=None):
+        self.capacity = capacity or math.ceil(1 / epsilon)
+        self.counts = {}
+        self.total = 0
+        self.error = 0
+
+    @property
+    def epsilon(self):
+        return 1 / self.capacity
+
+    def update(self, words):
+        """
+        以一批詞（依出現順序）更新：先精確計數這一批，再與摘要合併。
+        """
+        codes, uniques = pd.factorize(np.asarray(words, dtype=object))
+        counts = np.bincount(codes, minlength=len(uniques))
+        self.total += int(counts.sum())
+        self._add(zip(uniques, counts.tolist()))
+
+    def merge(self, other):
+        """
+        合併另一份摘要（兩者容量不同時以較小者為準，誤差保證以較寬者計）。
+        """
+        self.capacity = min(self.capacity, other.capacity)
+        self.total += other.total
+        self.error += other.error
+        self._add(other.counts.items())
+        return self
+
+    def _add(self, items):
+        counts = self.counts
+        for word, count in items:
+            counts[word] = counts.get(word, 0) + count
+        if len(counts) <= self.capacity:
+            return
+        values = np.fromiter(counts.values(), dtype=np.int64, count=len(counts))
+        threshold = int(np.partition(values, len(values) - self.capacity - 1)[len(values) - self.capacity - 1])
+        # 保留字典順序（第一次出現的順序），同分時的排列與 Counter.most_common 一致
+        self.counts = {word: count - threshold for word, count in counts.items() if count > threshold}
+        self.error += threshold
+
+    def most_common(self, k):
+        ranked = sorted(self.counts.items(), key=lambda item: -item[1])
+        return [(word, int(count)) for word, count in ranked[:k]]
+
+    def bounds(self, word):
+        """
+        回傳詞的 (下界, 上界)。
+        """
+        estimate = self.counts.get(word, 0)
+        return estimate, estimate + self.error
+
+    def guarantee(self):
+        """
+        回傳誤差保證，與結果一併輸出。
+        """
+        return {
+            "method": "misra-gries",
+            "capacity": self.capacity,
+            "epsilon": self.epsilon,
+            "total": self.total,
+            "max_error": self.error,
+            "error_bound": math.floor(self.epsilon * self.total),
+        }
+
+    @property
+    def nbytes(self):
+        return len(self.counts) * 120
+
+    def __len__(self):
+        return len(self.counts)
@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+
+from utils.data_loader import resolve_derived
+
+
+class KeywordIndex:
+    """
+    關鍵詞 → 句子列號的倒排索引（posting list）。
+
+    以 CSR 形式儲存：第 i 個詞的句子列號為 postings[offsets[i]:offsets[i + 1]]，
+    同一句文字重複出現時只保留第一列，因此 posting list 的長度即為文件頻率。
+    """
+
+    def __init__(self, vocabulary, offsets, postings):
+        self.vocabulary = vocabulary
+        self.offsets = offsets
+        self.postings = postings
+        self._lookup = {word: i for i, word in enumerate(vocabulary)}
+
+    def __contains__(self, word):
+        return word in self._lookup
+
+    def __len__(self):
+        return len(self.vocabulary)
+
+    @property
+    def nbytes(self):
+        return int(
+            self.offsets.nbytes
+            + self.postings.nbytes
+            + sum(len(word.encode("utf-8")) + 100 for word in self.vocabulary)
+        )
+
+    def sentence_ids(self, word):
+        """
+        回傳包含 word 的句子列號（已去除重複句子，依列號排序）。
+        """
+        i = self._lookup.get(word)
+        if i is None:
+            return self.postings[:0]
+        return self.postings[self.offsets[i]:self.offsets[i + 1]]
+
+    def document_frequency(self, word):
+        """
+        回傳包含 word 的不重複句子數。
+        """
+        i = self._lookup.get(word)
+        return 0 if i is None else int(self.offsets[i + 1] - self.offsets[i])
+
+    def document_frequencies(self):
+        """
+        回傳所有詞的文件頻率（Series，依頻率遞減排序）。
+        """
+        counts = pd.Series(np.diff(self.offsets), index=self.vocabulary, name="document_frequency")
+        return counts.sort_values(ascending=False, kind="stable")
+
+
+def build_keyword_index(df, word_column="word", sentence_column="sentence"):
+    """
+    由句子表的 word 欄位（以空白分隔的斷詞結果）建立 KeywordIndex。
+    """
+    # 相同文字的句子視為同一句，對應到第一次出現的列號；缺值（代碼 -1）的句子各自對應到自己
+    codes, _ = pd.factorize(df[sentence_column].to_numpy())
+    valid = codes >= 0
+    canonical = np.arange(len(codes))
+    _, first_row = np.unique(codes[valid], return_index=True)
+    canonical[valid] = np.flatnonzero(valid)[first_row][codes[valid]]
+
+    tokens = df[word_column].reset_index(drop=True).str.split().explode().dropna()
+    pairs = pd.DataFrame({
+        "word": tokens.to_numpy(dtype=object),
+        "row": canonical[tokens.index.to_numpy(dtype=np.int64)],
+    }).drop_duplicates()
+
+    word_codes, vocabulary = pd.factorize(pairs["word"], sort=True)
+    order = np.lexsort((pairs["row"].to_numpy(), word_codes))
+    postings = pairs["row"].to_numpy()[order].astype(np.int32)
+    counts = np.bincount(word_codes, minlength=len(vocabulary))
+    offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+
+    return KeywordIndex(list(vocabulary), offsets, postings)
+
+
+def get_keyword_index(handle):
+    """
+    取得目前資料集的共用 KeywordIndex，每個資料版本只建立一次。
+    """
+    return resolve_derived(handle, "keyword_index", lambda df_reviews, df: build_keyword_index(df))
@@ -0,0 +1,364 @@
+import argparse
+import glob
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from utils.data_loader import read_store_data, resolve_store, store_version
+from utils.dataset_cache import registry
+from utils.profiler import span, traced
+
+DUPLICATE_SCHEMA_VERSION = 1
+SHINGLE_SIZE = 3
+NUM_PERM = 64
+# 16 個 band × 4 列：估計相似度約 0.5 以上的文字有很高機率落在同一個桶
+BANDS = 16
+# 同桶候選需再以簽章估計的 Jaccard 相似度確認
+SIMILARITY_THRESHOLD = 0.5
+# 去除標點與空白後短於此長度的留言不列入（「好吃」「推」等短留言本來就大量重複）
+MIN_REVIEW_LENGTH = 15
+MIN_SENTENCE_LENGTH = 8
+MIN_CLUSTER_SIZE = 3
+# 計算 MinHash 時每批處理的文字數，限制 shingle 暫存陣列的大小
+BATCH_TEXTS = 50_000
+# 罐頭五星留言佔可分析留言的比例達此值時，活動指數為 100%
+CAMPAIGN_SATURATION = 0.25
+CAMPAIGN_THRESHOLD = 0.3
+MAX_CLUSTERS = 20
+
+_MASK32 = np.uint64(0xFFFFFFFF)
+
+
+def _hash_params(num_perm, seed=1):
+    # (a × x + b) mod 2^32，a 為奇數時是 32 位元空間上的排列；x 已先混合過，
+    # 以 uint32 運算比 64 位元取模快約三倍，估計的相似度沒有明顯偏差
+    rng = np.random.default_rng(seed)
+    a = rng.integers(0, 2**31, size=num_perm, dtype=np.uint32) * np.uint32(2) + np.uint32(1)
+    b = rng.integers(0, 2**32, size=num_perm, dtype=np.uint32)
+    return a, b
+
+
+def normalize_texts(texts):
+    """
+    去除空白、標點與大小寫差異，讓只差在標點或表情符號的罐頭留言得到相同的 shingle。
+    """
+    # 轉成 object 欄位以使用 Python re（Arrow 字串引擎的 \W 不涵蓋中文字）
+    texts = pd.Series(texts).fillna("").astype(str).astype(object)
+    return texts.str.lower().str.replace(r"[\W_]+", "", regex=True)
+
+
+def _shingle_hashes(texts, k):
+    """
+    將所有文字串接成一個 Unicode 碼點陣列，向量化計算每個字元 k-gram 的 32 位元雜湊。
+
+    Returns:
+        (雜湊陣列, 每個 shingle 所屬的文字編號)，依文字順序排列
+    """
+    lengths = np.fromiter((len(text) for text in texts), dtype=np.int64, count=len(texts))
+    codes = np.frombuffer("".join(texts).encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    counts = np.maximum(lengths - k + 1, 0)
+    doc_ids = np.repeat(np.arange(len(texts)), counts)
+    positions = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts) + np.repeat(starts, counts)
+
+    h = np.zeros(len(positions), dtype=np.uint64)
+    for offset in range(k):
+        h = h * np.uint64(0x100000001B3) + codes[positions + offset]
+    return ((h ^ (h >> np.uint64(32))) & _MASK32).astype(np.uint32), doc_ids
+
+
+def minhash_signatures(texts, k=SHINGLE_SIZE, num_perm=NUM_PERM, seed=1):
+    """
+    計算字元 shingle 的 MinHash 簽章。
+
+    Args:
+        texts (list[str]): 已正規化、長度至少為 k 的文字
+
+    Returns:
+        np.ndarray: (文字數, num_perm) 的 uint32 陣列
+    """
+    a, b = _hash_params(num_perm, seed)
+    signatures = np.empty((len(texts), num_perm), dtype=np.uint32)
+    for first in range(0, len(texts), BATCH_TEXTS):
+        batch = texts[first:first + BATCH_TEXTS]
+        hashes, doc_ids = _shingle_hashes(batch, k)
+        starts = np.searchsorted(doc_ids, np.arange(len(batch)))
+        # 每次只處理一個排列，暫存陣列與 shingle 數同大小
+        for i in range(num_perm):
+            signatures[first:first + len(batch), i] = np.minimum.reduceat(a[i] * hashes + b[i], starts)
+    return signatures
+
+
+def _band_keys(signatures, bands):
+    rows = signatures.shape[1] // bands
+    keys = np.empty((len(signatures), bands), dtype=np.uint64)
+    for band in range(bands):
+        key = np.zeros(len(signatures), dtype=np.uint64)
+        for column in signatures[:, band * rows:(band + 1) * rows].T:
+            key = (key ^ column.astype(np.uint64)) * np.uint64(0x100000001B3)
+        keys[:, band] = key
+    return keys
+
+
+def _components(n, u, v):
+    """
+    以最小標籤傳播（加上指標跳躍）求無向圖的連通元件，回傳每個節點的元件代表。
+    """
+    labels = np.arange(n)
+    while True:
+        smaller = np.minimum(labels[u], labels[v])
+        updated = labels.copy()
+        np.minimum.at(updated, u, smaller)
+        np.minimum.at(updated, v, smaller)
+        updated = updated[updated]
+        if np.array_equal(updated, labels):
+            return labels
+        labels = updated
+
+
+def lsh_clusters(signatures, bands=BANDS, threshold=SIMILARITY_THRESHOLD):
+    """
+    LSH 分桶找出相似文字並分群，時間與文字數呈線性（不做兩兩比較）。
+
+    每個桶內的文字只與桶內前一筆比對估計相似度，相似者相連（串成一條鏈，不展開桶內所有配對）；
+    不同 band 的連結再合併成連通元件。
+
+    Returns:
+        np.ndarray: 每筆文字的群組代表編號
+    """
+    n = len(signatures)
+    if n == 0:
+        return np.empty(0, dtype=np.int64)
+    edges_u, edges_v = [], []
+    keys = _band_keys(signatures, bands)
+    for band in range(bands):
+        order = np.argsort(keys[:, band], kind="stable")
+        sorted_keys = keys[order, band]
+        same_bucket = sorted_keys[1:] == sorted_keys[:-1]
+        u, v = order[:-1][same_bucket], order[1:][same_bucket]
+        similar = (signatures[u] == signatures[v]).mean(axis=1) >= threshold
+        edges_u.append(u[similar])
+        edges_v.append(v[similar])
+    return _components(n, np.concatenate(edges_u), np.concatenate(edges_v))
+
+
+def cluster_texts(texts, min_length=MIN_REVIEW_LENGTH, **options):
+    """
+    將文字分成近似重複的群組；完全相同的文字只計算一次簽章。
+
+    Returns:
+        np.ndarray: 每筆文字的群組編號，太短而未列入的文字為 -1
+    """
+    normalized = normalize_texts(texts)
+    codes, uniques = pd.factorize(normalized)
+    eligible = np.flatnonzero(pd.Series(uniques).str.len().to_numpy() >= max(min_length, SHINGLE_SIZE))
+    labels = np.full(len(uniques), -1, dtype=np.int64)
+    if len(eligible):
+        signatures = minhash_signatures(list(uniques[eligible]))
+        labels[eligible] = eligible[lsh_clusters(signatures, **options)]
+    return np.where(codes >= 0, labels[codes], -1)
+
+
+def _review_clusters(df_reviews, labels):
+    ratings = df_reviews["Review Rating"].to_numpy()
+    frame = pd.DataFrame({
+        "cluster": labels,
+        "rating": ratings,
+        "five_star": ratings == 5,
+        "row": np.arange(len(labels)),
+    })[labels >= 0]
+    grouped = frame.groupby("cluster", sort=False).agg(
+        size=("row", "size"), mean_rating=("rating", "mean"), five_star_share=("five_star", "mean"), first=("row", "min"),
+    )
+    grouped = grouped[grouped["size"] >= MIN_CLUSTER_SIZE].sort_values(["size", "first"], ascending=[False, True])
+    rows_by_cluster = frame[frame["cluster"].isin(grouped.index)].groupby("cluster")["row"].apply(list)
+    return grouped, rows_by_cluster
+
+
+def detect_duplicates(df_reviews, df=None):
+    """
+    偵測近似重複（罐頭）留言與句子，並計算活動留言指數。
+
+    Args:
+        df_reviews: 評論表（Review, Review Rating）
+        df: 句子表（sentence, index），None 時略過句子層級分析
+
+    Returns:
+        dict: clusters（依大小遞減）、duplicate_share、campaign_score 等
+    """
+    labels = cluster_texts(df_reviews["Review"])
+    eligible = int((labels >= 0).sum())
+    grouped, rows_by_cluster = _review_clusters(df_reviews, labels)
+    store_mean = float(df_reviews["Review Rating"].mean()) if len(df_reviews) else 0.0
+    clustered = int(grouped["size"].sum())
+    templated_five_star = float((grouped["size"] * grouped["five_star_share"]).sum())
+
+    reviews = df_reviews["Review"]
+    clusters = [
+        {
+            "size": int(row.size),
+            "mean_rating": round(float(row.mean_rating), 2),
+            "rating_skew": round(float(row.mean_rating) - store_mean, 2),
+            "five_star_share": round(float(row.five_star_share), 3),
+            "example": str(reviews.iloc[int(row.first)]),
+            # review_id 從 1 起算，與句子表的 index 欄位相同
+            "review_ids": [int(r) + 1 for r in rows_by_cluster[row.Index][:100]],
+        }
+        for row in grouped.head(MAX_CLUSTERS).itertuples()
+    ]
+
+    result = {
+        "eligible_reviews": eligible,
+        "cluster_count": int(len(grouped)),
+        "clustered_reviews": clustered,
+        "duplicate_share": clustered / eligible if eligible else 0.0,
+        "campaign_score": min(1.0, templated_five_star / eligible / CAMPAIGN_SATURATION) if eligible else 0.0,
+        "clusters": clusters,
+    }
+    if df is not None and "index" in df.columns:
+        result["sentence_clusters"] = _sentence_clusters(df)
+    return result
+
+
+def _sentence_clusters(df):
+    """
+    出現在多則不同留言中的近似重複句子（例如留言中夾帶的固定活動文字）。
+    """
+    labels = cluster_texts(df["sentence"], min_length=MIN_SENTENCE_LENGTH)
+    frame = pd.DataFrame({"cluster": labels, "review_id": df["index"].to_numpy(), "row": np.arange(len(df))})
+    frame = frame[labels >= 0]
+    grouped = frame.groupby("cluster", sort=False).agg(
+        reviews=("review_id", "nunique"), sentences=("row", "size"), first=("row", "min"),
+    )
+    grouped = grouped[grouped["reviews"] >= MIN_CLUSTER_SIZE].sort_values(
+        ["reviews", "first"], ascending=[False, True]
+    )
+    sentences = df["sentence"]
+    return [
+        {"reviews": int(row.reviews), "sentences": int(row.sentences), "example": str(sentences.iloc[int(row.first)])}
+        for row in grouped.head(MAX_CLUSTERS).itertuples()
+    ]
+
+
+def duplicate_path(location: str, folder: str = "data"):
+    """
+    回傳店家重複留言偵測結果路徑：data/<店名>_duplicates.json
+    """
+    return os.path.join(folder, f"{location}_duplicates.json")
+
+
+def write_duplicates(location: str, folder: str = "data", df_reviews=None, df=None):
+    """
+    計算並寫出店家重複留言偵測結果（ingest 步驟）。未提供資料時會從磁碟讀取。
+    """
+    if df_reviews is None or df is None:
+        df_reviews, df = read_store_data(location, folder, sentence_columns=["sentence", "index"])
+    result = detect_duplicates(df_reviews, df)
+    result["schema_version"] = DUPLICATE_SCHEMA_VERSION
+    result["source_signature"] = store_version(location, folder)
+
+    path = duplicate_path(location, folder)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_path, path)
+    return result
+
+
+def read_duplicates(location: str, folder: str = "data"):
+    """
+    讀取偵測結果；不存在、結構版本不符或來源已變動時回傳 None。
+    """
+    path = duplicate_path(location, folder)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, encoding="utf-8") as f:
+            result = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if (result.get("schema_version") != DUPLICATE_SCHEMA_VERSION
+            or result.get("source_signature") != store_version(location, folder)):
+        return None
+    return result
+
+
+@traced("load.duplicates")
+def get_duplicates(handle):
+    """
+    取得目前資料集的重複留言偵測結果：優先讀取結果檔，過期時才以共用資料重新計算。
+    """
+    def load():
+        result = read_duplicates(handle.location, handle.folder)
+        if result is not None:
+            return result
+        df_reviews, df = resolve_store(handle)
+        with span("derive.duplicates"):
+            try:
+                return write_duplicates(handle.location, handle.folder, df_reviews, df)
+            except OSError:
+                return detect_duplicates(df_reviews, df)
+
+    return registry.get(
+        (handle.folder, handle.location, "duplicates"),
+        store_version(handle.location, handle.folder),
+        load,
+        lambda result: len(json.dumps(result, ensure_ascii=False).encode("utf-8")),
+    )
+
+
+def cross_store_clusters(stores, folder="data"):
+    """
+    找出跨店家的近似重複留言群組（例如同一套罐頭文字出現在多家分店）。
+    """
+    frames = []
+    for location in stores:
+        df_reviews, _ = read_store_data(location, folder, sentence_columns=["index"])
+        frames.append(pd.DataFrame({
+            "store": location,
+            "review": df_reviews["Review"].to_numpy(),
+            "rating": df_reviews["Review Rating"].to_numpy(),
+        }))
+    reviews = pd.concat(frames, ignore_index=True)
+    reviews["cluster"] = cluster_texts(reviews["review"])
+    reviews = reviews[reviews["cluster"] >= 0]
+    grouped = reviews.groupby("cluster", sort=False).agg(
+        size=("store", "size"), stores=("store", "nunique"), mean_rating=("rating", "mean"), example=("review", "first"),
+    )
+    grouped = grouped[(grouped["stores"] > 1) & (grouped["size"] >= MIN_CLUSTER_SIZE)].sort_values("size", ascending=False)
+    return [
+        {
+            "size": int(row.size),
+            "stores": sorted(reviews.loc[reviews["cluster"] == row.Index, "store"].unique().tolist()),
+            "mean_rating": round(float(row.mean_rating), 2),
+            "example": str(row.example),
+        }
+        for row in grouped.head(MAX_CLUSTERS).itertuples()
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="以 MinHash/LSH 偵測近似重複（罐頭）留言")
+    parser.add_argument("stores", nargs="*", help="店名，未指定時處理資料夾中所有店家")
+    parser.add_argument("--folder", default="data")
+    parser.add_argument("--cross-store", action="store_true", help="另外列出跨店家的重複留言群組")
+    args = parser.parse_args()
+
+    stores = args.stores or sorted(
+        os.path.basename(path)[: -len("_reviews.csv")]
+        for path in glob.glob(os.path.join(args.folder, "*_reviews.csv"))
+    )
+    for location in stores:
+        result = write_duplicates(location, args.folder)
+        print(f"{location}: {result['cluster_count']} 群、{result['clustered_reviews']} 則重複留言，"
+              f"活動指數 {result['campaign_score']:.0%}")
+
+    if args.cross_store:
+        for cluster in cross_store_clusters(stores, args.folder):
+            print(f"🔁 {cluster['size']} 則（{'、'.join(cluster['stores'])}）：{cluster['example'][:60]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+import hashlib
+import os
+import sqlite3
+import time
+import unicodedata
+
+DEFAULT_CACHE_PATH = os.path.join(".cache", "nlp_cache.sqlite3")
+DEFAULT_MAX_ENTRIES = 2_000_000
+# SQLite 單一語句可綁定的參數數量有限，批次查詢時分段
+_BATCH_SIZE = 500
+
+
+def normalize_text(text):
+    """
+    快取鍵的正規化：Unicode NFC 並去除前後空白、合併連續空白。
+    """
+    return " ".join(unicodedata.normalize("NFC", str(text)).split())
+
+
+def content_version(*parts, paths=()):
+    """
+    由模型/字典版本字串與檔案內容產生版本代碼，任一變動時快取自動失效。
+    """
+    digest = hashlib.sha1()
+    for part in parts:
+        digest.update(str(part).encode("utf-8"))
+        digest.update(b"\x1f")
+    for path in paths:
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+class NLPCache:
+    """
+    以 SQLite 儲存的斷詞與情感分數快取。
+
+    鍵為 (種類, 版本, 正規化句子)，可批次查詢與寫入；
+    資料筆數超過 max_entries 時依最後使用時間淘汰最舊的資料。
+    多個工作程序可同時開啟同一個檔案（WAL 模式）。
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=60)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " kind TEXT NOT NULL, version TEXT NOT NULL, key TEXT NOT NULL,"
+            " value TEXT NOT NULL, accessed REAL NOT NULL,"
+            " PRIMARY KEY (kind, version, key))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)")
+        self._conn.commit()
+        self._inserted_since_evict = 0
+        self.hits = {}
+        self.misses = {}
+
+    def get_many(self, kind, version, texts):
+        """
+        批次查詢，回傳 {正規化句子: 值}，只包含命中的項目。
+        """
+        keys = list(dict.fromkeys(normalize_text(t) for t in texts))
+        found = {}
+        for start in range(0, len(keys), _BATCH_SIZE):
+            batch = keys[start:start + _BATCH_SIZE]
+            placeholders = ",".join("?" * len(batch))
+            rows = self._conn.execute(
+                f"SELECT key, value FROM cache WHERE kind = ? AND version = ? AND key IN ({placeholders})",
+                [kind, version, *batch],
+            ).fetchall()
+            found.update(rows)
+        if found:
+            now = time.time()
+            self._conn.executemany(
+                "UPDATE cache SET accessed = ? WHERE kind = ? AND version = ? AND key = ?",
+                [(now, kind, version, key) for key in found],
+            )
+            self._conn.commit()
+        self.hits[kind] = self.hits.get(kind, 0) + len(found)
+        self.misses[kind] = self.misses.get(kind, 0) + len(keys) - len(found)
+        return found
+
+    def put_many(self, kind, version, items):
+        """
+        批次寫入 {句子: 值}（值需為字串）。
+        """
+        now = time.time()
+        rows = [(kind, version, normalize_text(text), value, now) for text, value in items.items()]
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO cache (kind, version, key, value, accessed) VALUES (?, ?, ?, ?, ?)",
+            rows,
+        )
+        self._conn.commit()
+        self._inserted_since_evict += len(rows)
+        if self._inserted_since_evict >= max(self.max_entries // 20, 1000):
+            self.evict()
+
+    def cached(self, kind, version, texts, compute):
+        """
+        先查快取，只對未命中的句子呼叫 compute(text)，並寫回快取。
+
+        Returns:
+            與 texts 同順序的結果列表
+        """
+        found = self.get_many(kind, version, texts)
+        missing = {}
+        for text in texts:
+            key = normalize_text(text)
+            if key not in found and key not in missing:
+                missing[key] = compute(key)
+        if missing:
+            self.put_many(kind, version, missing)
+            found.update(missing)
+        return [found[normalize_text(text)] for text in texts]
+
+    def evict(self):
+        """
+        筆數超過上限時，刪除最久未使用的資料。
+        """
+        self._inserted_since_evict = 0
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM cache WHERE rowid IN (SELECT rowid FROM cache ORDER BY accessed LIMIT ?)",
+                (excess,),
+            )
+            self._conn.commit()
+        return max(excess, 0)
+
+    def stats(self):
+        """
+        回傳各種類的命中/未命中次數與命中率。
+        """
+        result = {}
+        for kind in sorted(set(self.hits) | set(self.misses)):
+            hits, misses = self.hits.get(kind, 0), self.misses.get(kind, 0)
+            lookups = hits + misses
+            result[kind] = {"hits": hits, "misses": misses, "hit_rate": hits / lookups if lookups else 0.0}
+        return result
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,167 @@
+"""
+預先建立的 NLP 執行環境：合併 userdict.txt 後的 jieba 前綴字典與凍結的停用詞集合。
+
+jieba 第一次斷詞時要從 dict.txt 建立約 50 萬項的前綴字典，再逐詞加入使用者字典；
+每個工作程序與短命的處理腳本都要重來一次。這裡把結果以 marshal 序列化成單一檔案：
+    .cache/nlp_runtime/<版本>.marshal
+版本由 jieba 版本、檔案格式與 userdict.txt / stopwords.txt 的內容決定，任一變動時自動重建。
+
+載入方式：
+- 記憶體映射：以 mmap 映射檔案後 marshal.loads，不經過逐行解析與 add_word。
+- fork 繼承：父程序先 load_runtime(preload_analyse=True)，之後 fork 出的工作程序
+  直接沿用已初始化的 jieba，再次呼叫 load_runtime 時版本相同即不做任何事。
+
+用法：
+    python -m utils.nlp_runtime                # 建立（或確認）執行環境檔
+    python -m benchmarks.nlp_startup           # 比較各種啟動方式的耗時
+"""
+import argparse
+import glob
+import marshal
+import mmap
+import os
+import time
+
+from utils.nlp_cache import content_version
+
+DEFAULT_RUNTIME_DIR = os.path.join(".cache", "nlp_runtime")
+# 檔案內容格式版本，欄位變更時遞增
+RUNTIME_FORMAT = 1
+
+
+class NLPRuntime:
+    """
+    已載入的執行環境：版本、停用詞集合、來源檔與載入耗時。
+    """
+
+    def __init__(self, version, stopwords, path, load_seconds):
+        self.version = version
+        self.stopwords = stopwords
+        self.path = path
+        self.load_seconds = load_seconds
+
+
+_runtime = None
+
+
+def runtime_version(userdict_path="userdict.txt", stopwords_path="stopwords.txt"):
+    import jieba
+
+    return content_version(
+        "nlp-runtime", RUNTIME_FORMAT, jieba.__version__, paths=(userdict_path, stopwords_path)
+    )
+
+
+def runtime_path(version, runtime_dir=DEFAULT_RUNTIME_DIR):
+    return os.path.join(runtime_dir, f"{version}.marshal")
+
+
+def _read_stopwords(path):
+    with open(path, encoding="utf-8") as f:
+        return sorted({line.strip() for line in f if line.strip()})
+
+
+def build_runtime(userdict_path="userdict.txt", stopwords_path="stopwords.txt", runtime_dir=DEFAULT_RUNTIME_DIR):
+    """
+    以獨立的 jieba Tokenizer 建立前綴字典並合併使用者字典，寫出執行環境檔並刪除舊版本。
+
+    Returns:
+        執行環境檔路徑
+    """
+    import jieba
+
+    jieba.setLogLevel(60)
+    version = runtime_version(userdict_path, stopwords_path)
+    tokenizer = jieba.Tokenizer()
+    tokenizer.initialize()
+    tokenizer.load_userdict(userdict_path)
+    payload = (
+        RUNTIME_FORMAT,
+        version,
+        tokenizer.FREQ,
+        tokenizer.total,
+        tokenizer.user_word_tag_tab,
+        _read_stopwords(stopwords_path),
+    )
+
+    os.makedirs(runtime_dir, exist_ok=True)
+    path = runtime_path(version, runtime_dir)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        marshal.dump(payload, f)
+    os.replace(tmp_path, path)
+    for old_path in glob.glob(os.path.join(runtime_dir, "*.marshal")):
+        if old_path != path:
+            os.remove(old_path)
+    return path
+
+
+def _read_runtime(path, version):
+    # marshal.loads 直接讀取映射的記憶體，比 marshal.load 逐段讀檔快數倍
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        payload = marshal.loads(mapped)
+    if payload[0] != RUNTIME_FORMAT or payload[1] != version:
+        raise ValueError(f"執行環境檔版本不符：{path}")
+    return payload
+
+
+def load_runtime(userdict_path="userdict.txt", stopwords_path="stopwords.txt", runtime_dir=DEFAULT_RUNTIME_DIR,
+                 preload_analyse=False):
+    """
+    將執行環境載入全域的 jieba.dt，回傳 NLPRuntime；檔案不存在或版本不符時先重建。
+
+    同一程序（或由已載入的父程序 fork 出的子程序）再次呼叫時，版本相同即直接回傳。
+    preload_analyse 為 True 時一併匯入 jieba.analyse（詞性標注字典與 IDF 表），
+    讓之後 fork 出的工作程序不必各自載入。
+    """
+    global _runtime
+    import jieba
+
+    jieba.setLogLevel(60)
+    version = runtime_version(userdict_path, stopwords_path)
+    if _runtime is None or _runtime.version != version:
+        started = time.perf_counter()
+        path = runtime_path(version, runtime_dir)
+        try:
+            payload = _read_runtime(path, version)
+        except (OSError, ValueError, EOFError):
+            path = build_runtime(userdict_path, stopwords_path, runtime_dir)
+            payload = _read_runtime(path, version)
+        _, _, freq, total, user_word_tag_tab, stopwords = payload
+
+        tokenizer = jieba.dt
+        with tokenizer.lock:
+            tokenizer.FREQ, tokenizer.total = freq, total
+            tokenizer.user_word_tag_tab.update(user_word_tag_tab)
+            tokenizer.initialized = True
+        _runtime = NLPRuntime(version, frozenset(stopwords), path, time.perf_counter() - started)
+
+    if preload_analyse:
+        import jieba.analyse  # noqa: F401
+        import jieba.posseg
+
+        jieba.posseg.dt.makesure_userdict_loaded()
+    return _runtime
+
+
+def main():
+    parser = argparse.ArgumentParser(description="建立預先合併使用者字典的 jieba 執行環境檔")
+    parser.add_argument("--userdict", default="userdict.txt")
+    parser.add_argument("--stopwords", default="stopwords.txt")
+    parser.add_argument("--runtime-dir", default=DEFAULT_RUNTIME_DIR)
+    parser.add_argument("--force", action="store_true", help="即使版本相同也重新建立")
+    args = parser.parse_args()
+
+    version = runtime_version(args.userdict, args.stopwords)
+    path = runtime_path(version, args.runtime_dir)
+    if args.force or not os.path.exists(path):
+        started = time.perf_counter()
+        path = build_runtime(args.userdict, args.stopwords, args.runtime_dir)
+        print(f"🛠️ 已建立 {path}（{time.perf_counter() - started:.2f} 秒）")
+    runtime = load_runtime(args.userdict, args.stopwords, args.runtime_dir)
+    print(f"✅ 版本 {runtime.version}：{os.path.getsize(path) / 1024 / 1024:.1f} MB，"
+          f"停用詞 {len(runtime.stopwords)} 個，載入 {runtime.load_seconds:.3f} 秒")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+import argparse
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque
+
+import numpy as np
+
+# 以環境變數啟用：REVIEW_PROFILE=1 只計時，REVIEW_PROFILE=alloc 另外記錄記憶體配置
+_mode = os.environ.get("REVIEW_PROFILE", "").strip().lower()
+_enabled = _mode not in ("", "0", "false", "off")
+_trace_alloc = _mode == "alloc"
+# 每次 rerun 結束時附加一行 JSON 的紀錄檔（選用）
+LOG_PATH = os.environ.get("REVIEW_PROFILE_LOG")
+# 每個區段保留最近幾筆紀錄計算百分位數
+WINDOW = 1000
+
+_local = threading.local()
+
+
+def enabled():
+    return _enabled
+
+
+def set_enabled(flag=True, trace_alloc=False):
+    """
+    執行期間開關計時（例如基準測試或除錯時）。
+    """
+    global _enabled, _trace_alloc
+    _enabled = bool(flag)
+    _trace_alloc = bool(flag and trace_alloc)
+
+
+class SpanStats:
+    """
+    全程序共用的區段統計，跨 session 彙總每個區段的耗時。
+    """
+
+    def __init__(self, window=WINDOW):
+        self.window = window
+        self._durations = {}
+        self._allocs = {}
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, duration, alloc=None):
+        with self._lock:
+            if name not in self._durations:
+                self._durations[name] = deque(maxlen=self.window)
+                self._allocs[name] = deque(maxlen=self.window)
+                self._counts[name] = 0
+            self._durations[name].append(duration)
+            if alloc is not None:
+                self._allocs[name].append(alloc)
+            self._counts[name] += 1
+
+    def clear(self):
+        with self._lock:
+            self._durations.clear()
+            self._allocs.clear()
+            self._counts.clear()
+
+    def summary(self):
+        """
+        回傳各區段的呼叫次數與 p50/p95/平均/最大耗時（毫秒），依 p95 由大到小排序。
+        """
+        with self._lock:
+            items = [(name, list(durations), list(self._allocs[name]), self._counts[name])
+                     for name, durations in self._durations.items()]
+        return sorted((_summarize(*item) for item in items), key=lambda row: -row["p95_ms"])
+
+
+def _summarize(name, durations, allocs, count):
+    ms = np.asarray(durations) * 1000
+    row = {
+        "span": name,
+        "count": count,
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "mean_ms": float(ms.mean()),
+        "max_ms": float(ms.max()),
+    }
+    if allocs:
+        row["alloc_kb_mean"] = float(np.mean(allocs)) / 1024
+    return row
+
+
+stats = SpanStats()
+
+
+class Run:
+    """
+    單次 rerun 的區段紀錄；spans 依開始順序排列，depth 表示巢狀層級。
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.started = time.time()
+        self.spans = []
+        self.depth = 0
+        self.peak = None
+        self.root = None
+
+    def to_dict(self):
+        result = {
+            "run": self.name,
+            "started": self.started,
+            "spans": [
+                {"name": s.name, "depth": s.depth, "ms": s.duration * 1000,
+                 **({"alloc_kb": s.alloc / 1024} if s.alloc is not None else {})}
+                for s in self.spans
+            ],
+        }
+        if self.peak is not None:
+            result["peak_kb"] = self.peak / 1024
+        return result
+
+
+class _Span:
+    __slots__ = ("name", "depth", "start", "duration", "alloc", "_memory")
+
+    def __init__(self, name, depth):
+        self.name = name
+        self.depth = depth
+        self.duration = 0.0
+        self.alloc = None
+
+
+class _SpanContext:
+    __slots__ = ("name", "span", "run")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        run = self.run = getattr(_local, "run", None)
+        span = self.span = _Span(self.name, run.depth if run else 0)
+        if run is not None:
+            run.spans.append(span)
+            run.depth += 1
+        if _trace_alloc and tracemalloc.is_tracing():
+            span._memory = tracemalloc.get_traced_memory()[0]
+        span.start = time.perf_counter()
+        return span
+
+    def __exit__(self, *exc):
+        span = self.span
+        span.duration = time.perf_counter() - span.start
+        if _trace_alloc and tracemalloc.is_tracing() and hasattr(span, "_memory"):
+            span.alloc = tracemalloc.get_traced_memory()[0] - span._memory
+        if self.run is not None:
+            self.run.depth -= 1
+        stats.record(span.name, span.duration, span.alloc)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(name):
+    """
+    計時區段：with span("load.csv"): ...
+    未啟用時回傳共用的空 context manager，幾乎沒有額外成本。
+    """
+    if not _enabled:
+        return _NULL_SPAN
+    return _SpanContext(name)
+
+
+def traced(name=None):
+    """
+    將函式包成計時區段的裝飾器，name 預設為函式名稱。
+    """
+    def decorator(func):
+        label = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _SpanContext(label):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def begin_run(name):
+    """
+    開始記錄一次 rerun（由 app.py 在頁面分派前呼叫）。
+    """
+    if not _enabled:
+        _local.run = None
+        return None
+    if _trace_alloc:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+    run = Run(name)
+    _local.run = run
+    run.root = _SpanContext(f"run.{name}")
+    run.root.__enter__()
+    return run
+
+
+def end_run():
+    """
+    結束目前的 rerun，寫入紀錄檔（若有設定）並回傳 Run；未啟用時回傳 None。
+    """
+    run = getattr(_local, "run", None)
+    _local.run = None
+    if run is None:
+        return None
+    run.root.__exit__(None, None, None)
+    if _trace_alloc and tracemalloc.is_tracing():
+        run.peak = tracemalloc.get_traced_memory()[1]
+    if LOG_PATH:
+        _append_log(LOG_PATH, run.to_dict())
+    return run
+
+
+_log_lock = threading.Lock()
+
+
+def _append_log(path, record):
+    line = json.dumps(record, ensure_ascii=False, separators=(",", ":"))
+    with _log_lock:
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+def summarize_log(path):
+    """
+    讀取 JSON Lines 紀錄檔（可來自多個程序與 session），彙總各區段的 p50/p95。
+    """
+    summary = SpanStats(window=None)
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            for s in json.loads(line)["spans"]:
+                alloc = s.get("alloc_kb")
+                summary.record(s["name"], s["ms"] / 1000, alloc * 1024 if alloc is not None else None)
+    return summary.summary()
+
+
+def format_summary(rows):
+    lines = [f"{'區段':<48}{'次數':>8}{'p50 ms':>10}{'p95 ms':>10}{'最大 ms':>10}"]
+    for row in rows:
+        lines.append(
+            f"{row['span']:<48}{row['count']:>8}{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}{row['max_ms']:>10.1f}"
+        )
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="彙總 REVIEW_PROFILE_LOG 紀錄檔中各區段的 p50/p95 耗時")
+    parser.add_argument("log", help="JSON Lines 紀錄檔")
+    parser.add_argument("--json", help="另將彙總結果寫成 JSON")
+    args = parser.parse_args()
+
+    rows = summarize_log(args.log)
+    print(format_summary(rows))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(rows, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
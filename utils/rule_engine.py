@@ -0,0 +1,155 @@
+import hashlib
+import json
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_RULES_PATH = "rules.json"
+
+
+class RuleEngine:
+    """
+    多關鍵詞規則引擎：每條規則的關鍵詞編譯成一個正規表示式（關鍵詞的交替）。
+
+    套用到整個欄位時會先去除重複文字，每條規則以 pandas 字串方法對所有不重複文字做一次比對
+    （Arrow 字串由 C++ 正規表示式引擎執行，不經 Python 逐字迴圈），再以 NumPy 矩陣運算產生標籤、旗標與命中次數，
+    不會修改輸入的 DataFrame / Series。
+    """
+
+    def __init__(self, rules):
+        """
+        Args:
+            rules (dict): {規則名稱: [關鍵詞, ...]}，順序即為標籤判定的優先順序
+        """
+        self.names = list(rules)
+        # 較長的關鍵詞放前面；沒有任何關鍵詞的規則為 None（永不命中）
+        self.patterns = [
+            "|".join(re.escape(keyword) for keyword in sorted({k for k in keywords if k}, key=len, reverse=True))
+            or None
+            for keywords in rules.values()
+        ]
+        self._compiled = [re.compile(pattern) if pattern else None for pattern in self.patterns]
+
+    @classmethod
+    def from_config(cls, section, path=DEFAULT_RULES_PATH):
+        """
+        由設定檔的指定區段建立引擎，例如 section="categories"。
+        """
+        return cls(load_rules(path)[section])
+
+    def find(self, text):
+        """
+        回傳文字命中的規則編號集合。
+        """
+        return {rule_id for rule_id, pattern in enumerate(self._compiled) if pattern and pattern.search(text)}
+
+    def match(self, texts):
+        """
+        對整個欄位比對規則，回傳 RuleMatches。
+        """
+        codes, uniques = pd.factorize(pd.Series(texts).reset_index(drop=True), use_na_sentinel=True)
+        matrix = np.zeros((len(uniques), len(self.names)), dtype=bool)
+        if len(uniques):
+            unique_texts = pd.Series(uniques).astype(str)
+            for rule_id, pattern in enumerate(self.patterns):
+                if pattern:
+                    matrix[:, rule_id] = unique_texts.str.contains(pattern, regex=True).to_numpy(dtype=bool)
+        index = texts.index if isinstance(texts, pd.Series) else None
+        return RuleMatches(self.names, codes, matrix, index)
+
+    def label(self, texts, default="其他"):
+        """
+        依規則順序為每段文字標上第一個命中的規則名稱，皆未命中時為 default。
+        """
+        return self.match(texts).first(default)
+
+    def flag(self, texts, rules=None):
+        """
+        回傳每段文字是否命中任一規則（可指定規則子集）。
+        """
+        return self.match(texts).any(rules)
+
+
+class RuleMatches:
+    """
+    規則比對結果：unique_matrix[i, j] 表示第 i 個不重複文字是否命中第 j 條規則，
+    codes 將每一列對應到不重複文字（缺值為 -1）。
+    """
+
+    def __init__(self, names, codes, unique_matrix, index=None):
+        self.names = names
+        self.codes = codes
+        self.unique_matrix = unique_matrix
+        self.index = index
+
+    def _rows(self, values, fill):
+        # 將不重複文字的結果展開回每一列
+        result = values[np.where(self.codes >= 0, self.codes, 0)] if len(values) else np.full(len(self.codes), fill)
+        return np.where(self.codes >= 0, result, fill)
+
+    def _columns(self, rules):
+        if rules is None:
+            return list(range(len(self.names)))
+        return [self.names.index(rule) for rule in rules]
+
+    def any(self, rules=None):
+        """
+        每列是否命中指定規則中的任一條（bool Series）。
+        """
+        hits = self.unique_matrix[:, self._columns(rules)].any(axis=1)
+        return pd.Series(self._rows(hits, False).astype(bool), index=self.index)
+
+    def first(self, default="其他"):
+        """
+        每列第一個命中的規則名稱（依規則順序），皆未命中時為 default。
+        """
+        has_hit = self.unique_matrix.any(axis=1)
+        first_rule = self.unique_matrix.argmax(axis=1)
+        labels = np.array(self.names + [default], dtype=object)
+        unique_labels = labels[np.where(has_hit, first_rule, len(self.names))]
+        return pd.Series(self._rows(unique_labels, default), index=self.index, dtype=object)
+
+    def hit_counts(self):
+        """
+        各規則命中的列數（Series，索引為規則名稱）。
+        """
+        frequencies = np.bincount(self.codes[self.codes >= 0], minlength=len(self.unique_matrix))
+        return pd.Series(frequencies @ self.unique_matrix.astype(np.int64), index=self.names, dtype="int64")
+
+
+def load_rules(path=DEFAULT_RULES_PATH):
+    """
+    讀取規則設定檔：{"categories": {...}, "promotions": {...}}
+    """
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+# {絕對路徑: ((mtime_ns, 大小), 雜湊)}：檔案未變動時不必重新讀取與計算雜湊
+_rules_versions = {}
+
+
+def rules_version(path=DEFAULT_RULES_PATH):
+    """
+    規則設定檔內容的雜湊，不存在時為空字串；由規則衍生的資料（例如彙總檔的打卡統計）以此判斷是否過期。
+
+    依檔案 mtime/大小快取，重複呼叫只需一次 stat。
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return ""
+    key = os.path.abspath(path)
+    signature = (stat.st_mtime_ns, stat.st_size)
+    cached = _rules_versions.get(key)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    try:
+        with open(path, "rb") as f:
+            version = hashlib.sha256(f.read()).hexdigest()[:16]
+    except OSError:
+        return ""
+    _rules_versions[key] = (signature, version)
+    return version
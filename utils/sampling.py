@@ -0,0 +1,138 @@
+import numpy as np
+import pandas as pd
+
+from utils.data_loader import resolve_derived
+
+_ROUNDS = 4
+
+
+def _round_function(value, seed, round_index):
+    x = (value * 0x9E3779B1 + seed + round_index * 0x85EBCA6B) & 0xFFFFFFFF
+    x ^= x >> 16
+    x = (x * 0x7FEB352D) & 0xFFFFFFFF
+    x ^= x >> 15
+    return x
+
+
+def permuted_index(i, n, seed):
+    """
+    [0, n) 上由 seed 決定的偽隨機排列的第 i 項，O(1) 計算，不需產生整個排列。
+
+    以 Feistel 網路在 2 的偶數次方大小的範圍內排列，超出 n 的值再排列一次（cycle walking），
+    範圍小於 4n，平均不到 4 次即可得到結果。
+    """
+    bits = max(2, (n - 1).bit_length())
+    bits += bits & 1
+    half = bits // 2
+    mask = (1 << half) - 1
+    x = i
+    while True:
+        left, right = x >> half, x & mask
+        for round_index in range(_ROUNDS):
+            left, right = right, left ^ (_round_function(right, seed, round_index) & mask)
+        x = (left << half) | right
+        if x < n:
+            return x
+
+
+def draw(ids, k, seed, cursor=0):
+    """
+    從 ids 依 seed 的排列順序取出第 cursor 起的 k 個元素（不重複）。
+
+    游標每前進 len(ids) 就換一個排列（epoch），因此同一個種子連續抽取時，
+    所有元素都出現過一次之後才會重複；相同的 (seed, cursor) 永遠得到相同結果。
+    """
+    n = len(ids)
+    k = min(k, n)
+    picked, seen = [], set()
+    position = cursor
+    while len(picked) < k and position < cursor + 2 * n:
+        epoch, index = divmod(position, n)
+        row = int(ids[permuted_index(index, n, (seed + epoch * 0x27D4EB2F) & 0xFFFFFFFF)])
+        if row not in seen:
+            seen.add(row)
+            picked.append(row)
+        position += 1
+    return np.asarray(picked, dtype=np.int64)
+
+
+class SamplePools:
+    """
+    範例抽樣池：各星級的留言列號、各主題的句子列號，文字重複者只保留第一列。
+
+    所有池子以 CSR 形式存放在同一個陣列中，每個資料版本只建立一次並由所有 session 共用；
+    抽樣時只計算 k 個排列位置，與池子大小無關。
+    """
+
+    def __init__(self, keys, offsets, rows):
+        self.offsets = offsets
+        self.rows = rows
+        self._lookup = {key: i for i, key in enumerate(keys)}
+
+    @property
+    def nbytes(self):
+        return int(self.offsets.nbytes + self.rows.nbytes + len(self._lookup) * 100)
+
+    def pool(self, kind, key):
+        """
+        回傳抽樣池的列號陣列（唯讀視圖），例如 pool("rating", 5)、pool("label", "食物")。
+        """
+        i = self._lookup.get((kind, key))
+        if i is None:
+            return self.rows[:0]
+        return self.rows[self.offsets[i]:self.offsets[i + 1]]
+
+    def draw(self, kind, key, k, seed, cursor=0):
+        return draw(self.pool(kind, key), k, seed, cursor)
+
+
+def _group_rows(values, keep):
+    """
+    將 keep 中的列依 values 分組，回傳 (分組值列表, 各組列號陣列) 的 CSR 形式。
+    """
+    rows = np.flatnonzero(keep)
+    codes, uniques = pd.factorize(values[rows])
+    order = np.argsort(codes, kind="stable")
+    counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+    return list(uniques), counts, rows[order][codes[order] >= 0]
+
+
+def _first_occurrences(texts):
+    codes, _ = pd.factorize(texts)
+    first = np.zeros(len(codes), dtype=bool)
+    _, first_rows = np.unique(codes[codes >= 0], return_index=True)
+    first[np.flatnonzero(codes >= 0)[first_rows]] = True
+    return first
+
+
+def build_sample_pools(df_reviews, df=None):
+    """
+    由評論表與句子表建立抽樣池；任一為 None 時略過對應的抽樣池。
+    """
+    keys, counts, parts = [], [np.zeros(0, dtype=np.int64)], [np.zeros(0, dtype=np.int64)]
+
+    if df_reviews is not None:
+        ratings, rating_counts, rating_rows = _group_rows(
+            df_reviews["Review Rating"].to_numpy(), _first_occurrences(df_reviews["Review"].to_numpy())
+        )
+        keys += [("rating", int(rating)) for rating in ratings]
+        counts.append(rating_counts)
+        parts.append(rating_rows)
+
+    if df is not None and "label" in df.columns:
+        labels, label_counts, label_rows = _group_rows(
+            df["label"].astype(object).to_numpy(), _first_occurrences(df["sentence"].to_numpy())
+        )
+        keys += [("label", str(label)) for label in labels]
+        counts.append(label_counts)
+        parts.append(label_rows)
+
+    offsets = np.concatenate([[0], np.cumsum(np.concatenate(counts))]).astype(np.int64)
+    return SamplePools(keys, offsets, np.concatenate(parts).astype(np.int32))
+
+
+def get_sample_pools(handle):
+    """
+    取得目前資料集的共用 SamplePools，每個資料版本只建立一次。
+    """
+    return resolve_derived(handle, "sample_pools", build_sample_pools)
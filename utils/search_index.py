@@ -0,0 +1,425 @@
+import argparse
+import json
+import os
+import re
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from utils.data_loader import read_store_data, store_version
+from utils.store_catalog import get_store_catalog
+
+SEARCH_INDEX_VERSION = 1
+INDEX_DIRNAME = "search_index"
+# 索引項目為 (句子列號 << 16) | 字元位置，超過此長度的句子只索引前段
+MAX_POSITION = 2**16 - 1
+BM25_K1 = 1.2
+BM25_B = 0.75
+MAX_PAGE_SIZE = 200
+
+_POSITION_MASK = np.int64(MAX_POSITION)
+
+
+def index_dir(folder: str = "data"):
+    """
+    回傳全文索引資料夾：data/search_index/（每家店一個子資料夾，可個別重建）
+    """
+    return os.path.join(folder, INDEX_DIRNAME)
+
+
+def segment_dir(location: str, folder: str = "data"):
+    return os.path.join(index_dir(folder), location)
+
+
+def normalize_text(texts):
+    """
+    轉小寫並去除空白，索引與查詢使用相同的正規化。
+    """
+    # 轉成 object 欄位以使用 Python re（Arrow 字串引擎的 \s 不涵蓋全形空白）
+    texts = pd.Series(texts).fillna("").astype(str).astype(object)
+    return texts.str.lower().str.replace(r"[\s\x00]+", "", regex=True)
+
+
+def parse_query(query):
+    """
+    以空白或 | 分隔多個片語，回傳去除重複後的片語列表。
+    """
+    phrases = normalize_text(re.split(r"[\s|]+", query or "")).tolist()
+    return list(dict.fromkeys(phrase for phrase in phrases if phrase))
+
+
+def _bigram_postings(texts):
+    """
+    以字元二元組（bigram）建立帶位置的倒排索引。
+
+    每句結尾補一個哨兵字元（\\x00），最後一個字也有一個以它開頭的 bigram，
+    因此單字查詢可以用「以該字開頭的所有 bigram」涵蓋。
+
+    Returns:
+        (排序後不重複的 bigram 鍵, CSR offsets, postings)
+    """
+    lengths = texts.str.len().to_numpy(dtype=np.int64)
+    codes = np.frombuffer(("\x00".join(texts) + "\x00").encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    spans = lengths + 1
+    rows = np.repeat(np.arange(len(texts), dtype=np.int64), spans)
+    positions = np.arange(len(codes), dtype=np.int64) - np.repeat(np.cumsum(spans) - spans, spans)
+
+    starts = np.flatnonzero((codes[:-1] != 0) & (positions[:-1] <= MAX_POSITION))
+    keys = (codes[starts] << np.uint64(32)) | codes[starts + 1]
+    postings = (rows[starts] << 16) | positions[starts]
+
+    order = np.lexsort((postings, keys))
+    keys, postings = keys[order], postings[order]
+    unique_keys, first = np.unique(keys, return_index=True)
+    offsets = np.append(first, len(keys)).astype(np.int64)
+    return unique_keys, offsets, postings
+
+
+def build_segment(location: str, folder: str = "data"):
+    """
+    為單一店家建立（或重建）全文索引分段，寫入 data/search_index/<店名>/。
+
+    先寫到暫存資料夾再換上，搜尋中的程序不會讀到寫到一半的分段。
+    """
+    version = store_version(location, folder)
+    _, df = read_store_data(location, folder, sentence_columns=["sentence", "rating", "label", "sentiment", "index"])
+    texts = normalize_text(df["sentence"])
+    keys, offsets, postings = _bigram_postings(texts)
+
+    labels = pd.Categorical(df["label"].astype(str))
+    sentiments = pd.Categorical(df["sentiment"].astype(str))
+    docs = pa.table({
+        "sentence": pa.array(df["sentence"].fillna("").astype(str).tolist(), type=pa.string()),
+        "rating": pa.array(df["rating"].to_numpy(dtype=np.int8)),
+        "label": pa.array(labels.codes.astype(np.int16)),
+        "sentiment": pa.array(sentiments.codes.astype(np.int16)),
+        "review_id": pa.array(df["index"].to_numpy(dtype=np.int32)),
+        "length": pa.array(texts.str.len().to_numpy(dtype=np.int32)),
+    })
+    meta = {
+        "version": SEARCH_INDEX_VERSION,
+        "location": location,
+        "source_signature": version,
+        "sentence_count": len(df),
+        "total_length": int(docs["length"].to_numpy().sum()),
+        "labels": [str(label) for label in labels.categories],
+        "sentiments": [str(sentiment) for sentiment in sentiments.categories],
+    }
+
+    target = segment_dir(location, folder)
+    tmp_dir = f"{target}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    np.save(os.path.join(tmp_dir, "keys.npy"), keys)
+    np.save(os.path.join(tmp_dir, "offsets.npy"), offsets)
+    np.save(os.path.join(tmp_dir, "postings.npy"), postings)
+    feather.write_feather(docs, os.path.join(tmp_dir, "docs.feather"), compression="uncompressed")
+    with open(os.path.join(tmp_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+
+    old_dir = f"{target}.old-{os.getpid()}"
+    if os.path.exists(target):
+        os.replace(target, old_dir)
+    os.replace(tmp_dir, target)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    return meta
+
+
+def _read_meta(path):
+    try:
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return meta if meta.get("version") == SEARCH_INDEX_VERSION else None
+
+
+def update_search_index(folder: str = "data", stores=None, force=False, progress=None):
+    """
+    增量更新全文索引：只重建新增或資料版本改變的店家，並移除已不存在店家的分段。
+
+    Args:
+        stores (list): 只更新指定店家；None 代表店家目錄中的所有店家（並清除多餘分段）
+        progress (callable): progress(店名, 是否重建)
+
+    Returns:
+        {"built": 重建數, "current": 已是最新數, "removed": 移除數}
+    """
+    stats = {"built": 0, "current": 0, "removed": 0}
+    locations = stores if stores is not None else [entry["location"] for entry in get_store_catalog(folder).processed()]
+    for location in locations:
+        meta = _read_meta(segment_dir(location, folder))
+        stale = force or meta is None or meta.get("source_signature") != store_version(location, folder)
+        if stale:
+            build_segment(location, folder)
+        stats["built" if stale else "current"] += 1
+        if progress:
+            progress(location, stale)
+
+    if stores is None and os.path.isdir(index_dir(folder)):
+        keep = set(locations)
+        for name in os.listdir(index_dir(folder)):
+            if name not in keep:
+                shutil.rmtree(os.path.join(index_dir(folder), name), ignore_errors=True)
+                stats["removed"] += 1
+    return stats
+
+
+class Segment:
+    """
+    單一店家的索引分段，陣列皆以 memory-map 開啟，只有查詢用到的部分會讀進記憶體。
+    """
+
+    def __init__(self, path, meta):
+        self.meta = meta
+        self.location = meta["location"]
+        self.keys = np.load(os.path.join(path, "keys.npy"), mmap_mode="r")
+        self.offsets = np.load(os.path.join(path, "offsets.npy"), mmap_mode="r")
+        self.postings = np.load(os.path.join(path, "postings.npy"), mmap_mode="r")
+        self.docs = feather.read_table(os.path.join(path, "docs.feather"), memory_map=True)
+        self.ratings = self.docs["rating"].to_numpy()
+        self.labels = self.docs["label"].to_numpy()
+        self.sentiments = self.docs["sentiment"].to_numpy()
+        self.lengths = self.docs["length"].to_numpy()
+
+    def _key_range(self, low, high):
+        start, end = np.searchsorted(self.keys, [low, high])
+        return self.offsets[start], self.offsets[end]
+
+    def match(self, phrase):
+        """
+        回傳包含片語的 (句子列號, 出現次數)。
+
+        兩字以上的片語：取各 bigram 的 postings，將位置對齊到片語開頭後求交集；
+        單字：取以該字開頭的所有 bigram。
+        """
+        codes = [ord(char) for char in phrase]
+        if len(codes) == 1:
+            lo, hi = self._key_range(np.uint64(codes[0]) << np.uint64(32), np.uint64(codes[0] + 1) << np.uint64(32))
+            # 多個 bigram 的 postings 各自有序，合併後需重新排序
+            matches = np.sort(self.postings[lo:hi])
+        else:
+            lists = []
+            for i, (first, second) in enumerate(zip(codes, codes[1:])):
+                key = (np.uint64(first) << np.uint64(32)) | np.uint64(second)
+                lo, hi = self._key_range(key, key + np.uint64(1))
+                postings = np.asarray(self.postings[lo:hi])
+                postings = postings[(postings & _POSITION_MASK) >= i]
+                lists.append(postings - i)
+            lists.sort(key=len)
+            matches = lists[0]
+            for postings in lists[1:]:
+                if len(matches) == 0:
+                    break
+                matches = np.intersect1d(matches, postings, assume_unique=True)
+        # matches 已排序，以相鄰差異取代 np.unique 的排序
+        rows = matches >> 16
+        if len(rows) == 0:
+            return rows, rows
+        starts = np.flatnonzero(np.concatenate(([True], rows[1:] != rows[:-1])))
+        return rows[starts], np.diff(np.append(starts, len(rows)))
+
+    def filter_mask(self, rows, ratings=None, labels=None, sentiments=None):
+        if not (ratings or labels or sentiments):
+            return slice(None)
+        mask = np.ones(len(rows), dtype=bool)
+        if ratings:
+            mask &= np.isin(self.ratings[rows], list(ratings))
+        for values, names, column in ((labels, self.meta["labels"], self.labels),
+                                      (sentiments, self.meta["sentiments"], self.sentiments)):
+            if values:
+                codes = [names.index(value) for value in values if value in names]
+                mask &= np.isin(column[rows], codes)
+        return mask
+
+    def sentences(self, rows):
+        return self.docs["sentence"].take(pa.array(rows)).to_pylist()
+
+
+class SearchIndex:
+    """
+    跨店家的全文搜尋：依片語查詢、篩選星級／主題／情感，並以 BM25 排序分頁。
+    """
+
+    def __init__(self, folder="data"):
+        self.folder = folder
+        self._segments = {}
+
+    def refresh(self):
+        """
+        重新掃描索引資料夾，只重新開啟新增或重建過的分段。
+        """
+        root = index_dir(self.folder)
+        found = {}
+        if os.path.isdir(root):
+            with os.scandir(root) as entries:
+                for entry in entries:
+                    if not entry.is_dir() or ".tmp-" in entry.name or ".old-" in entry.name:
+                        continue
+                    try:
+                        mtime = os.stat(os.path.join(entry.path, "meta.json")).st_mtime_ns
+                    except OSError:
+                        continue
+                    cached = self._segments.get(entry.name)
+                    if cached is not None and cached[0] == mtime:
+                        found[entry.name] = cached
+                        continue
+                    meta = _read_meta(entry.path)
+                    if meta is not None:
+                        found[entry.name] = (mtime, Segment(entry.path, meta))
+        self._segments = found
+        return self
+
+    @property
+    def segments(self):
+        return [segment for _, segment in sorted(self._segments.values(), key=lambda item: item[1].location)]
+
+    def facets(self):
+        """
+        回傳所有分段的主題與情感選項（供篩選器使用）。
+        """
+        labels, sentiments = set(), set()
+        for segment in self.segments:
+            labels.update(segment.meta["labels"])
+            sentiments.update(segment.meta["sentiments"])
+        return sorted(labels), sorted(sentiments)
+
+    def search(self, query, mode="any", ratings=None, labels=None, sentiments=None, limit=20, offset=0):
+        """
+        Args:
+            query (str): 以空白或 | 分隔的片語，例如「排隊 冷掉」
+            mode (str): "any" 包含任一片語、"all" 包含所有片語
+            ratings / labels / sentiments (list): 篩選條件，None 或空列表代表不篩選
+            limit, offset: 分頁
+
+        Returns:
+            {"phrases", "total", "stores": [各店符合句數], "results": [該頁句子]}
+        """
+        phrases = parse_query(query)
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        segments = self.segments
+        empty = {"phrases": phrases, "total": 0, "stores": [], "results": []}
+        if not phrases or not segments:
+            return empty
+
+        # 第一輪：各分段各片語的符合句子（篩選後），並累計全體文件頻率計算 idf
+        matched = []
+        document_frequency = np.zeros(len(phrases))
+        for segment in segments:
+            per_phrase = []
+            for i, phrase in enumerate(phrases):
+                rows, counts = segment.match(phrase)
+                mask = segment.filter_mask(rows, ratings, labels, sentiments)
+                rows, counts = rows[mask], counts[mask]
+                document_frequency[i] += len(rows)
+                per_phrase.append((rows, counts))
+            matched.append(per_phrase)
+
+        sentence_count = sum(segment.meta["sentence_count"] for segment in segments)
+        average_length = sum(segment.meta["total_length"] for segment in segments) / max(sentence_count, 1)
+        idf = np.log(1 + (sentence_count - document_frequency + 0.5) / (document_frequency + 0.5))
+
+        # 第二輪：合併片語、計算 BM25 分數
+        stores, candidates = [], []
+        for s, (segment, per_phrase) in enumerate(zip(segments, matched)):
+            all_rows = per_phrase[0][0] if len(phrases) == 1 else np.unique(
+                np.concatenate([rows for rows, _ in per_phrase]))
+            if len(all_rows) == 0:
+                continue
+            scores = np.zeros(len(all_rows))
+            hits = np.zeros(len(all_rows), dtype=np.int64)
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * segment.lengths[all_rows] / max(average_length, 1))
+            for i, (rows, counts) in enumerate(per_phrase):
+                position = np.searchsorted(all_rows, rows)
+                scores[position] += idf[i] * counts * (BM25_K1 + 1) / (counts + norm[position])
+                hits[position] += 1
+            keep = hits == len(phrases) if mode == "all" else hits > 0
+            if not keep.any():
+                continue
+            stores.append({
+                "location": segment.location,
+                "matches": int(keep.sum()),
+                "share": float(keep.sum() / max(segment.meta["sentence_count"], 1)),
+            })
+            candidates.append((np.full(int(keep.sum()), s), all_rows[keep], scores[keep]))
+
+        if not candidates:
+            return empty
+        segment_ids, rows, scores = (np.concatenate(parts) for parts in zip(*candidates))
+        # 分數遞減；同分時依店名、句子順序，分頁結果固定
+        order = np.lexsort((rows, segment_ids, -scores))[offset:offset + limit]
+
+        results = []
+        for s in np.unique(segment_ids[order]):
+            segment = segments[s]
+            picked = order[segment_ids[order] == s]
+            page_rows = rows[picked]
+            for i, row, sentence in zip(picked, page_rows, segment.sentences(page_rows)):
+                results.append((i, {
+                    "location": segment.location,
+                    "sentence": sentence,
+                    "rating": int(segment.ratings[row]),
+                    "label": segment.meta["labels"][segment.labels[row]],
+                    "sentiment": segment.meta["sentiments"][segment.sentiments[row]],
+                    "review_id": int(segment.docs["review_id"][int(row)].as_py()),
+                    "score": round(float(scores[i]), 4),
+                }))
+        rank = {i: r for r, i in enumerate(order)}
+        results.sort(key=lambda item: rank[item[0]])
+
+        return {
+            "phrases": phrases,
+            "total": int(len(rows)),
+            "stores": sorted(stores, key=lambda store: (-store["matches"], store["location"])),
+            "results": [result for _, result in results],
+        }
+
+
+_indexes = {}
+
+
+def get_search_index(folder: str = "data"):
+    """
+    取得程序共用的 SearchIndex，每次取得時檢查是否有重建過的分段。
+    """
+    key = os.path.abspath(folder)
+    if key not in _indexes:
+        _indexes[key] = SearchIndex(folder)
+    return _indexes[key].refresh()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="建立／更新跨店家全文索引，或從命令列搜尋")
+    parser.add_argument("stores", nargs="*", help="只更新指定店家，未指定時更新店家目錄中的所有店家")
+    parser.add_argument("--folder", default="data")
+    parser.add_argument("--force", action="store_true", help="即使索引仍有效也重建")
+    parser.add_argument("--query", help="搜尋片語（以空白分隔）")
+    parser.add_argument("--all", action="store_true", help="需包含所有片語（預設為任一片語）")
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    if args.query:
+        index = get_search_index(args.folder)
+        start = time.perf_counter()
+        result = index.search(args.query, mode="all" if args.all else "any", limit=args.limit)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"🔎 {result['total']} 句符合（{elapsed:.1f} ms）")
+        for store in result["stores"][:10]:
+            print(f"  {store['location']}: {store['matches']} 句（{store['share']:.1%}）")
+        for item in result["results"]:
+            print(f"  [{item['location']}] {'⭐' * item['rating']} {item['sentence']}")
+        return
+
+    def progress(location, built):
+        print(f"{location}: {'已重建' if built else '已是最新'}")
+
+    stats = update_search_index(args.folder, args.stores or None, args.force, progress)
+    print(f"✅ 重建 {stats['built']} 家、最新 {stats['current']} 家、移除 {stats['removed']} 家")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+import numpy as np
+import pandas as pd
+
+from utils.data_loader import resolve_derived
+
+POSITIVE = "正面"
+DEFAULT_BOOTSTRAP = 1000
+DEFAULT_CONFIDENCE = 0.95
+# 連續值（情感分數、評論層級的正面比例）分箱後以多項分布抽樣；箱寬 1/32，箱內差異對信賴區間的影響可忽略
+BINS = 32
+WEIGHTINGS = ("sentence", "review")
+# rating 欄為 0 代表該主題的所有星級
+ALL_RATINGS = 0
+
+
+def _bootstrap_means(groups, values, n_groups, n_boot, rng, bins=BINS):
+    """
+    一次對所有群組做 bootstrap，回傳 (各群組單位數, 平均值, bootstrap 平均值矩陣 [群組, 次數])。
+
+    每個群組的資料先依數值分到 bins 個箱子；從群組中重複抽樣 n 個單位等同於
+    以各箱的比例做 Multinomial(n) 抽樣，所有群組與所有 bootstrap 次數在同一次呼叫中完成，
+    成本只與群組數 × 次數 × 箱數有關，與句子數無關。0/1 的資料只落在頭尾兩箱，結果與逐筆重抽完全相同。
+    """
+    values = np.clip(values, 0.0, 1.0)
+    codes = groups * bins + np.minimum((values * bins).astype(np.int64), bins - 1)
+    counts = np.bincount(codes, minlength=n_groups * bins).reshape(n_groups, bins)
+    sums = np.bincount(codes, weights=values, minlength=n_groups * bins).reshape(n_groups, bins)
+
+    n = counts.sum(axis=1)
+    bin_means = np.divide(sums, counts, out=np.zeros_like(sums), where=counts > 0)
+    probs = counts / np.maximum(n, 1)[:, None]
+    probs[n == 0, 0] = 1.0
+    draws = rng.multinomial(n[:, None], probs[:, None, :], size=(n_groups, n_boot))
+    boot = np.einsum("gbk,gk->gb", draws, bin_means) / np.maximum(n, 1)[:, None]
+    return n, sums.sum(axis=1) / np.maximum(n, 1), boot
+
+
+def sentiment_breakdown(df, weighting="sentence", n_boot=DEFAULT_BOOTSTRAP, confidence=DEFAULT_CONFIDENCE, seed=0):
+    """
+    各主題 × 星級的情感分布：正面句比例與平均情感分數，附 bootstrap 百分位數信賴區間。
+
+    Args:
+        df (DataFrame): 句子表（label、rating、index、sentiment、sentiment_score）
+        weighting (str): "sentence" 每句權重相同；"review" 每則評論在每個主題中權重相同
+            （先取同一評論在該主題內所有句子的平均，長評論不會主導結果，bootstrap 也以評論為單位重抽）
+        n_boot (int): bootstrap 次數
+        confidence (float): 信賴水準
+
+    Returns:
+        DataFrame：label、rating（0 代表所有星級）、sentences、units、
+        positive_share / positive_low / positive_high、mean_score / score_low / score_high
+    """
+    columns = ["label", "rating", "sentences", "units", "positive_share", "positive_low", "positive_high",
+               "mean_score", "score_low", "score_high"]
+    if df is None or len(df) == 0 or "label" not in df.columns or "sentiment_score" not in df.columns:
+        return pd.DataFrame(columns=columns)
+    if weighting not in WEIGHTINGS:
+        raise ValueError(f"weighting 必須是 {' / '.join(WEIGHTINGS)}")
+
+    label_codes, labels = pd.factorize(df["label"].astype(object), sort=True)
+    ratings = df["rating"].to_numpy(dtype=np.int64)
+    scores = df["sentiment_score"].to_numpy(dtype=np.float64)
+    if "sentiment" in df.columns:
+        positive = (df["sentiment"].astype(object) == POSITIVE).to_numpy(dtype=np.float64)
+    else:
+        positive = (scores > 0.5).astype(np.float64)
+    valid = (label_codes >= 0) & (ratings >= 1) & (ratings <= 5) & ~np.isnan(scores)
+    label_codes, ratings, scores, positive = label_codes[valid], ratings[valid], scores[valid], positive[valid]
+    sentence_groups = label_codes * 6 + ratings
+
+    if weighting == "review":
+        # 單位為（評論, 主題）：同一評論在同一主題的句子先取平均
+        reviews = df["index"].to_numpy(dtype=np.int64)[valid]
+        _, first, units = np.unique(reviews * len(labels) + label_codes, return_index=True, return_inverse=True)
+        n_units = len(first)
+        sizes = np.bincount(units, minlength=n_units)
+        unit_groups = sentence_groups[first]
+        positive = np.bincount(units, weights=positive, minlength=n_units) / sizes
+        scores = np.bincount(units, weights=scores, minlength=n_units) / sizes
+    else:
+        unit_groups = sentence_groups
+
+    # 每個主題有 6 個群組：所有星級（0）與 1～5 星；所有星級的群組由同一批單位再計一次
+    n_groups = len(labels) * 6
+    groups = np.concatenate([unit_groups, unit_groups - unit_groups % 6])
+    rng = np.random.default_rng(seed)
+    alpha = (1 - confidence) / 2
+
+    n, positive_share, positive_boot = _bootstrap_means(groups, np.tile(positive, 2), n_groups, n_boot, rng)
+    _, mean_score, score_boot = _bootstrap_means(groups, np.tile(scores, 2), n_groups, n_boot, rng)
+    positive_low, positive_high = np.quantile(positive_boot, [alpha, 1 - alpha], axis=1)
+    score_low, score_high = np.quantile(score_boot, [alpha, 1 - alpha], axis=1)
+    sentence_counts = np.bincount(
+        np.concatenate([sentence_groups, sentence_groups - sentence_groups % 6]), minlength=n_groups
+    )
+
+    keep = n > 0
+    group_ids = np.arange(n_groups)[keep]
+    return pd.DataFrame({
+        "label": np.asarray(labels, dtype=object)[group_ids // 6],
+        "rating": group_ids % 6,
+        "sentences": sentence_counts[keep],
+        "units": n[keep],
+        "positive_share": positive_share[keep],
+        "positive_low": positive_low[keep],
+        "positive_high": positive_high[keep],
+        "mean_score": mean_score[keep],
+        "score_low": score_low[keep],
+        "score_high": score_high[keep],
+    }, columns=columns)
+
+
+def get_sentiment_breakdown(handle, weighting="sentence"):
+    """
+    取得目前資料集的情感分布與信賴區間，每個資料版本與加權方式只計算一次。
+    """
+    return resolve_derived(
+        handle,
+        f"sentiment_breakdown:{weighting}",
+        lambda df_reviews, df: sentiment_breakdown(df, weighting),
+        lambda breakdown: int(breakdown.memory_usage(deep=True).sum()),
+    )
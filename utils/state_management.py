@@ -1,25 +1,84 @@
+import random
+import zlib
+
 import streamlit as st
+from utils.data_loader import resolve_store
+from utils.sampling import draw
+
+def current_dataset():
+    """
+    回傳目前 session 選擇的 DatasetHandle，尚未選擇時回傳 None。
+    """
+    return st.session_state.get("dataset")
+
 
 def check_data_availability(need_processed_data=False):
     """
     檢查是否有可用的資料，並引導用戶到輸入頁面(如果需要)
-    
+
+    session_state 只保存 DatasetHandle，資料本身由程序共用快取提供（唯讀）
+
     Args:
         need_processed_data (bool): 若為True，則同時需要df_reviews和df；若為False，則只需要df_reviews
-        
+
     Returns:
         若need_processed_data為False，返回df_reviews或None
         若need_processed_data為True，返回(df_reviews, df)或(None, None)
     """
-    if 'df_reviews' not in st.session_state or st.session_state.df_reviews is None:
+    handle = current_dataset()
+    if handle is None:
         if need_processed_data:
             return None, None
         else:
             return None
-            
+
+    try:
+        df_reviews, df = resolve_store(handle)
+    except FileNotFoundError:
+        # 資料檔已被移除
+        st.session_state.dataset = None
+        return (None, None) if need_processed_data else None
+
     if need_processed_data:
-        if 'df' not in st.session_state or st.session_state.df is None:
+        if df is None:
             return None, None
-        return st.session_state.df_reviews, st.session_state.df
+        return df_reviews, df
     else:
-        return st.session_state.df_reviews
\ No newline at end of file
+        return df_reviews
+
+
+def sample_seed():
+    """
+    本 session 固定的抽樣種子：同一位使用者看到的範例可重現，不同使用者各自不同。
+    """
+    if "sample_seed" not in st.session_state:
+        st.session_state.sample_seed = random.getrandbits(32)
+    return st.session_state.sample_seed
+
+
+def _sample_cursor_key(bucket):
+    handle = current_dataset()
+    return (handle.key if handle is not None else None,) + tuple(bucket)
+
+
+def session_examples(ids, bucket, k):
+    """
+    從抽樣池 ids 取出本 session 目前游標位置的 k 個範例列號；rerun 時結果不變。
+
+    Args:
+        ids: 抽樣池的列號陣列
+        bucket (tuple): 抽樣池名稱，例如 ("rating", 5)，用來區分游標與排列
+    """
+    cursors = st.session_state.get("sample_cursors", {})
+    seed = (sample_seed() + zlib.crc32(repr(tuple(bucket)).encode("utf-8"))) & 0xFFFFFFFF
+    return draw(ids, k, seed, cursors.get(_sample_cursor_key(bucket), 0))
+
+
+def next_examples(bucket, k):
+    """
+    將抽樣池的游標前進 k，下次 session_examples 會取出接下來的範例（供按鈕的 on_click 使用）。
+    """
+    cursors = st.session_state.get("sample_cursors", {})
+    key = _sample_cursor_key(bucket)
+    cursors[key] = cursors.get(key, 0) + k
+    st.session_state.sample_cursors = cursors
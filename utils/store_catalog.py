@@ -0,0 +1,251 @@
+import argparse
+import json
+import os
+
+import pandas as pd
+import pyarrow.feather as feather
+
+from utils.dataset_cache import registry
+from utils.store_format import csv_paths, is_store_current, store_paths
+
+CATALOG_SCHEMA_VERSION = 2
+CATALOG_FILENAME = "catalog.json"
+_REVIEW_SUFFIXES = ("_reviews.csv", "_reviews.feather")
+
+
+def catalog_path(folder: str = "data"):
+    """
+    回傳店家目錄檔路徑：data/catalog.json
+    """
+    return os.path.join(folder, CATALOG_FILENAME)
+
+
+def _scan_sources(folder):
+    """
+    掃描資料夾一次，回傳 {店名: {檔名: (mtime_ns, size)}}，只做 stat 不讀取內容。
+    """
+    files = {}
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            if entry.is_file():
+                stat = entry.stat()
+                files[entry.name] = (stat.st_mtime_ns, stat.st_size)
+
+    stores = {}
+    for name in files:
+        for suffix in _REVIEW_SUFFIXES:
+            if name.endswith(suffix):
+                stores.setdefault(name[: -len(suffix)], {})
+    for location, sources in stores.items():
+        for path in csv_paths(location, folder) + store_paths(location, folder):
+            name = os.path.basename(path)
+            if name in files:
+                sources[name] = files[name]
+    return stores
+
+
+def _describe_store(location, folder):
+    """
+    讀取單一店家的基本資料（只在新增或檔案變動時呼叫）。
+    """
+    if is_store_current(location, folder):
+        reviews_path, sentences_path = store_paths(location, folder)
+        reviews = feather.read_table(
+            reviews_path, columns=["Restaurant Name", "Overall Rating", "Review Count"], memory_map=True
+        )
+        first = reviews.slice(0, 1).to_pylist()
+        review_rows = reviews.num_rows
+        sentence_rows = feather.read_table(sentences_path, columns=["review_id"], memory_map=True).num_rows
+        first = first[0] if first else {}
+    else:
+        reviews_csv, sentences_csv = csv_paths(location, folder)
+        reviews = pd.read_csv(reviews_csv, usecols=["Restaurant Name", "Overall Rating", "Review Count"])
+        first = reviews.iloc[0].to_dict() if len(reviews) else {}
+        review_rows = len(reviews)
+        sentence_rows = len(pd.read_csv(sentences_csv, usecols=["index"])) if os.path.exists(sentences_csv) else 0
+
+    return {
+        "restaurant_name": str(first.get("Restaurant Name", location)),
+        "overall_rating": float(first["Overall Rating"]) if "Overall Rating" in first else None,
+        "review_count": int(first["Review Count"]) if "Review Count" in first else None,
+        "review_rows": int(review_rows),
+        "sentence_rows": int(sentence_rows),
+    }
+
+
+def _has_sentences(location, folder, sources):
+    # 只有評論表（例如剛由 collector 抓取、尚未處理）的店家沒有句子表，無法分析
+    names = {os.path.basename(csv_paths(location, folder)[1]), os.path.basename(store_paths(location, folder)[1])}
+    return bool(names & set(sources))
+
+
+def build_catalog(folder: str = "data", previous=None):
+    """
+    建立店家目錄；previous 為舊目錄時，只重新讀取新增或 mtime/大小變動的店家。
+    """
+    previous_stores = (previous or {}).get("stores", {})
+    stores = {}
+    for location, sources in sorted(_scan_sources(folder).items()):
+        old = previous_stores.get(location)
+        sources = {name: list(stat) for name, stat in sources.items()}
+        if old is not None and old.get("sources") == sources:
+            stores[location] = old
+            continue
+        try:
+            entry = _describe_store(location, folder)
+        except (OSError, ValueError, KeyError):
+            # 檔案不完整（例如仍在寫入）時略過，下次更新再處理
+            continue
+        entry.update({
+            "location": location,
+            "paths": [os.path.join(folder, name) for name in sorted(sources)],
+            "size": sum(size for _, size in sources.values()),
+            "mtime": max(mtime for mtime, _ in sources.values()) / 1e9,
+            "sources": sources,
+            "processed": _has_sentences(location, folder, sources),
+        })
+        stores[location] = entry
+
+    return {"schema_version": CATALOG_SCHEMA_VERSION, "stores": stores}
+
+
+def read_catalog(folder: str = "data"):
+    """
+    讀取已儲存的目錄檔，不存在或版本不符時回傳 None。
+    """
+    path = catalog_path(folder)
+    try:
+        with open(path, encoding="utf-8") as f:
+            catalog = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if catalog.get("schema_version") != CATALOG_SCHEMA_VERSION:
+        return None
+    return catalog
+
+
+def write_catalog(catalog, folder: str = "data"):
+    path = catalog_path(folder)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(catalog, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_path, path)
+
+
+def refresh_catalog(folder: str = "data", force=False):
+    """
+    以目錄檔為基礎增量更新：只 stat 資料夾中的檔案，mtime/大小未變的店家不會被讀取。
+    目錄內容有變動時才寫回目錄檔。
+
+    由處理流程的 ingest 步驟、collector、頁面上的「更新目錄」按鈕或 python -m utils.store_catalog 呼叫；
+    一般讀取（get_store_catalog）只使用已儲存的目錄檔。
+    """
+    previous = read_catalog(folder)
+    catalog = build_catalog(folder, None if force else previous)
+    if catalog != previous:
+        try:
+            write_catalog(catalog, folder)
+        except OSError:
+            # 資料夾唯讀時只在記憶體中使用
+            pass
+    return catalog
+
+
+class StoreCatalog:
+    """
+    可搜尋、分頁的店家目錄（唯讀，由程序共用快取保存）。
+    """
+
+    def __init__(self, catalog):
+        # 依 Google Map 留言數排序，熱門店家排在前面
+        self.entries = sorted(
+            catalog["stores"].values(),
+            key=lambda entry: (-(entry.get("review_count") or 0), entry["location"]),
+        )
+        self._search_keys = [
+            f"{entry['location']}\n{entry['restaurant_name']}".casefold() for entry in self.entries
+        ]
+        self._by_location = {entry["location"]: entry for entry in self.entries}
+
+    @property
+    def nbytes(self):
+        return sum(len(key.encode("utf-8")) * 4 + 500 for key in self._search_keys)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def processed(self):
+        """
+        已有句子表、可以分析的店家。
+        """
+        return [entry for entry in self.entries if entry.get("processed")]
+
+    def get(self, location):
+        """
+        以店名取得目錄項目，不存在時回傳 None。
+        """
+        return self._by_location.get(location)
+
+    def search(self, query="", page=0, page_size=20):
+        """
+        以店名關鍵字搜尋並分頁。
+
+        Returns:
+            (該頁店家列表, 符合的店家總數)
+        """
+        query = query.strip().casefold()
+        if query:
+            matched = [entry for entry, key in zip(self.entries, self._search_keys) if query in key]
+        else:
+            matched = self.entries
+        start = page * page_size
+        return matched[start:start + page_size], len(matched)
+
+
+# 本程序中明確更新目錄的次數（資料夾唯讀、目錄檔無法寫回時仍可讓快取失效）
+_refreshes = {}
+
+
+def catalog_version(folder: str = "data"):
+    """
+    目錄版本：目錄檔的 mtime 加上本程序的更新次數，只需一次 stat，不掃描店家檔案。
+    """
+    try:
+        mtime = os.stat(catalog_path(folder)).st_mtime_ns
+    except OSError:
+        mtime = None
+    return f"{mtime}:{_refreshes.get(os.path.abspath(folder), 0)}"
+
+
+def get_store_catalog(folder: str = "data", refresh=False):
+    """
+    取得程序共用的店家目錄。
+
+    平常直接使用已儲存的目錄檔（不存在時才建立一次），不會 stat 任何店家檔案；
+    refresh 為 True 時（例如「更新目錄」按鈕）先掃描資料夾增量更新目錄檔。
+    """
+    key = os.path.abspath(folder)
+    catalog = None
+    if refresh:
+        catalog = refresh_catalog(folder)
+        _refreshes[key] = _refreshes.get(key, 0) + 1
+    return registry.get(
+        ("catalog", key),
+        catalog_version(folder),
+        lambda: StoreCatalog(catalog or read_catalog(folder) or refresh_catalog(folder)),
+        lambda catalog: catalog.nbytes,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="建立或更新店家目錄")
+    parser.add_argument("--folder", default="data")
+    parser.add_argument("--force", action="store_true", help="重新讀取所有店家")
+    args = parser.parse_args()
+
+    catalog = refresh_catalog(args.folder, force=args.force)
+    print(f"📚 共 {len(catalog['stores'])} 家店：{catalog_path(args.folder)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+import argparse
+import glob
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+# 欄式儲存格式版本，結構變更時遞增
+STORE_FORMAT_VERSION = 1
+
+# 評論表：一則評論一列，review_id 與原句子表的 index 欄位相同（從 1 起算）
+REVIEW_TABLE_COLUMNS = [
+    "review_id", "Restaurant Name", "Overall Rating", "Review Count",
+    "Review", "Review Rating", "keyword",
+]
+# 句子表：一句一列，只以 review_id 指回評論，不再重複整則評論文字
+SENTENCE_TABLE_COLUMNS = [
+    "review_id", "sentence", "word", "label", "sentiment_score", "sentiment",
+]
+
+# 原 CSV 的欄位 → 欄式表中對應的來源（評論表欄位透過 review_id 合併回來）
+REVIEW_COLUMNS = ["Restaurant Name", "Overall Rating", "Review Count", "Review", "Review Rating"]
+SENTENCE_COLUMNS = [
+    "text", "rating", "sentence", "word", "label", "keyword",
+    "index", "sentiment_score", "sentiment",
+]
+# 頁面分析用到的句子欄位（不含整則評論文字）
+ANALYSIS_SENTENCE_COLUMNS = ["rating", "sentence", "word", "label", "index", "sentiment_score", "sentiment"]
+_SENTENCE_JOINED_COLUMNS = {"text": "Review", "rating": "Review Rating", "keyword": "keyword"}
+
+
+def store_paths(location: str, folder: str = "data"):
+    """
+    回傳店家欄式檔案路徑 (評論表, 句子表)。
+    """
+    return (
+        os.path.join(folder, f"{location}_reviews.feather"),
+        os.path.join(folder, f"{location}_sentences.feather"),
+    )
+
+
+def csv_paths(location: str, folder: str = "data"):
+    """
+    回傳店家原始 CSV 路徑 (評論檔, 句子檔)。
+    """
+    return (
+        os.path.join(folder, f"{location}_reviews.csv"),
+        os.path.join(folder, f"{location}.csv"),
+    )
+
+
+def is_store_current(location: str, folder: str = "data"):
+    """
+    欄式檔案存在且不比 CSV 舊時回傳 True。
+    """
+    columnar = store_paths(location, folder)
+    if not all(os.path.exists(path) for path in columnar):
+        return False
+    sources = [path for path in csv_paths(location, folder) if os.path.exists(path)]
+    if not sources:
+        return True
+    oldest_store = min(os.path.getmtime(path) for path in columnar)
+    newest_source = max(os.path.getmtime(path) for path in sources)
+    return oldest_store >= newest_source
+
+
+def normalize_store_frames(df_reviews, df):
+    """
+    將 CSV 格式的 (df_reviews, df) 轉成正規化的 (評論表, 句子表)。
+
+    句子表的 index 欄位為 df_reviews 的列序（從 1 起算），
+    text / rating / keyword 皆為評論層級欄位，因此移到評論表只存一次。
+    """
+    df_reviews = df_reviews.drop(columns=["Unnamed: 0"], errors="ignore").reset_index(drop=True)
+    df = df.drop(columns=["Unnamed: 0"], errors="ignore")
+
+    reviews = pd.DataFrame({
+        "review_id": pd.RangeIndex(1, len(df_reviews) + 1).astype("int32"),
+        "Restaurant Name": df_reviews["Restaurant Name"].astype("category"),
+        "Overall Rating": df_reviews["Overall Rating"].astype("float64"),
+        "Review Count": df_reviews["Review Count"].astype("int32"),
+        "Review": df_reviews["Review"].astype("string"),
+        "Review Rating": df_reviews["Review Rating"].astype("int8"),
+    })
+    keywords = df.groupby("index", sort=False)["keyword"].first()
+    reviews["keyword"] = reviews["review_id"].map(keywords).astype("string")
+
+    sentences = pd.DataFrame({
+        "review_id": df["index"].astype("int32"),
+        "sentence": df["sentence"].astype("string"),
+        "word": df["word"].astype("string"),
+        "label": df["label"].astype("category"),
+        "sentiment_score": df["sentiment_score"].astype("float64"),
+        "sentiment": df["sentiment"].astype("category"),
+    }).reset_index(drop=True)
+
+    return reviews, sentences
+
+
+def write_store(location: str, reviews, sentences, folder: str = "data"):
+    """
+    以未壓縮的 Arrow IPC (Feather v2) 寫出評論表與句子表，讀取時可直接 memory-map。
+    """
+    reviews_path, sentences_path = store_paths(location, folder)
+    metadata = {b"store_format_version": str(STORE_FORMAT_VERSION).encode()}
+    for frame, path in ((reviews, reviews_path), (sentences, sentences_path)):
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), **metadata})
+        tmp_path = f"{path}.tmp"
+        feather.write_feather(table, tmp_path, compression="uncompressed")
+        os.replace(tmp_path, path)
+    return reviews_path, sentences_path
+
+
+def convert_csv_store(location: str, folder: str = "data"):
+    """
+    將 data/<店名>.csv 與 data/<店名>_reviews.csv 轉為欄式格式。
+    """
+    reviews_csv, sentences_csv = csv_paths(location, folder)
+    df_reviews = pd.read_csv(reviews_csv)
+    df = pd.read_csv(sentences_csv)
+    reviews, sentences = normalize_store_frames(df_reviews, df)
+    return write_store(location, reviews, sentences, folder)
+
+
+def _read_table(path, columns):
+    table = feather.read_table(path, columns=columns, memory_map=True)
+    return table.to_pandas()
+
+
+def read_store(location: str, folder: str = "data", review_columns=None, sentence_columns=None):
+    """
+    讀取欄式店家資料，並還原成頁面使用的 (df_reviews, df) 欄位名稱。
+
+    Args:
+        review_columns (list): 要讀取的評論欄位（REVIEW_COLUMNS 的子集），None 代表全部
+        sentence_columns (list): 要讀取的句子欄位（SENTENCE_COLUMNS 的子集），None 代表全部；
+            text / rating / keyword 會依 review_id 從評論表合併回來
+    """
+    reviews_path, sentences_path = store_paths(location, folder)
+    review_columns = list(REVIEW_COLUMNS if review_columns is None else review_columns)
+    sentence_columns = list(SENTENCE_COLUMNS if sentence_columns is None else sentence_columns)
+
+    df_reviews = _read_table(reviews_path, review_columns)
+
+    own_columns = [c for c in sentence_columns if c in SENTENCE_TABLE_COLUMNS]
+    joined = [c for c in sentence_columns if c in _SENTENCE_JOINED_COLUMNS]
+    need_id = bool(joined) or "index" in sentence_columns
+    df = _read_table(sentences_path, (["review_id"] if need_id else []) + own_columns)
+
+    if joined:
+        # review_id 從 1 起算且連續，可直接當位置索引取值
+        lookup = _read_table(reviews_path, [_SENTENCE_JOINED_COLUMNS[c] for c in joined])
+        positions = df["review_id"].to_numpy() - 1
+        for column in joined:
+            values = lookup[_SENTENCE_JOINED_COLUMNS[column]]
+            df[column] = values.take(positions).reset_index(drop=True)
+    if "index" in sentence_columns:
+        df["index"] = df["review_id"].astype("int64")
+    if need_id:
+        df = df.drop(columns=["review_id"])
+
+    return df_reviews, df[sentence_columns]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="將店家 CSV 轉換為欄式儲存格式")
+    parser.add_argument("stores", nargs="*", help="店名，未指定時轉換資料夾中所有店家")
+    parser.add_argument("--folder", default="data")
+    args = parser.parse_args()
+
+    stores = args.stores or sorted(
+        os.path.basename(path)[: -len("_reviews.csv")]
+        for path in glob.glob(os.path.join(args.folder, "*_reviews.csv"))
+    )
+    for location in stores:
+        reviews_path, sentences_path = convert_csv_store(location, args.folder)
+        size = os.path.getsize(reviews_path) + os.path.getsize(sentences_path)
+        print(f"{location}: {size / 1024:.1f} KB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,451 @@
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+import json
+import os
+import random
+import zlib
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+import pyarrow.feather as feather
+
+from utils.aggregates import AGGREGATE_SCHEMA_VERSION, TOP_K, aggregate_path, save_aggregates
+from utils.heavy_hitters import HeavyHitters
+from utils.rule_engine import RuleEngine, load_rules
+from utils.store_format import csv_paths, is_store_current, store_paths
+
+DEFAULT_CHUNK_ROWS = 200_000
+DEFAULT_MAX_MEMORY_MB = 256
+# 每個主題保留的例句數、每個星級保留的留言數、熱門關鍵詞的例句數
+LABEL_EXAMPLES = 6
+RATING_EXAMPLES = 5
+KEYWORD_EXAMPLES = 5
+
+
+class MemoryLimitExceeded(MemoryError):
+    pass
+
+
+class ExactCounter:
+    """
+    精確詞頻計數，可合併；同分時依第一次出現的順序排列（與 Counter.most_common 相同）。
+    """
+
+    def __init__(self):
+        self.counts = Counter()
+
+    def update(self, words):
+        """
+        以一批詞（依出現順序）更新計數。
+        """
+        codes, uniques = pd.factorize(np.asarray(words, dtype=object))
+        counts = np.bincount(codes, minlength=len(uniques))
+        # uniques 依第一次出現的順序排列，新詞的插入順序因此與逐詞更新相同
+        self.counts.update(dict(zip(uniques, counts.tolist())))
+
+    def merge(self, other):
+        self.counts.update(other.counts)
+        return self
+
+    def most_common(self, k):
+        return [(word, int(count)) for word, count in self.counts.most_common(k)]
+
+    @property
+    def nbytes(self):
+        return len(self.counts) * 120
+
+    def __len__(self):
+        return len(self.counts)
+
+
+class Reservoir:
+    """
+    固定大小的隨機抽樣（Algorithm R），可合併兩個由不相交資料建立的樣本。
+
+    抽樣以位置（資料列）為單位，重複的值各自計入 seen 並以相同機率被抽中，樣本對所有資料列均勻；
+    同一句出現多次時可能佔用多個位置，items 輸出時才去除重複，因此可能少於 k 筆。
+    """
+
+    def __init__(self, k, seed=None):
+        self.k = k
+        self.seen = 0
+        self.slots = []
+        self._rng = random.Random(seed)
+
+    @property
+    def items(self):
+        """
+        樣本中不重複的值（依位置順序）。
+        """
+        return list(dict.fromkeys(self.slots))
+
+    def add_many(self, values):
+        values = list(values)
+        start = self.seen
+        self.seen += len(values)
+        # 前 k 筆直接放入
+        fill = min(self.k - len(self.slots), len(values))
+        self.slots.extend(values[:fill])
+        if fill >= len(values):
+            return
+        # 第 t 筆以 k / t 的機率取代樣本中隨機的一個位置，只對被選中的資料列逐一處理
+        rng = np.random.default_rng(self._rng.getrandbits(64))
+        positions = np.arange(start + fill, start + len(values)) + 1
+        draws = rng.random(len(positions))
+        for offset in np.flatnonzero(draws < self.k / positions):
+            self.slots[self._rng.randrange(self.k)] = values[fill + offset]
+
+    def merge(self, other):
+        """
+        合併兩個樣本：逐一決定每個位置取自哪一邊，機率與兩邊尚未取用的母體大小成正比（不放回抽樣）。
+        """
+        total = self.seen + other.seen
+        if total == 0:
+            return self
+        mine, theirs = list(self.slots), list(other.slots)
+        self._rng.shuffle(mine)
+        self._rng.shuffle(theirs)
+        remaining_mine, remaining_theirs = self.seen, other.seen
+        merged = []
+        while len(merged) < self.k and (mine or theirs):
+            take_mine = bool(mine) and (
+                not theirs or self._rng.random() * (remaining_mine + remaining_theirs) < remaining_mine
+            )
+            if take_mine:
+                merged.append(mine.pop())
+                remaining_mine -= 1
+            else:
+                merged.append(theirs.pop())
+                remaining_theirs -= 1
+        self.slots = merged
+        self.seen = total
+        return self
+
+
+class StreamingAggregates:
+    """
+    可逐塊更新、可合併的彙總統計；輸出格式與 utils.aggregates.compute_aggregates 相同，
+    另附主題、星級與熱門關鍵詞的隨機例句。
+
+    epsilon 不為 None 時詞頻改用固定記憶體的近似計數（utils.heavy_hitters），結果附上誤差保證。
+    """
+
+    def __init__(self, rules_path="rules.json", min_length=2, seed=0, epsilon=None):
+        self.min_length = min_length
+        self.seed = seed
+        self.epsilon = epsilon
+        self.promotions = load_rules(rules_path)["promotions"]
+        self._engine = RuleEngine(self.promotions)
+        self.info = None
+        self.review_rows = 0
+        self.rating_counts = np.zeros(6, dtype=np.int64)
+        self.rating_sum = 0
+        self.checkin_review_count = 0
+        self.promotion_hits = Counter()
+        self.sentence_rows = 0
+        self.label_counts = Counter()
+        self.terms = self._new_counter()
+        self.terms_by_label = {}
+        self.label_examples = {}
+        self.rating_examples = {}
+        self.keyword_examples = {}
+        self.keyword_sentences = Counter()
+
+    def _new_counter(self):
+        return HeavyHitters(self.epsilon) if self.epsilon else ExactCounter()
+
+    def _reservoir(self, table, key, k):
+        if key not in table:
+            table[key] = Reservoir(k, seed=zlib.crc32(f"{self.seed}:{key}".encode("utf-8")))
+        return table[key]
+
+    def add_reviews(self, chunk):
+        """
+        以評論表的一塊（欄位 Restaurant Name / Overall Rating / Review Count / Review / Review Rating）更新。
+        """
+        if chunk.empty:
+            return
+        if self.info is None:
+            first = chunk.iloc[0]
+            self.info = {
+                "restaurant_name": str(first["Restaurant Name"]),
+                "overall_rating": float(first["Overall Rating"]),
+                "review_count": int(first["Review Count"]),
+            }
+        ratings = chunk["Review Rating"].to_numpy(dtype=np.int64)
+        self.review_rows += len(chunk)
+        self.rating_counts += np.bincount(np.clip(ratings, 0, 5), minlength=6)
+        self.rating_sum += int(ratings.sum())
+
+        matches = self._engine.match(chunk["Review"])
+        self.checkin_review_count += int(matches.any().sum())
+        self.promotion_hits.update({name: int(count) for name, count in matches.hit_counts().items()})
+
+        for rating, reviews in chunk.groupby("Review Rating", sort=False)["Review"]:
+            self._reservoir(self.rating_examples, int(rating), RATING_EXAMPLES).add_many(reviews.dropna())
+
+    def _tokens(self, chunk):
+        tokens = chunk["word"].reset_index(drop=True).str.split().explode().dropna()
+        return tokens[tokens.str.len() >= self.min_length]
+
+    def add_sentences(self, chunk):
+        """
+        以句子表的一塊（欄位 sentence / word / label）更新。
+        """
+        if chunk.empty:
+            return
+        self.sentence_rows += len(chunk)
+        labels = chunk["label"].astype(object).reset_index(drop=True)
+        codes, uniques = pd.factorize(labels)
+        self.label_counts.update(dict(zip(uniques, np.bincount(codes[codes >= 0], minlength=len(uniques)).tolist())))
+
+        tokens = self._tokens(chunk)
+        self.terms.update(tokens.to_numpy())
+        token_labels = labels.to_numpy()[tokens.index.to_numpy()]
+        sentences = chunk["sentence"].reset_index(drop=True)
+        for label in uniques:
+            if label not in self.terms_by_label:
+                self.terms_by_label[label] = self._new_counter()
+            self.terms_by_label[label].update(tokens.to_numpy()[token_labels == label])
+            self._reservoir(self.label_examples, label, LABEL_EXAMPLES).add_many(
+                sentences[(labels == label).to_numpy()].dropna()
+            )
+
+    def add_keyword_sentences(self, chunk, words):
+        """
+        第二次掃描：為指定的熱門關鍵詞抽取例句並計算句子數。
+        """
+        tokens = self._tokens(chunk)
+        tokens = tokens[tokens.isin(words)]
+        pairs = pd.DataFrame({"word": tokens.to_numpy(), "row": tokens.index.to_numpy()}).drop_duplicates()
+        sentences = chunk["sentence"].reset_index(drop=True)
+        for word, rows in pairs.groupby("word", sort=False)["row"]:
+            self.keyword_sentences[word] += len(rows)
+            self._reservoir(self.keyword_examples, word, KEYWORD_EXAMPLES).add_many(sentences.iloc[rows.to_numpy()])
+
+    def merge(self, other):
+        """
+        合併另一份彙總（例如連鎖店的其他分店或其他工作程序的部分結果）。
+        """
+        if other.epsilon and not self.epsilon:
+            raise ValueError("精確計數無法合併近似計數的結果，請改由近似的一方合併")
+        if self.info is None:
+            self.info = other.info
+        self.review_rows += other.review_rows
+        self.rating_counts += other.rating_counts
+        self.rating_sum += other.rating_sum
+        self.checkin_review_count += other.checkin_review_count
+        self.promotion_hits.update(other.promotion_hits)
+        self.sentence_rows += other.sentence_rows
+        self.label_counts.update(other.label_counts)
+        self.terms.merge(other.terms)
+        for label, counter in other.terms_by_label.items():
+            self.terms_by_label.setdefault(label, self._new_counter()).merge(counter)
+        for mine, theirs in ((self.label_examples, other.label_examples),
+                             (self.rating_examples, other.rating_examples),
+                             (self.keyword_examples, other.keyword_examples)):
+            for key, reservoir in theirs.items():
+                if key in mine:
+                    mine[key].merge(reservoir)
+                else:
+                    mine[key] = reservoir
+        self.keyword_sentences.update(other.keyword_sentences)
+        return self
+
+    @property
+    def nbytes(self):
+        return self.terms.nbytes + sum(counter.nbytes for counter in self.terms_by_label.values())
+
+    def result(self):
+        """
+        輸出與 compute_aggregates 相同結構的 dict，另加 examples。
+        """
+        approximate = None
+        if self.epsilon:
+            approximate = {
+                "top_terms": self.terms.guarantee(),
+                "top_terms_by_label": {label: self.terms_by_label[label].guarantee() for label in self.terms_by_label},
+            }
+        info = self.info or {"restaurant_name": "", "overall_rating": 0.0, "review_count": 0}
+        label_counts = {str(label): count for label, count in self.label_counts.most_common() if count > 0}
+        return {
+            "schema_version": AGGREGATE_SCHEMA_VERSION,
+            **info,
+            "scraped_review_count": self.review_rows,
+            "sentence_count": self.sentence_rows,
+            "rating_histogram": {str(r): int(self.rating_counts[r]) for r in range(1, 6)},
+            "mean_rating": self.rating_sum / self.review_rows if self.review_rows else 0.0,
+            "label_counts": label_counts,
+            "top_terms": [list(item) for item in self.terms.most_common(TOP_K)],
+            "top_terms_by_label": {
+                label: [list(item) for item in self.terms_by_label[label].most_common(TOP_K)]
+                for label in label_counts
+            },
+            "checkin_keywords": [kw for keywords in self.promotions.values() for kw in keywords],
+            "checkin_review_count": self.checkin_review_count,
+            "promotion_hits": {name: int(self.promotion_hits.get(name, 0)) for name in self.promotions},
+            **({"approximate": approximate} if approximate else {}),
+            "examples": {
+                "labels": {str(k): r.items for k, r in self.label_examples.items()},
+                "ratings": {str(k): r.items for k, r in sorted(self.rating_examples.items())},
+                "keywords": {
+                    word: {"sentences": self.keyword_sentences[word], "examples": r.items}
+                    for word, r in self.keyword_examples.items()
+                },
+            },
+        }
+
+
+def _iter_frame_chunks(location, folder, table, columns, rows):
+    """
+    逐塊讀取評論表（table="reviews"）或句子表（table="sentences"）的指定欄位。
+
+    欄式檔案以 memory-map 開啟後逐段切片轉換，CSV 以 iterator 逐塊解析，都不會一次載入整個檔案；
+    rows() 在每塊讀取前呼叫，讓呼叫端依實際記憶體用量調整塊大小。
+    產生 (DataFrame, 總列數或 None)。
+    """
+    position = 0 if table == "reviews" else 1
+    if is_store_current(location, folder):
+        arrow_table = feather.read_table(store_paths(location, folder)[position], columns=columns, memory_map=True)
+        start = 0
+        while start < arrow_table.num_rows:
+            size = rows()
+            yield arrow_table.slice(start, size).to_pandas(), arrow_table.num_rows
+            start += size
+        return
+
+    path = csv_paths(location, folder)[position]
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"找不到檔案：{path}")
+    with pd.read_csv(path, usecols=columns, iterator=True) as reader:
+        while True:
+            try:
+                yield reader.get_chunk(rows()), None
+            except StopIteration:
+                return
+
+
+REVIEW_STREAM_COLUMNS = ["Restaurant Name", "Overall Rating", "Review Count", "Review", "Review Rating"]
+
+
+def _scan(result, stores, folder, table, columns, update, stage, chunk_rows, max_memory_mb, progress):
+    budget = max_memory_mb * 1024 * 1024
+    # 第一塊先讀少量資料估計每列大小，之後每塊最多佔用預算的四分之一
+    size = [min(chunk_rows, 1000)]
+    done = 0
+    for location in stores:
+        for chunk, total in _iter_frame_chunks(location, folder, table, columns, lambda: size[0]):
+            update(chunk)
+            done += len(chunk)
+            if result.nbytes > budget // 2:
+                raise MemoryLimitExceeded(
+                    f"詞頻表約 {result.nbytes / 2**20:.0f} MB，超過上限 {max_memory_mb} MB 的一半；"
+                    "請提高上限或以 epsilon 改用近似計數"
+                )
+            per_row = max(chunk.memory_usage(deep=True).sum() / max(len(chunk), 1), 1)
+            size[0] = int(max(1000, min(chunk_rows, budget // 4 // per_row)))
+            if progress:
+                progress(stage, done, total if len(stores) == 1 else None)
+
+
+def _stream_counts(stores, folder, chunk_rows, max_memory_mb, seed, epsilon, progress=None):
+    result = StreamingAggregates(seed=seed, epsilon=epsilon)
+    _scan(result, stores, folder, "reviews", REVIEW_STREAM_COLUMNS, result.add_reviews, "reviews",
+          chunk_rows, max_memory_mb, progress)
+    _scan(result, stores, folder, "sentences", ["sentence", "word", "label"], result.add_sentences, "sentences",
+          chunk_rows, max_memory_mb, progress)
+    return result
+
+
+def _stream_keywords(stores, folder, words, chunk_rows, max_memory_mb, seed, epsilon, progress=None):
+    result = StreamingAggregates(seed=seed, epsilon=epsilon)
+    _scan(result, stores, folder, "sentences", ["sentence", "word"],
+          lambda chunk: result.add_keyword_sentences(chunk, words), "keywords", chunk_rows, max_memory_mb, progress)
+    return result
+
+
+def stream_aggregates(stores, folder="data", chunk_rows=DEFAULT_CHUNK_ROWS, max_memory_mb=DEFAULT_MAX_MEMORY_MB,
+                      progress=None, keyword_examples=True, seed=0, epsilon=None, workers=1):
+    """
+    以固定記憶體逐塊計算一家或多家店（例如連鎖店各分店合併）的彙總統計。
+
+    Args:
+        stores (str | list): 店名或店名列表
+        chunk_rows (int): 每塊最多列數，實際大小會依 max_memory_mb 縮小
+        max_memory_mb (int): 記憶體上限（多程序時由各程序平分）；詞頻表超過上限時拋出 MemoryLimitExceeded
+        progress (callable): progress(階段, 已處理列數, 總列數或 None)，只在單一程序時呼叫
+        keyword_examples (bool): 是否再掃描一次句子表，為前 5 大熱門詞抽取例句
+        epsilon (float): 近似詞頻的相對誤差上限；None 為精確計數
+        workers (int): 多家店時以多程序各自計算再合併部分結果
+
+    Returns:
+        StreamingAggregates，可再與其他結果 merge，result() 取得與 compute_aggregates 相同結構的 dict
+    """
+    if isinstance(stores, str):
+        stores = [stores]
+    workers = max(1, min(workers, len(stores)))
+    if workers == 1:
+        result = _stream_counts(stores, folder, chunk_rows, max_memory_mb, seed, epsilon, progress)
+        if keyword_examples:
+            words = {word for word, _ in result.terms.most_common(KEYWORD_EXAMPLES)}
+            result.merge(_stream_keywords(stores, folder, words, chunk_rows, max_memory_mb, seed, epsilon, progress))
+        return result
+
+    # 每家店一個工作單位，部分結果依店家順序合併（與單一程序的結果相同）
+    budget = max(1, max_memory_mb // workers)
+    result = StreamingAggregates(seed=seed, epsilon=epsilon)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        units = [[location] for location in stores]
+        for partial in pool.map(_stream_counts, units, repeat(folder), repeat(chunk_rows), repeat(budget),
+                                repeat(seed), repeat(epsilon)):
+            result.merge(partial)
+        if keyword_examples:
+            words = {word for word, _ in result.terms.most_common(KEYWORD_EXAMPLES)}
+            for partial in pool.map(_stream_keywords, units, repeat(folder), repeat(words), repeat(chunk_rows),
+                                    repeat(budget), repeat(seed), repeat(epsilon)):
+                result.merge(partial)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="以固定記憶體逐塊計算一家或多家店的彙總統計")
+    parser.add_argument("stores", nargs="+", help="店名；指定多家時合併計算（例如連鎖店各分店）")
+    parser.add_argument("--folder", default="data")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS)
+    parser.add_argument("--max-memory-mb", type=int, default=DEFAULT_MAX_MEMORY_MB)
+    parser.add_argument("--seed", type=int, default=0, help="例句抽樣的亂數種子")
+    parser.add_argument("--epsilon", type=float,
+                        help="改用近似詞頻，相對誤差上限（例如 0.0001 代表誤差不超過總詞數的萬分之一）")
+    parser.add_argument("--workers", type=int, default=1, help="多家店時的工作程序數")
+    parser.add_argument("--output", help="結果 JSON 路徑；未指定且只有一家店時更新該店的彙總檔")
+    args = parser.parse_args()
+
+    def progress(stage, done, total):
+        suffix = f" / {total:,}" if total else ""
+        print(f"\r  {stage}: {done:,}{suffix}", end="", flush=True)
+
+    try:
+        aggregates = stream_aggregates(
+            args.stores, args.folder, args.chunk_rows, args.max_memory_mb, progress,
+            seed=args.seed, epsilon=args.epsilon, workers=args.workers,
+        ).result()
+    except MemoryLimitExceeded as e:
+        print(f"\n❌ {e}")
+        raise SystemExit(1)
+    print()
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(aggregates, f, ensure_ascii=False, indent=2)
+        print(f"✅ 結果已儲存：{args.output}")
+    elif len(args.stores) == 1:
+        save_aggregates(args.stores[0], args.folder, aggregates)
+        print(f"✅ 已更新 {aggregate_path(args.stores[0], args.folder)}")
+    else:
+        print(json.dumps(aggregates, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+import numpy as np
+import pandas as pd
+
+from utils.data_loader import resolve_derived
+
+
+class TermFrequency:
+    """
+    以整數代碼表示的詞頻矩陣。
+
+    vocabulary 為詞表（依第一次出現的順序），totals 為各詞總次數；
+    groups 中每個分組（例如 label、rating）以 COO 形式儲存 分組值 × 詞 的稀疏計數，
+    並記錄每格第一次出現的位置，讓同分時的排序與 Counter.most_common 一致。
+    """
+
+    def __init__(self, vocabulary, totals, first_seen, groups):
+        self.vocabulary = vocabulary
+        self.totals = totals
+        self.first_seen = first_seen
+        self.groups = groups
+
+    @property
+    def nbytes(self):
+        arrays = [self.totals, self.first_seen]
+        for group in self.groups.values():
+            arrays.extend(group[1:])
+        return int(
+            sum(array.nbytes for array in arrays)
+            + sum(len(word.encode("utf-8")) + 60 for word in self.vocabulary)
+        )
+
+    def _top(self, term_codes, counts, first_seen, k):
+        order = np.lexsort((first_seen, -counts))[:k]
+        return pd.DataFrame({
+            "word": self.vocabulary[term_codes[order]],
+            "count": counts[order],
+        })
+
+    def top_k(self, k=10):
+        """
+        回傳全部句子中出現次數最多的 k 個詞（DataFrame: word, count）。
+        """
+        codes = np.arange(len(self.vocabulary))
+        return self._top(codes, self.totals, self.first_seen, k)
+
+    def group_values(self, group):
+        """
+        回傳分組的所有值，依該分組的總詞數遞減排序。
+        """
+        values, rows, _, counts, _ = self.groups[group]
+        totals = np.bincount(rows, weights=counts, minlength=len(values))
+        return list(values[np.argsort(-totals, kind="stable")])
+
+    def top_k_by(self, group, value, k=10):
+        """
+        回傳指定分組值（例如 label="食物"、rating=5）中出現次數最多的 k 個詞。
+        """
+        values, rows, cols, counts, first_seen = self.groups[group]
+        matches = np.flatnonzero(pd.Index(values) == value)
+        if len(matches) == 0:
+            return pd.DataFrame({"word": [], "count": []})
+        mask = rows == matches[0]
+        return self._top(cols[mask], counts[mask], first_seen[mask], k)
+
+
+def build_term_frequency(df, min_length=2, stopwords=None, groups=("label", "rating"), word_column="word"):
+    """
+    將 word 欄位斷詞結果只拆解一次，建立全體與各分組的詞頻。
+
+    Args:
+        min_length (int): 詞長度下限，短於此長度的詞不列入計算
+        stopwords (Iterable[str]): 額外排除的停用詞（stopwords.txt 已在斷詞時排除，這裡只處理呼叫端另外指定的詞）
+        groups (tuple): 要建立分組詞頻的欄位，不存在於 df 的欄位會略過
+    """
+    tokens = df[word_column].reset_index(drop=True).str.split().explode().dropna()
+    words = tokens.to_numpy(dtype=object)
+    keep = pd.Series(words).str.len().to_numpy() >= min_length
+    if stopwords:
+        keep &= ~pd.Series(words).isin(stopwords).to_numpy()
+    words = words[keep]
+    row_ids = tokens.index.to_numpy(dtype=np.int64)[keep]
+    positions = np.arange(len(words), dtype=np.int64)
+
+    term_codes, vocabulary = pd.factorize(words)
+    vocabulary = np.asarray(vocabulary, dtype=object)
+    n_terms = len(vocabulary)
+    totals = np.bincount(term_codes, minlength=n_terms).astype(np.int64)
+    first_seen = np.full(n_terms, len(words), dtype=np.int64)
+    np.minimum.at(first_seen, term_codes, positions)
+
+    grouped = {}
+    for group in groups:
+        if group not in df.columns:
+            continue
+        group_codes, values = pd.factorize(df[group].reset_index(drop=True), sort=True)
+        token_groups = group_codes[row_ids]
+        valid = token_groups >= 0
+        keys = token_groups[valid].astype(np.int64) * n_terms + term_codes[valid]
+        # np.unique 的 return_index 即為每格第一次出現的位置
+        unique_keys, first_index, counts = np.unique(keys, return_index=True, return_counts=True)
+        grouped[group] = (
+            np.asarray(values, dtype=object),
+            (unique_keys // max(n_terms, 1)).astype(np.int32),
+            (unique_keys % max(n_terms, 1)).astype(np.int32),
+            counts.astype(np.int64),
+            positions[valid][first_index],
+        )
+
+    return TermFrequency(vocabulary, totals, first_seen, grouped)
+
+
+def get_term_frequency(handle, min_length=2):
+    """
+    取得目前資料集的共用詞頻，每個資料版本與參數只建立一次。
+    """
+    return resolve_derived(
+        handle,
+        f"term_frequency:{min_length}",
+        lambda df_reviews, df: build_term_frequency(df, min_length=min_length),
+    )